@@ -0,0 +1,344 @@
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from BitBoard import BitBoard
+from Board import DEFAULT_RADIUS, Board
+from Search import SearchEngine
+from Tactics import find_forcing_move
+from TranspositionTable import TranspositionTable
+
+BACKENDS: dict[str, type] = {
+  "array": Board,
+  "bitboard": BitBoard,
+}
+# (size, target) settings played when none are given
+DEFAULT_SETTINGS: tuple[tuple[int, int], ...] = ((5, 4), (7, 4), (10, 5), (15, 5))
+# z value of a 95% confidence interval
+Z_95: float = 1.96
+
+
+class LocalGame:
+  r"""
+  A game played without the server, with its rules: X moves first by default, players alternate, a move has to be
+  on an empty cell, and the game ends when a player has target in a row or the board is full.
+  """
+  def __init__(self, size: int, target: int, seconds_per_move: int = 60, first: int = 1):
+    self.size = size
+    self.target = target
+    self.seconds_per_move = seconds_per_move
+    self.board = Board(size)
+    # (x, y, symbol) in the order they were made
+    self.moves: list[tuple[int, int, int]] = []
+    self.turn: int = first
+    self.winner: int = 0
+
+  @property
+  def over(self) -> bool:
+    return self.winner != 0 or self.board.is_full()
+
+  def make_move(self, x: int, y: int, symbol: int):
+    r"""
+    :raises ValueError: If the game is over, it is not the symbol's turn or the cell is not empty
+    """
+    if self.over:
+      raise ValueError("Game is over")
+    if symbol != self.turn:
+      raise ValueError("Not your turn")
+    if not self.board.is_valid_move(x, y):
+      raise ValueError(f"Invalid move {x}, {y}")
+    self.board.make_move(x, y, symbol)
+    self.moves.append((x, y, symbol))
+    self.winner = self.board.winner(self.target)
+    self.turn = -symbol
+
+
+@dataclass
+class BotConfig:
+  name: str
+  depth: int = 3
+  # Iterative deepening budget per move in seconds, None searches to depth
+  seconds: float | None = None
+  max_depth: int | None = None
+  radius: int = DEFAULT_RADIUS
+  tactics: bool = True
+  backend: str = "array"
+  tt_megabytes: float = 16
+
+  @classmethod
+  def parse(cls, name: str, spec: str) -> "BotConfig":
+    r"""
+    Reads a configuration written as comma separated key=value pairs, for example "depth=3,tactics=0".
+    :raises ValueError: If a key is unknown
+    """
+    parsers = {
+      "depth": int,
+      "seconds": float,
+      "max_depth": int,
+      "radius": int,
+      "tactics": lambda value: value.lower() in ("1", "true", "yes", "on"),
+      "backend": str,
+      "tt_megabytes": float,
+    }
+    config = cls(name)
+    for pair in filter(None, spec.split(",")):
+      key, value = pair.split("=", 1)
+      key = key.strip().replace("-", "_")
+      if key not in parsers:
+        raise ValueError(f"Unknown bot setting: {key}")
+      setattr(config, key, parsers[key](value.strip()))
+    if config.backend not in BACKENDS:
+      raise ValueError(f"Unknown backend: {config.backend}")
+    return config
+
+
+class ArenaBot:
+  r"""
+  One side of an arena game: its own board of its backend, kept in sync with the game, and its own engine.
+  """
+  def __init__(self, config: BotConfig, size: int):
+    self.config = config
+    self.board = BACKENDS[config.backend](size, config.radius)
+    self.engine = SearchEngine(TranspositionTable(config.tt_megabytes))
+    self.moves = 0
+    self.seconds = 0.0
+
+  def choose(self, symbol: int, target: int) -> tuple[int, int]:
+    config = self.config
+    start = time.monotonic()
+    cell = None
+    root_moves = None
+    if config.tactics:
+      tactic = find_forcing_move(self.board, symbol, target)
+      if tactic is not None and tactic.decisive:
+        cell = tactic.move
+      elif tactic is not None:
+        root_moves = tactic.candidates
+    if cell is None and config.seconds is not None:
+      move = self.engine.iterative_deepening(self.board, symbol, target, start + config.seconds, config.max_depth,
+                                             root_moves).move
+      cell = (move.moveX, move.moveY)
+    elif cell is None:
+      self.engine.new_search()
+      move = self.engine.search(self.board, symbol, target, config.depth, root_moves=root_moves)
+      cell = (move.moveX, move.moveY)
+    self.moves += 1
+    self.seconds += time.monotonic() - start
+    return int(cell[0]), int(cell[1])
+
+
+@dataclass
+class GameOutcome:
+  size: int
+  target: int
+  # Name of the winning bot, None for a draw
+  winner: str | None
+  plies: int
+  # Moves made and seconds spent choosing them, by bot name
+  moves: dict[str, int] = field(default_factory=dict)
+  seconds: dict[str, float] = field(default_factory=dict)
+
+
+def random_opening(size: int, target: int, stones: int, seed: int | str) -> list[tuple[int, int]]:
+  r"""
+  Random stones near the centre, alternating from X, so repeated games between the same bots differ.
+  Stones that would win are skipped.
+  """
+  rng = random.Random(seed)
+  game = LocalGame(size, target)
+  spread = max(1, min(2, size // 4))
+  centre = size // 2
+  cells = []
+  while len(cells) < min(stones, size * size - 1):
+    x = min(max(centre + rng.randint(-spread, spread), 0), size - 1)
+    y = min(max(centre + rng.randint(-spread, spread), 0), size - 1)
+    if not game.board.is_valid_move(x, y):
+      continue
+    game.board.make_move(x, y, game.turn)
+    won = game.board.winner(target) != 0
+    game.board.unmake_move(x, y)
+    if won:
+      continue
+    game.make_move(x, y, game.turn)
+    cells.append((x, y))
+  return cells
+
+
+def play_game(x_config: BotConfig, o_config: BotConfig, size: int, target: int,
+              opening: list[tuple[int, int]]) -> GameOutcome:
+  r"""
+  Plays one game to the end, after the given opening stones.
+  :param x_config: Bot playing X, which moves first
+  :param o_config: Bot playing O
+  """
+  game = LocalGame(size, target)
+  bots = {1: ArenaBot(x_config, size), -1: ArenaBot(o_config, size)}
+  for x, y in opening:
+    symbol = game.turn
+    game.make_move(x, y, symbol)
+    for bot in bots.values():
+      bot.board.make_move(x, y, symbol)
+
+  while not game.over:
+    symbol = game.turn
+    x, y = bots[symbol].choose(symbol, target)
+    game.make_move(x, y, symbol)
+    for bot in bots.values():
+      bot.board.make_move(x, y, symbol)
+
+  winner = bots[game.winner].config.name if game.winner != 0 else None
+  return GameOutcome(
+    size, target, winner, len(game.moves),
+    {bot.config.name: bot.moves for bot in bots.values()},
+    {bot.config.name: bot.seconds for bot in bots.values()},
+  )
+
+
+def score_interval(wins: int, draws: int, games: int) -> tuple[float, float, float]:
+  r"""
+  Score of a bot, a win 1 and a draw a half, with the Wilson 95% confidence interval of it.
+  Wilson's interval stays meaningful at scores of 0 and 1, and treating a draw as half a win only widens it.
+  :return: Score, lower and upper bound
+  """
+  if games == 0:
+    return 0.0, 0.0, 1.0
+  score = (wins + draws / 2) / games
+  z2 = Z_95 ** 2
+  centre = (score + z2 / (2 * games)) / (1 + z2 / games)
+  margin = Z_95 * math.sqrt(score * (1 - score) / games + z2 / (4 * games ** 2)) / (1 + z2 / games)
+  return score, max(centre - margin, 0.0), min(centre + margin, 1.0)
+
+
+def summarize(outcomes: list[GameOutcome], first: str, second: str) -> dict:
+  wins = sum(outcome.winner == first for outcome in outcomes)
+  losses = sum(outcome.winner == second for outcome in outcomes)
+  draws = len(outcomes) - wins - losses
+  score, low, high = score_interval(wins, draws, len(outcomes))
+  per_move = {}
+  for name in (first, second):
+    moves = sum(outcome.moves.get(name, 0) for outcome in outcomes)
+    seconds = sum(outcome.seconds.get(name, 0.0) for outcome in outcomes)
+    per_move[name] = round(seconds / moves, 4) if moves else 0.0
+  return {
+    "games": len(outcomes),
+    f"{first}_wins": wins,
+    f"{second}_wins": losses,
+    "draws": draws,
+    f"{first}_score": round(score, 4),
+    f"{first}_score_95": [round(low, 4), round(high, 4)],
+    "seconds_per_move": per_move,
+    "plies": round(sum(outcome.plies for outcome in outcomes) / len(outcomes), 1) if outcomes else 0.0,
+  }
+
+
+def run_arena(first: BotConfig, second: BotConfig, settings: list[tuple[int, int]], pairs: int, workers: int,
+              opening_stones: int = 2, seed: int = 0) -> dict:
+  r"""
+  Plays pairs of games on every setting, each pair from the same random opening with colours swapped.
+  Games run in parallel on a process pool.
+  :param pairs: Game pairs per setting
+  :param workers: Number of processes
+  :return: Summary per setting and over all games
+  """
+  start = time.monotonic()
+  outcomes: dict[tuple[int, int], list[GameOutcome]] = {setting: [] for setting in settings}
+  with ProcessPoolExecutor(workers) as executor:
+    futures = []
+    for size, target in settings:
+      for pair in range(pairs):
+        opening = random_opening(size, target, opening_stones, f"{seed}/{size}/{target}/{pair}")
+        futures.append(executor.submit(play_game, first, second, size, target, opening))
+        futures.append(executor.submit(play_game, second, first, size, target, opening))
+    for done, future in enumerate(as_completed(futures), 1):
+      outcome = future.result()
+      outcomes[(outcome.size, outcome.target)].append(outcome)
+      print(f"{done}/{len(futures)} games, {outcome.size}x{outcome.size}/{outcome.target}: "
+            f"{outcome.winner or 'draw'} in {outcome.plies} plies", file=sys.stderr)
+
+  elapsed = time.monotonic() - start
+  everything = [outcome for results in outcomes.values() for outcome in results]
+  return {
+    "first": first.name,
+    "second": second.name,
+    "settings": {f"{size}x{size}/{target}": summarize(results, first.name, second.name)
+                 for (size, target), results in outcomes.items()},
+    "total": summarize(everything, first.name, second.name),
+    "seconds": round(elapsed, 1),
+    "games_per_hour": round(len(everything) * 3600 / elapsed) if elapsed else 0,
+  }
+
+
+def parse_setting(text: str) -> tuple[int, int]:
+  size, target = text.lower().split("/")
+  return int(size.split("x")[0]), int(target)
+
+
+def setupArgs() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description="Play two bot configurations against each other offline")
+  parser.add_argument(
+    "first",
+    type=str,
+    help="Settings of the first bot as key=value pairs, for example depth=3,tactics=0"
+  )
+  parser.add_argument(
+    "second",
+    type=str,
+    help="Settings of the second bot"
+  )
+  parser.add_argument(
+    "--names",
+    nargs=2,
+    type=str,
+    help="Names of the two bots in the report",
+    default=["first", "second"]
+  )
+  parser.add_argument(
+    "--settings",
+    nargs="*",
+    type=parse_setting,
+    help="Board sizes and targets to play on, as 10x10/5 or 10/5",
+    default=list(DEFAULT_SETTINGS)
+  )
+  parser.add_argument(
+    "--pairs",
+    type=int,
+    help="Game pairs per setting, each pair plays one opening with both colours",
+    default=10
+  )
+  parser.add_argument(
+    "--workers",
+    type=int,
+    help="Number of processes playing games",
+    default=1
+  )
+  parser.add_argument(
+    "--opening",
+    type=int,
+    help="Random stones placed before the bots start",
+    default=2
+  )
+  parser.add_argument(
+    "--seed",
+    type=int,
+    help="Seed of the random openings",
+    default=0
+  )
+  return parser
+
+
+def main(argv: list[str]) -> None:
+  args = setupArgs().parse_args(argv[1:])
+  if args.names[0] == args.names[1]:
+    raise ValueError("The bots need different names")
+  first = BotConfig.parse(args.names[0], args.first)
+  second = BotConfig.parse(args.names[1], args.second)
+  report = run_arena(first, second, args.settings, args.pairs, args.workers, args.opening, args.seed)
+  print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+  main(sys.argv)
@@ -0,0 +1,139 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Callable
+from requests import Response
+from Board import Board
+from HttpGameClient import GameData, HttpGameClient, IHttpClient, MoveData
+
+
+class IAsyncHttpClient(ABC):
+  r"""
+  Interface for an asynchronous HTTP client.
+  It provides coroutines to make GET and POST requests.
+  """
+  @abstractmethod
+  async def get(self, url: str, **kwargs) -> Response:
+    pass
+
+  @abstractmethod
+  async def post(self, url: str, **kwargs) -> Response:
+    pass
+
+  @abstractmethod
+  async def request(self, method: str, url: str, **kwargs) -> Response:
+    pass
+
+class AsyncSession(IAsyncHttpClient):
+  r"""
+  Implementation of the IAsyncHttpClient interface on top of a synchronous IHttpClient.
+  Each request runs in a thread of the default executor, at most max_concurrency at a time,
+  so the connection pool of the wrapped session is shared and never oversubscribed.
+  """
+  def __init__(self, sender: IHttpClient, max_concurrency: int = 8):
+    r"""
+    :param sender: Synchronous client making the requests, for example a Session
+    :param max_concurrency: Most requests in flight at once
+    """
+    self.sender = sender
+    self.semaphore = asyncio.Semaphore(max_concurrency)
+
+  async def call(self, function: Callable, *args, **kwargs):
+    r"""
+    Runs a blocking function that uses the sender in a thread, counted against max_concurrency.
+    """
+    async with self.semaphore:
+      return await asyncio.to_thread(function, *args, **kwargs)
+
+  async def request(self, method: str, url: str, **kwargs) -> Response:
+    return await self.call(self.sender.request, method, url, **kwargs)
+
+  async def get(self, url: str, **kwargs) -> Response:
+    return await self.request("GET", url, **kwargs)
+
+  async def post(self, url: str, **kwargs) -> Response:
+    return await self.request("POST", url, **kwargs)
+
+class AsyncHttpGameClient:
+  r"""
+  Asynchronous version of HttpGameClient with the same methods as coroutines.
+  It is built the same way, with an AsyncSession as the sender. Each coroutine runs the method of
+  a HttpGameClient on the session wrapped by the AsyncSession in a thread, so requests and responses
+  are built and read in one place.
+  Independent calls can run at the same time, for example with asyncio.gather,
+  while the event loop is free for other work such as a search running in a thread.
+  """
+  sender: AsyncSession
+  client: HttpGameClient
+
+  def __init__(self, sender: AsyncSession):
+    r"""
+    Initializes the client with the given sender.
+    """
+    self.sender = sender
+    self.client = HttpGameClient(sender.sender)
+
+  def setApiKey(self, api_key: str):
+    self.client.setApiKey(api_key)
+    return self
+
+  def setUserId(self, user_id: str):
+    self.client.setUserId(user_id)
+    return self
+
+  def setEndpoint(self, endpoint: str):
+    self.client.setEndpoint(endpoint)
+    return self
+
+  def setTimeouts(self, timeouts: dict[str, tuple[float, float]]):
+    self.client.setTimeouts(timeouts)
+    return self
+
+  def build(self):
+    self.client.build()
+    return self
+
+  async def createTeam(self, team_name: str) -> int:
+    return await self.sender.call(self.client.createTeam, team_name)
+
+  async def addTeamMember(self, team_id: int, user_id: int):
+    await self.sender.call(self.client.addTeamMember, team_id, user_id)
+
+  async def removeTeamMember(self, team_id: int, user_id: int):
+    await self.sender.call(self.client.removeTeamMember, team_id, user_id)
+
+  async def getTeamMembers(self, team_id: int) -> list[int]:
+    return await self.sender.call(self.client.getTeamMembers, team_id)
+
+  async def getMyTeams(self) -> dict[int, str]:
+    return await self.sender.call(self.client.getMyTeams)
+
+  async def createGame(self, team_id_1: int, team_id_2: int, board_size: int = 20, target: int = 10) -> int:
+    return await self.sender.call(self.client.createGame, team_id_1, team_id_2, board_size, target)
+
+  async def getMyGames(self) -> dict[int, str]:
+    return await self.sender.call(self.client.getMyGames)
+
+  async def makeMove(self, game_id: int, team_id: int, move: tuple[int, int]) -> int:
+    return await self.sender.call(self.client.makeMove, game_id, team_id, move)
+
+  async def getMoves(self, game_id: int, count: int = 20) -> list[MoveData]:
+    return await self.sender.call(self.client.getMoves, game_id, count)
+
+  async def getGameDetails(self, game_id: int) -> GameData:
+    return await self.sender.call(self.client.getGameDetails, game_id)
+
+  async def getBoardMoves(self, game_id: int) -> dict[tuple[int, int], int]:
+    return await self.sender.call(self.client.getBoardMoves, game_id)
+
+  async def getBoardString(self, game_id: int) -> str:
+    return await self.sender.call(self.client.getBoardString, game_id)
+
+  async def getBoardObject(self, game_id: int, board_class: type = Board):
+    return await self.sender.call(self.client.getBoardObject, game_id, board_class)
+
+  async def getGameState(self, game_id: int, board_class: type = Board) -> tuple[GameData, Board]:
+    r"""
+    Gets the details and the board of a game like HttpGameClient.getGameState, with both requests in flight at once.
+    """
+    details, board = await asyncio.gather(self.getGameDetails(game_id), self.getBoardObject(game_id, board_class))
+    return details, board
@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+from BitBoard import BitBoard
+from Board import TEXT_TO_CELLS, Board, chain_evaluation
+from Search import SearchEngine
+from Tactics import find_forcing_move
+from TranspositionTable import TranspositionTable
+from VectorEval import generate_moves_vectorized
+
+DEFAULT_POSITIONS: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "positions.txt")
+# Report compared with by --baseline without a file. Regenerate it after a deliberate change to the search
+# or on new reference hardware with: python Benchmark.py --output benchmarks/baseline.json
+# Its rates only hold on the machine that made it, its node counts hold everywhere.
+DEFAULT_BASELINE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json")
+# Components and searches are timed for at least this many seconds
+DEFAULT_MIN_TIME: float = 0.2
+# A rate this much lower than the baseline is a regression
+DEFAULT_TOLERANCE: float = 0.15
+# Searches are repeated at least this many times and until min_time, the fastest run counts
+DEFAULT_SEARCH_RUNS: int = 3
+# Searches faster than this are too noisy to gate on their rate, only their node counts are compared
+MIN_GATED_SEARCH_TIME: float = 0.05
+
+
+@dataclass
+class Position:
+  name: str
+  target: int
+  symbol: int
+  board: Board
+
+
+def load_positions(path: str = DEFAULT_POSITIONS) -> list[Position]:
+  r"""
+  Reads a position file. Positions are separated by blank lines, each is a header line
+  "name target side-to-move" followed by the rows of the board in the Board.from_string format.
+  Lines starting with # are comments.
+  """
+  positions = []
+  with open(path) as file:
+    blocks = file.read().split("\n\n")
+  for block in blocks:
+    lines = [line for line in block.strip().split("\n") if line and not line.startswith("#")]
+    if not lines:
+      continue
+    name, target, side = lines[0].split()
+    positions.append(Position(name, int(target), TEXT_TO_CELLS[side], Board.from_string("\n".join(lines[1:]))))
+  return positions
+
+
+def rate(function: Callable[[], object], min_time: float = DEFAULT_MIN_TIME) -> dict:
+  r"""
+  Calls the function until min_time has passed, at least once.
+  :return: Number of calls, seconds and calls per second
+  """
+  calls = 0
+  start = time.perf_counter()
+  elapsed = 0.0
+  while calls == 0 or elapsed < min_time:
+    function()
+    calls += 1
+    elapsed = time.perf_counter() - start
+  return {"calls": calls, "seconds": round(elapsed, 4), "rate": round(calls / elapsed, 2)}
+
+
+def make_unmake(board: Board, symbol: int):
+  # Every candidate placed and removed, which updates the winner and the evaluation incrementally
+  for x, y in list(board.candidate_cells()):
+    board.make_move(x, y, symbol)
+    board.unmake_move(x, y)
+
+
+def bench_components(position: Position, min_time: float = DEFAULT_MIN_TIME) -> dict:
+  board, symbol, target = position.board, position.symbol, position.target
+  bitboard = BitBoard.from_board(board)
+  components = {
+    "generate_moves": lambda: board.generate_moves(symbol, target),
+    "generate_moves_vectorized": lambda: generate_moves_vectorized(board, symbol, target),
+    "bitboard_generate_moves": lambda: bitboard.generate_moves(symbol, target),
+    "chain_evaluation": lambda: chain_evaluation(board),
+    "scan_winner": lambda: board.scan_winner(target),
+    "make_unmake": lambda: make_unmake(board, symbol),
+    "tactics": lambda: find_forcing_move(board, symbol, target),
+  }
+  return {name: rate(function, min_time) for name, function in components.items()}
+
+
+def deepen(position: Position, depth: int, tt_megabytes: float) -> tuple[list[dict], int, float]:
+  r"""
+  Searches depth 1, 2... depth with a new engine, like iterative deepening without a deadline.
+  :return: Move, nodes and time to reach each depth, total nodes and seconds
+  """
+  board, symbol, target = position.board, position.symbol, position.target
+  engine = SearchEngine(TranspositionTable(tt_megabytes))
+  engine.new_search()
+  pv: list[tuple[int, int]] = []
+  depths = []
+  start = time.perf_counter()
+  for current in range(1, depth + 1):
+    move = engine.search(board, symbol, target, current, pv=pv)
+    pv = engine.principal_variation(board, symbol, current)
+    depths.append({
+      "depth": current,
+      "move": [int(move.moveX), int(move.moveY)],
+      "nodes": engine.stats.nodes,
+      "time_to_depth": round(time.perf_counter() - start, 4),
+    })
+  return depths, engine.stats.nodes, time.perf_counter() - start
+
+
+def bench_search(position: Position, depth: int, min_time: float = DEFAULT_MIN_TIME, tt_megabytes: float = 64,
+                 runs: int = DEFAULT_SEARCH_RUNS) -> dict:
+  r"""
+  Deepens to depth at least runs times and until min_time has passed, each time with a new engine,
+  and keeps the fastest run, which is the least disturbed by the rest of the machine.
+  Then repeats the deepest search alone with tracemalloc on, for its peak memory.
+  :return: Nodes, time to reach each depth and nodes per second of the fastest run
+  """
+  board, symbol, target = position.board, position.symbol, position.target
+  depth = min(depth, int((board.board == 0).sum()))
+  best = None
+  done = 0
+  start = time.perf_counter()
+  while done < runs or time.perf_counter() - start < min_time:
+    run = deepen(position, depth, tt_megabytes)
+    if best is None or run[2] < best[2]:
+      best = run
+    done += 1
+  depths, nodes, elapsed = best
+
+  tracemalloc.start()
+  engine = SearchEngine(TranspositionTable(tt_megabytes))
+  engine.new_search()
+  engine.search(board, symbol, target, depth)
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return {
+    "depth": depth,
+    "nodes": nodes,
+    "runs": done,
+    "seconds": round(elapsed, 4),
+    "rate": round(nodes / elapsed, 2) if elapsed else 0.0,
+    "peak_kib": round(peak / 1024, 1),
+    "depths": depths,
+  }
+
+
+def run(positions: list[Position], depth: int, min_time: float = DEFAULT_MIN_TIME, tt_megabytes: float = 64,
+        components: bool = True, search: bool = True, search_runs: int = DEFAULT_SEARCH_RUNS) -> dict:
+  results = {}
+  for position in positions:
+    result = {"size": position.board.size, "target": position.target}
+    if components:
+      result["components"] = bench_components(position, min_time)
+    if search:
+      result["search"] = bench_search(position, depth, min_time, tt_megabytes, search_runs)
+    results[position.name] = result
+    print(f"{position.name}: done", file=sys.stderr)
+  return {
+    "python": platform.python_version(),
+    "machine": platform.machine(),
+    "depth": depth,
+    "positions": results,
+  }
+
+
+def rates(report: dict) -> dict[str, float]:
+  r"""
+  Flattens a report to its rates, by "position/component", the search under "position/search".
+  Searches faster than MIN_GATED_SEARCH_TIME are left out.
+  """
+  flat = {}
+  for name, result in report["positions"].items():
+    for component, measured in result.get("components", {}).items():
+      flat[f"{name}/{component}"] = measured["rate"]
+    if "search" in result and result["search"]["seconds"] >= MIN_GATED_SEARCH_TIME:
+      flat[f"{name}/search"] = result["search"]["rate"]
+  return flat
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> dict:
+  r"""
+  Compares the rates of a report to a baseline report, a search only when it took long enough in both.
+  Node counts of the search are compared too. They do not depend on the machine, so a search that needs more
+  nodes than the baseline by more than tolerance is a regression under "position/search_nodes", whatever its time.
+  :param tolerance: Fraction a rate may drop below the baseline before it counts as a regression
+  :return: Regressions and improvements as ratios to the baseline, and searches whose node counts changed
+  """
+  current, previous = rates(report), rates(baseline)
+  regressions, improvements = {}, {}
+  for key, value in current.items():
+    if not previous.get(key):
+      continue
+    ratio = round(value / previous[key], 3)
+    if ratio < 1 - tolerance:
+      regressions[key] = ratio
+    elif ratio > 1 + tolerance:
+      improvements[key] = ratio
+  changed_nodes = {}
+  for name, result in report["positions"].items():
+    old = baseline["positions"].get(name, {}).get("search")
+    if "search" in result and old is not None and old["depth"] == result["search"]["depth"]:
+      if old["nodes"] != result["search"]["nodes"]:
+        changed_nodes[name] = {"baseline": old["nodes"], "current": result["search"]["nodes"]}
+      if old["nodes"] and result["search"]["nodes"] > old["nodes"] * (1 + tolerance):
+        regressions[f"{name}/search_nodes"] = round(result["search"]["nodes"] / old["nodes"], 3)
+  return {"regressions": regressions, "improvements": improvements, "changed_nodes": changed_nodes}
+
+
+def setupArgs() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description="Benchmark move generation, evaluation and search on fixed positions")
+  parser.add_argument(
+    "--positions",
+    type=str,
+    help="Position file",
+    default=DEFAULT_POSITIONS
+  )
+  parser.add_argument(
+    "--only",
+    type=str,
+    nargs="*",
+    help="Names or name prefixes of the positions to run, all by default"
+  )
+  parser.add_argument(
+    "--depth",
+    type=int,
+    help="Depth of the searches",
+    default=3
+  )
+  parser.add_argument(
+    "--min-time",
+    type=float,
+    help="Seconds each component and search is timed for",
+    default=DEFAULT_MIN_TIME
+  )
+  parser.add_argument(
+    "--tt-size",
+    type=float,
+    help="Memory budget of the transposition table in megabytes",
+    default=64
+  )
+  parser.add_argument(
+    "--components",
+    action=argparse.BooleanOptionalAction,
+    help="Time move generation, evaluation, winner checks and tactics",
+    default=True
+  )
+  parser.add_argument(
+    "--search",
+    action=argparse.BooleanOptionalAction,
+    help="Time searches to --depth",
+    default=True
+  )
+  parser.add_argument(
+    "--search-runs",
+    type=int,
+    help="Times each search is at least repeated, the fastest run is reported",
+    default=DEFAULT_SEARCH_RUNS
+  )
+  parser.add_argument(
+    "--output",
+    type=str,
+    help="Write the report to this file instead of standard output"
+  )
+  parser.add_argument(
+    "--baseline",
+    type=str,
+    nargs="?",
+    const=DEFAULT_BASELINE,
+    help="Report of an earlier run to compare with, benchmarks/baseline.json without a file. "
+         "Regressions make the exit code 1"
+  )
+  parser.add_argument(
+    "--tolerance",
+    type=float,
+    help="Fraction a rate may drop below the baseline before it is a regression",
+    default=DEFAULT_TOLERANCE
+  )
+  return parser
+
+
+def main(argv: list[str]) -> int:
+  args = setupArgs().parse_args(argv[1:])
+  positions = load_positions(args.positions)
+  if args.only:
+    positions = [position for position in positions if any(position.name.startswith(name) for name in args.only)]
+  report = run(positions, args.depth, args.min_time, args.tt_size, args.components, args.search, args.search_runs)
+  if args.baseline is not None:
+    with open(args.baseline) as file:
+      report["comparison"] = compare(report, json.load(file), args.tolerance)
+
+  text = json.dumps(report, indent=2)
+  if args.output is not None:
+    with open(args.output, "w") as file:
+      file.write(text + "\n")
+  else:
+    print(text)
+
+  if args.baseline is not None and report["comparison"]["regressions"]:
+    print(f"Regressions: {report['comparison']['regressions']}", file=sys.stderr)
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
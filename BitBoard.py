@@ -0,0 +1,263 @@
+import numpy as np
+from functools import lru_cache
+from typing import Iterator
+from Board import CELLS_TO_TEXT, TEXT_TO_CELLS, DEFAULT_RADIUS, Move, spiral_order, zobrist_keys
+
+
+@lru_cache(maxsize=None)
+def bit_layout(size: int) -> tuple[int, int, int, int, list[int]]:
+  r"""
+  Precomputed masks for a size x size bitboard.
+  Cell (x, y) is bit x * (size + 1) + y, the extra column per row stays empty
+  so shifting a row, column or diagonal never wraps onto the next row.
+  :return: Row stride, mask of all cells, mask of the main diagonal, mask of the main anti-diagonal,
+           spiral rank of every bit index
+  """
+  stride = size + 1
+  cells = 0
+  diagonal = 0
+  anti_diagonal = 0
+  for x in range(size):
+    for y in range(size):
+      cells |= 1 << (x * stride + y)
+    diagonal |= 1 << (x * stride + x)
+    anti_diagonal |= 1 << (x * stride + size - 1 - x)
+  ranks = [0] * (size * stride)
+  for rank, (x, y) in enumerate(spiral_order(size)):
+    ranks[x * stride + y] = rank
+  return stride, cells, diagonal, anti_diagonal, ranks
+
+
+def chain_score(bits: int, shift: int) -> int:
+  # chain_evaluation of one player's stones along one direction: a stone with j equal stones
+  # before it in the line scores 10 ** j. A window of k stones is a set bit in `windows`
+  # after k - 1 rounds, so the stones with exactly j predecessors are the difference of two rounds.
+  score = 0
+  power = 1
+  windows = bits
+  count = windows.bit_count()
+  while windows:
+    windows &= windows >> shift
+    next_count = windows.bit_count()
+    score += power * (count - next_count)
+    count = next_count
+    power *= 10
+  return score
+
+
+class BitBoard:
+  r"""
+  Board backed by one Python int bitboard per player.
+  It has the same public API as Board, so it can be used by minmax and the bot in its place.
+  Lines are checked with shift-and-AND operations over the whole board at once.
+  """
+  def __init__(self, size: int, radius: int = DEFAULT_RADIUS):
+    self.size: int = size
+    self.radius: int = radius
+    self.stride, self.cells, self.diagonal, self.anti_diagonal, self.ranks = bit_layout(size)
+    # Shifts that move a bit one step along a row, column, diagonal and anti-diagonal
+    self.shifts: tuple[int, ...] = (1, self.stride, self.stride + 1, self.stride - 1)
+    self.bits: dict[int, int] = {1: 0, -1: 0}
+    self.history: list[tuple[int, int]] = []
+    # Zobrist hash with the same keys as Board, so both backends agree on positions
+    self.keys = zobrist_keys(size)
+    self.hash: int = 0
+    # Calls of winner() on this board, read by the search statistics
+    self.winner_calls: int = 0
+
+  @classmethod
+  def from_string(cls, string: str):
+    rows = string.strip().split("\n")
+    size = len(rows)
+    board = cls(size)
+    for i, line in enumerate(rows):
+      for j, cell in enumerate(line):
+        if TEXT_TO_CELLS[cell] != 0:
+          board.bits[TEXT_TO_CELLS[cell]] |= board.bit(i, j)
+    board.rehash()
+    return board
+
+  @classmethod
+  def from_board(cls, other):
+    r"""
+    Creates a bitboard with the same stones and radius as another board.
+    :param other: Board or BitBoard
+    :return: BitBoard
+    """
+    board = cls(other.size, other.radius)
+    for (x, y), symbol in np.ndenumerate(other.board):
+      if symbol != 0:
+        board.bits[int(symbol)] |= board.bit(x, y)
+    board.rehash()
+    return board
+
+  @property
+  def board(self) -> np.ndarray:
+    r"""
+    The cells as an array, in the layout of Board.board. Writing to it does not change the bitboard.
+    """
+    cells = np.zeros((self.size, self.size), dtype=int)
+    for x in range(self.size):
+      for y in range(self.size):
+        cells[x, y] = self.cell(x, y)
+    return cells
+
+  def copy(self):
+    new_board = BitBoard(self.size, self.radius)
+    new_board.bits = self.bits.copy()
+    new_board.history = self.history.copy()
+    new_board.hash = self.hash
+    return new_board
+
+  def fill_from_moves_dict(self, moves: dict[tuple[int, int], int]):
+    for (x, y), symbol in moves.items():
+      self.bits[1] &= ~self.bit(x, y)
+      self.bits[-1] &= ~self.bit(x, y)
+      if symbol != 0:
+        self.bits[symbol] |= self.bit(x, y)
+    self.history.clear()
+    self.rehash()
+
+  def rehash(self):
+    self.hash = 0
+    for x in range(self.size):
+      for y in range(self.size):
+        symbol = self.cell(x, y)
+        if symbol != 0:
+          self.hash ^= self.keys[symbol][x][y]
+
+  def set_radius(self, radius: int):
+    self.radius = radius
+
+  def bit(self, x: int, y: int) -> int:
+    return 1 << (x * self.stride + y)
+
+  def cell(self, x: int, y: int) -> int:
+    mask = self.bit(x, y)
+    if self.bits[1] & mask:
+      return 1
+    if self.bits[-1] & mask:
+      return -1
+    return 0
+
+  def is_in_range(self, x: int, y: int) -> bool:
+    return 0 <= x < self.size and 0 <= y < self.size
+
+  def is_valid_move(self, x: int, y: int) -> bool:
+    return self.is_in_range(x, y) and not (self.bits[1] | self.bits[-1]) & self.bit(x, y)
+
+  def has_run(self, symbol: int, target: int) -> bool:
+    # A run of `target` stones is a bit that survives ANDing the board with itself shifted
+    # 1..target-1 steps; doubling the covered length each round needs only log2(target) rounds.
+    stones = self.bits[symbol]
+    for shift in self.shifts:
+      windows = stones
+      length = 1
+      while windows and length < target:
+        step = min(length, target - length)
+        windows &= windows >> (step * shift)
+        length += step
+      if windows:
+        return True
+    return False
+
+  def winner(self, target: int) -> int:
+    self.winner_calls += 1
+    if self.has_run(1, target):
+      return 1
+    if self.has_run(-1, target):
+      return -1
+    return 0
+
+  def evaluation(self) -> int:
+    # Same value as chain_evaluation, the two main diagonals are counted twice there
+    score = 0
+    for symbol in (1, -1):
+      stones = self.bits[symbol]
+      if not stones:
+        continue
+      player_score = sum(chain_score(stones, shift) for shift in self.shifts)
+      player_score += chain_score(stones & self.diagonal, self.stride + 1)
+      player_score += chain_score(stones & self.anti_diagonal, self.stride - 1)
+      score += symbol * player_score
+    return score
+
+  def neighbourhood(self) -> int:
+    # Empty cells within radius of a stone
+    occupied = self.bits[1] | self.bits[-1]
+    near = occupied
+    for _ in range(self.radius):
+      grown = near
+      for shift in self.shifts:
+        grown |= (near << shift) | (near >> shift)
+      near = grown & self.cells
+    return near & ~occupied
+
+  def candidate_cells(self) -> Iterator[tuple[int, int]]:
+    near = self.neighbourhood() if self.radius > 0 else 0
+    if near == 0:
+      occupied = self.bits[1] | self.bits[-1]
+      for x, y in spiral_order(self.size):
+        if not occupied & self.bit(x, y):
+          yield x, y
+      return
+    indices = []
+    while near:
+      lowest = near & -near
+      indices.append(lowest.bit_length() - 1)
+      near ^= lowest
+    indices.sort(key=self.ranks.__getitem__)
+    for index in indices:
+      yield divmod(index, self.stride)
+
+  def generate_moves(self, symbol: int, target: int) -> list[Move]:
+    return list(self.iter_moves(symbol, target))
+
+  def iter_moves(self, symbol: int, target: int) -> Iterator[Move]:
+    if self.winner(target) != 0:
+      return
+    for x, y in self.candidate_cells():
+      self.make_move(x, y, symbol)
+      move_score = self.evaluation()
+      self.unmake_move(x, y)
+      yield Move(symbol, x, y, move_score)
+
+  def is_full(self) -> bool:
+    return (self.bits[1] | self.bits[-1]) == self.cells
+
+  def make_move(self, x: int, y: int, symbol: int):
+    if symbol == 0:
+      self.unmake_move(x, y)
+      return
+    previous = self.cell(x, y)
+    if previous != 0:
+      self.hash ^= self.keys[previous][x][y]
+    mask = self.bit(x, y)
+    self.bits[-symbol] &= ~mask
+    self.bits[symbol] |= mask
+    self.hash ^= self.keys[symbol][x][y]
+    self.history.append((x, y))
+
+  def unmake_move(self, x: int, y: int):
+    previous = self.cell(x, y)
+    if previous != 0:
+      self.hash ^= self.keys[previous][x][y]
+    mask = ~self.bit(x, y)
+    self.bits[1] &= mask
+    self.bits[-1] &= mask
+    if self.history and self.history[-1] == (x, y):
+      self.history.pop()
+
+  def __str__(self):
+    result = ""
+    tile_width = len(str(self.size - 1))
+    result += " " * tile_width + " "
+    for i in range(self.size):
+      result += f"{i:>{tile_width}} "
+    result += "\n"
+    for i in range(self.size):
+      result += f"{i:>{tile_width}} "
+      for j in range(self.size):
+        result += f"{CELLS_TO_TEXT[self.cell(i, j)]:>{tile_width}} "
+      result += "\n"
+    return result
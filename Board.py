@@ -1,5 +1,8 @@
 import numpy as np
+import random
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator
 
 CELLS_TO_TEXT: dict[int, str] = {
   -1: "O",
@@ -13,6 +16,51 @@ TEXT_TO_CELLS: dict[str, int] = {
   "X": 1
 }
 
+# Line directions through a cell: row, column, diagonal, anti-diagonal
+DIRECTIONS: tuple[tuple[int, int], ...] = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Moves are only generated within this distance of placed stones, 0 considers the whole board
+DEFAULT_RADIUS: int = 2
+
+@lru_cache(maxsize=None)
+def spiral_order(n: int) -> tuple[tuple[int, int], ...]:
+  # Cells of an n x n board spiralling outwards from the centre
+  order: list[tuple[int, int]] = []
+  a = b = n//2
+  low_row = 0 if 0 > a else a
+  low_column = 0 if 0 > b else b - 1
+  high_row = n - 1 if (a + 1) >= n else a + 1
+  high_column = n - 1 if (b + 1) >= n else b + 1
+  
+  while low_row > 0 - n and low_column > 0 - n:
+    for i in range(low_column + 1, high_column + 1):
+      if i < n and low_row >= 0:
+        order.append((low_row, i))
+    low_row -= 1
+    
+    for i in range(low_row + 2, high_row + 1):
+      if i < n and high_column < n:
+        order.append((i, high_column))
+    high_column += 1
+    
+    for i in range(high_column - 2, low_column - 1, -1):
+      if i >= 0 and high_row < n:
+        order.append((high_row, i))
+    high_row += 1
+    
+    for i in range(high_row - 2, low_row, -1):
+      if i >= 0 and low_column >= 0:
+        order.append((i, low_column))
+    low_column -= 1
+  
+  return tuple(order)
+
+@lru_cache(maxsize=None)
+def zobrist_keys(n: int) -> dict[int, list[list[int]]]:
+  # Random 64-bit key per symbol and cell, the same for every board of size n
+  rng = random.Random(n)
+  return {symbol: [[rng.getrandbits(64) for _ in range(n)] for _ in range(n)] for symbol in (1, -1)}
+
 @dataclass
 class Move:
   symbol: int
@@ -20,10 +68,44 @@ class Move:
   moveY: int
   score: int
 
+@lru_cache(maxsize=None)
+def spiral_ranks(n: int) -> list[list[int]]:
+  # Position of every cell in spiral_order(n)
+  ranks = [[0] * n for _ in range(n)]
+  for rank, (x, y) in enumerate(spiral_order(n)):
+    ranks[x][y] = rank
+  return ranks
+
+@lru_cache(maxsize=None)
+def neighbour_ranks(n: int, radius: int) -> list[list[int]]:
+  # Spiral ranks of the cells within `radius` (Chebyshev distance) of each cell, indexed by spiral rank
+  ranks = spiral_ranks(n)
+  neighbours = []
+  for x, y in spiral_order(n):
+    neighbours.append([
+      ranks[i][j]
+      for i in range(max(0, x - radius), min(n, x + radius + 1))
+      for j in range(max(0, y - radius), min(n, y + radius + 1))
+      if (i, j) != (x, y)
+    ])
+  return neighbours
+
 class Board:
-  def __init__(self, size: int):
+  def __init__(self, size: int, radius: int = DEFAULT_RADIUS):
     self.size: int = size
+    self.radius: int = radius
     self.board = np.zeros((size, size), dtype=int)
+    # Longest run of each symbol anywhere on the board, kept up to date by make_move
+    self.longest_runs: dict[int, int] = {1: 0, -1: 0}
+    # Undo stack of (x, y, longest X run, longest O run) before each move
+    self.history: list[tuple[int, int, int, int]] = []
+    # Zobrist hash of the position, XOR of the keys of all placed stones
+    self.keys = zobrist_keys(size)
+    self.hash: int = 0
+    # Calls of winner() on this board, read by the search statistics
+    self.winner_calls: int = 0
+    self.evaluator = ChainEvaluator(self)
+    self.candidates = CandidateSet(self, radius)
     
   @classmethod
   def from_string(cls, string: str):
@@ -33,16 +115,74 @@ class Board:
     for i, line in enumerate(rows):
       for j, cell in enumerate(line):
         board.board[i][j] = TEXT_TO_CELLS[cell]
+    board.refresh()
     return board
   
   def copy(self):
-    new_board = Board(self.size)
+    new_board = Board(self.size, self.radius)
     new_board.board = self.board.copy()
+    new_board.longest_runs = self.longest_runs.copy()
+    new_board.history = self.history.copy()
+    new_board.hash = self.hash
+    new_board.evaluator = self.evaluator.copy(new_board)
+    new_board.candidates = self.candidates.copy(new_board)
     return new_board
   
   def fill_from_moves_dict(self, moves: dict[tuple[int, int], int]):
     for (x, y), symbol in moves.items():
       self.board[x, y] = symbol
+    self.refresh()
+
+  def set_radius(self, radius: int):
+    self.radius = radius
+    self.candidates = CandidateSet(self, radius)
+
+  def refresh(self):
+    # Rebuilds the incremental state after self.board was written directly
+    self.history.clear()
+    self.longest_runs = {1: 0, -1: 0}
+    self.hash = 0
+    for x, y in zip(*np.nonzero(self.board)):
+      self.hash ^= self.keys[int(self.board[x, y])][x][y]
+    n = self.size
+    flipped = np.fliplr(self.board)
+    lines = [*self.board, *self.board.T]
+    lines += [self.board.diagonal(k) for k in range(1 - n, n)]
+    lines += [flipped.diagonal(k) for k in range(1 - n, n)]
+    for line in lines:
+      previous = 0
+      count = 0
+      for cell in line.tolist():
+        count = count + 1 if cell == previous else 1
+        previous = cell
+        if cell != 0 and count > self.longest_runs[cell]:
+          self.longest_runs[cell] = count
+    self.evaluator.reset()
+    self.candidates.reset()
+
+  def evaluation(self) -> int:
+    # Same value as chain_evaluation(self), maintained incrementally
+    return self.evaluator.score
+
+  def run_length(self, x: int, y: int, dx: int, dy: int, symbol: int) -> int:
+    # Number of consecutive `symbol` cells starting after (x, y) in direction (dx, dy)
+    count = 0
+    x += dx
+    y += dy
+    while self.is_in_range(x, y) and self.board[x, y] == symbol:
+      count += 1
+      x += dx
+      y += dy
+    return count
+
+  def longest_run_through(self, x: int, y: int) -> int:
+    symbol = self.board[x, y]
+    if symbol == 0:
+      return 0
+    return max(
+      1 + self.run_length(x, y, dx, dy, symbol) + self.run_length(x, y, -dx, -dy, symbol)
+      for dx, dy in DIRECTIONS
+    )
 
   def is_in_range(self, x: int, y: int) -> bool:
     return 0 <= x < self.size and 0 <= y < self.size
@@ -50,7 +190,16 @@ class Board:
   def is_valid_move(self, x: int, y: int) -> bool:
     return self.is_in_range(x, y) and self.board[x, y] == 0
     
-  def winner(self, target: int):
+  def winner(self, target: int) -> int:
+    self.winner_calls += 1
+    if self.longest_runs[1] >= target:
+      return 1
+    if self.longest_runs[-1] >= target:
+      return -1
+    return 0
+
+  def scan_winner(self, target: int) -> int:
+    # Full board rescan, kept to validate the incremental winner
     size = self.size
     
     # Check rows
@@ -167,63 +316,57 @@ class Board:
     return 0
 
   def generate_moves(self, symbol: int, target: int) -> list[Move]:
-    n = self.size
-    move_list: list[Move] = []
-    current_move: Board
+    return list(self.iter_moves(symbol, target))
 
+  def iter_moves(self, symbol: int, target: int) -> Iterator[Move]:
+    # Lazily scores the candidate cells in spiral order, so a caller that stops early skips the rest.
+    # Each candidate is placed and removed on this board, which is unchanged between yields.
     if self.winner(target) != 0:
-      return move_list
-    
-    a = b = n//2
-    low_row = 0 if 0 > a else a
-    low_column = 0 if 0 > b else b - 1
-    high_row = n - 1 if (a + 1) >= n else a + 1
-    high_column = n - 1 if (b + 1) >= n else b + 1
-    
-    while low_row > 0 - n and low_column > 0 - n:
-      for i in range(low_column + 1, high_column + 1):
-        if i < n and low_row >= 0:
-          if self.board[low_row, i] == 0:
-            current_move = self.copy()
-            current_move.board[low_row, i] = symbol
-            move_score = chain_evaluation(current_move)
-            move_list.append(Move(symbol, low_row, i, move_score))
-      low_row -= 1
-      
-      for i in range(low_row + 2, high_row + 1):
-        if i < n and high_column < n:
-          if self.board[i, high_column] == 0:
-            current_move = self.copy()
-            current_move.board[i, high_column] = symbol
-            move_score = chain_evaluation(current_move)
-            move_list.append(Move(symbol, i, high_column, move_score))
-      high_column += 1
-      
-      for i in range(high_column - 2, low_column - 1, -1):
-        if i >= 0 and high_row < n:
-          if self.board[high_row, i] == 0:
-            current_move = self.copy()
-            current_move.board[high_row, i] = symbol
-            move_score = chain_evaluation(current_move)
-            move_list.append(Move(symbol, high_row, i, move_score))
-      high_row += 1
-      
-      for i in range(high_row - 2, low_row, -1):
-        if i >= 0 and low_column >= 0:
-          if self.board[i, low_column] == 0:
-            current_move = self.copy()
-            current_move.board[i, low_column] = symbol
-            move_score = chain_evaluation(current_move)
-            move_list.append(Move(symbol, i, low_column, move_score))
-      low_column -= 1
-      
-    return move_list
+      return
+    for x, y in self.candidate_cells():
+      self.make_move(x, y, symbol)
+      move_score = self.evaluation()
+      self.unmake_move(x, y)
+      yield Move(symbol, x, y, move_score)
+
+  def candidate_cells(self) -> Iterator[tuple[int, int]]:
+    # Empty cells worth trying, in spiral order
+    for x, y in self.candidates.cells():
+      if self.board[x, y] == 0:
+        yield x, y
   
   def is_full(self) -> bool:
     return np.all(self.board != 0)
     
   def make_move(self, x: int, y: int, symbol: int):
+    if symbol == 0:
+      self.unmake_move(x, y)
+      return
+    if self.board[x, y] != 0:
+      # Overwriting a stone can shorten runs, so fall back to a rescan
+      self.board[x, y] = symbol
+      self.refresh()
+      return
+    self.history.append((x, y, self.longest_runs[1], self.longest_runs[-1]))
     self.board[x, y] = symbol
+    self.hash ^= self.keys[symbol][x][y]
+    self.evaluator.apply(x, y)
+    self.candidates.add(x, y)
+    run = self.longest_run_through(x, y)
+    if run > self.longest_runs[symbol]:
+      self.longest_runs[symbol] = run
+
+  def unmake_move(self, x: int, y: int):
+    if not self.history or self.history[-1][:2] != (x, y):
+      # Not the last move made, the previous state is unknown
+      self.board[x, y] = 0
+      self.refresh()
+      return
+    _, _, self.longest_runs[1], self.longest_runs[-1] = self.history.pop()
+    self.hash ^= self.keys[int(self.board[x, y])][x][y]
+    self.board[x, y] = 0
+    self.evaluator.undo()
+    self.candidates.remove(x, y)
   
   def __str__(self):
     result = ""
@@ -278,38 +421,162 @@ def chain_evaluation(board: Board) -> int:
   return total_score
 
 
-def minmax(board: Board, depth: int, symbol: int, target: int, alpha: int = -10_000_000, beta: int = 10_000_000) -> Move:
-  if depth == 0:
-    score = chain_evaluation(board)
-    return Move(symbol, -1, -1, score)
+def score_line(cells: list[int]) -> int:
+  # eval_line of chain_evaluation over an already extracted line
+  score = 0
+  x_count = -1
+  o_count = -1
+  for cell in cells:
+    if cell == 1:
+      x_count += 1
+      score += 10 ** x_count
+      o_count = -1
+    elif cell == -1:
+      o_count += 1
+      score -= 10 ** o_count
+      x_count = -1
+    else:
+      o_count = -1
+      x_count = -1
+  return score
+
+
+@lru_cache(maxsize=None)
+def chain_lines(size: int) -> tuple[list[tuple[np.ndarray, np.ndarray]], list[int], list[list[list[int]]]]:
+  # The lines chain_evaluation scans, as index arrays, with the number of times each is scanned
+  # (the two main diagonals are visited twice) and the lines crossing every cell
+  starts = []
+  for i in range(size):
+    starts += [(i, 0, 0, 1), (0, i, 1, 0), (0, i, 1, 1), (i, 0, 1, 1), (0, i, 1, -1), (i, size - 1, 1, -1)]
+  weights_by_cells: dict[tuple[tuple[int, int], ...], int] = {}
+  for x, y, dx, dy in starts:
+    cells = []
+    while 0 <= x < size and 0 <= y < size:
+      cells.append((x, y))
+      x += dx
+      y += dy
+    key = tuple(cells)
+    weights_by_cells[key] = weights_by_cells.get(key, 0) + 1
+  
+  lines = []
+  weights = []
+  cell_lines: list[list[list[int]]] = [[[] for _ in range(size)] for _ in range(size)]
+  for index, (cells, weight) in enumerate(weights_by_cells.items()):
+    lines.append((np.array([x for x, _ in cells]), np.array([y for _, y in cells])))
+    weights.append(weight)
+    for x, y in cells:
+      cell_lines[x][y].append(index)
+  return lines, weights, cell_lines
+
+
+class ChainEvaluator:
+  r"""
+  Keeps chain_evaluation of a board up to date with a per-line score cache.
+  A move only re-scores the lines crossing the changed cell, undo rolls the deltas back.
+  """
+  def __init__(self, board: Board):
+    self.board = board
+    self.lines, self.weights, self.cell_lines = chain_lines(board.size)
+    self.line_scores: list[int] = [0] * len(self.lines)
+    self.score: int = 0
+    self.history: list[list[tuple[int, int]]] = []
+    self.reset()
   
-  next_moves = board.generate_moves(symbol, target)
+  def copy(self, board: Board):
+    evaluator = ChainEvaluator.__new__(ChainEvaluator)
+    evaluator.board = board
+    evaluator.lines, evaluator.weights, evaluator.cell_lines = self.lines, self.weights, self.cell_lines
+    evaluator.line_scores = self.line_scores.copy()
+    evaluator.score = self.score
+    evaluator.history = self.history.copy()
+    return evaluator
   
-  if not next_moves:
-    score = chain_evaluation(board)
-    return Move(symbol, -1, -1, score)
+  def score_line(self, line: int) -> int:
+    rows, columns = self.lines[line]
+    return score_line(self.board.board[rows, columns].tolist())
   
-  best_move = Move(symbol, -1, -1, -1000000)
+  def reset(self):
+    self.history.clear()
+    self.line_scores = [self.score_line(line) for line in range(len(self.lines))]
+    self.score = sum(score * weight for score, weight in zip(self.line_scores, self.weights))
   
-  for move in next_moves:
-    board.make_move(move.moveX, move.moveY, symbol)
-    
-    if symbol == 1:
-      score = minmax(board, depth - 1, -1, alpha, beta).score
-      if score > alpha:
-        alpha = score
-        best_move = move
-    else:
-      score = minmax(board, depth - 1, 1, alpha, beta).score
-      if score < beta:
-        beta = score
-        best_move = move
-    
-    board.make_move(move.moveX, move.moveY, 0)
-    
-    if alpha >= beta:
-      break
+  def apply(self, x: int, y: int):
+    # Called after cell (x, y) changed
+    changes = []
+    for line in self.cell_lines[x][y]:
+      old = self.line_scores[line]
+      new = self.score_line(line)
+      changes.append((line, old))
+      self.line_scores[line] = new
+      self.score += (new - old) * self.weights[line]
+    self.history.append(changes)
   
-  return best_move
+  def undo(self):
+    for line, old in self.history.pop():
+      self.score += (old - self.line_scores[line]) * self.weights[line]
+      self.line_scores[line] = old
 
 
+class CandidateSet:
+  r"""
+  Empty cells within `radius` of a placed stone, as a bitset indexed by spiral rank
+  so iterating the set bits visits the candidates in spiral order.
+  On an empty board, with radius 0 or when no cell qualifies, the whole board is used.
+  """
+  def __init__(self, board: Board, radius: int):
+    self.board = board
+    self.radius = radius
+    self.order = spiral_order(board.size)
+    self.ranks = spiral_ranks(board.size)
+    self.neighbours = neighbour_ranks(board.size, radius) if radius > 0 else [[] for _ in self.order]
+    # Number of stones within radius of each cell, by spiral rank
+    self.counts: list[int] = [0] * len(self.order)
+    self.near: int = 0
+    self.occupied: int = 0
+    self.reset()
+  
+  def copy(self, board: Board):
+    candidates = CandidateSet.__new__(CandidateSet)
+    candidates.board = board
+    candidates.radius = self.radius
+    candidates.order, candidates.ranks, candidates.neighbours = self.order, self.ranks, self.neighbours
+    candidates.counts = self.counts.copy()
+    candidates.near = self.near
+    candidates.occupied = self.occupied
+    return candidates
+  
+  def reset(self):
+    self.counts = [0] * len(self.order)
+    self.near = 0
+    self.occupied = 0
+    for x, y in zip(*np.nonzero(self.board.board)):
+      self.add(int(x), int(y))
+  
+  def add(self, x: int, y: int):
+    rank = self.ranks[x][y]
+    self.occupied |= 1 << rank
+    counts = self.counts
+    for neighbour in self.neighbours[rank]:
+      counts[neighbour] += 1
+      if counts[neighbour] == 1:
+        self.near |= 1 << neighbour
+  
+  def remove(self, x: int, y: int):
+    rank = self.ranks[x][y]
+    self.occupied &= ~(1 << rank)
+    counts = self.counts
+    for neighbour in self.neighbours[rank]:
+      counts[neighbour] -= 1
+      if counts[neighbour] == 0:
+        self.near &= ~(1 << neighbour)
+  
+  def cells(self) -> Iterator[tuple[int, int]]:
+    bits = self.near & ~self.occupied
+    if self.radius == 0 or bits == 0:
+      yield from self.order
+      return
+    order = self.order
+    while bits:
+      lowest = bits & -bits
+      yield order[lowest.bit_length() - 1]
+      bits ^= lowest
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from AsyncHttpGameClient import AsyncHttpGameClient
+from Board import DEFAULT_RADIUS, Board
+from GameTracker import GameTracker
+from HttpGameClient import GameData, endpoint_timeouts
+from OpeningBook import OpeningBook
+from ParallelSearch import pack_board, unpack_board
+from PollScheduler import PollScheduler
+from Search import DEFAULT_SAFETY_MARGIN, SearchEngine, table_key
+from SearchCache import SearchCache
+from Tactics import find_forcing_move
+from TranspositionTable import EXACT, TableEntry, TranspositionTable
+
+# Engines of a search worker process by (board size, target), kept between jobs
+worker_engines: dict[tuple[int, int], SearchEngine] = {}
+worker_tt_megabytes: float = 64
+
+
+def init_search_worker(tt_megabytes: float):
+  global worker_tt_megabytes
+  worker_tt_megabytes = tt_megabytes
+
+
+def search_job(packed: tuple[bytes, int, int], symbol: int, target: int, seconds: float | None, depth: int,
+               max_depth: int | None, tactics: bool) -> tuple[tuple[int, int], str, TableEntry | None]:
+  r"""
+  Finds a move in a worker process, with the tactical solver and then the search.
+  :param seconds: Time for iterative deepening, None searches to depth
+  :return: The move, where it came from and the root entry of the search for the cache
+  """
+  board = unpack_board(packed)
+  root_moves = None
+  if tactics:
+    tactic = find_forcing_move(board, symbol, target)
+    if tactic is not None and tactic.decisive:
+      return tactic.move, "tactics", None
+    if tactic is not None:
+      # Several defences against the opponent's forced win, the search picks one
+      root_moves = tactic.candidates
+  key = (board.size, target)
+  if key not in worker_engines:
+    worker_engines[key] = SearchEngine(TranspositionTable(worker_tt_megabytes))
+  engine = worker_engines[key]
+  if seconds is not None:
+    move = engine.iterative_deepening(board, symbol, target, time.monotonic() + seconds, max_depth, root_moves).move
+  else:
+    engine.new_search()
+    move = engine.search(board, symbol, target, depth, root_moves=root_moves)
+  return (move.moveX, move.moveY), "search", engine.table.probe(table_key(board, symbol))
+
+
+@dataclass
+class DaemonConfig:
+  depth: int = 5
+  radius: int = DEFAULT_RADIUS
+  time_budget: bool = False
+  safety_margin: float = DEFAULT_SAFETY_MARGIN
+  max_depth: int | None = None
+  tactics: bool = True
+  tt_megabytes: float = 64
+  poll_min: float = 0.1
+  poll_max: float = 2.0
+  # Seconds between getMyGames calls looking for new games
+  discovery_interval: float = 10.0
+
+
+@dataclass
+class DaemonGame:
+  details: GameData
+  team_id: int
+  symbol: int
+  tracker: GameTracker
+  scheduler: PollScheduler
+  next_poll: float = 0.0
+  # Set while a move of ours is queued or being searched
+  busy: bool = False
+  # Set from our move until the opponent's reply is seen, so only real replies count as response times
+  awaiting_reply: bool = False
+  turn_start: float = field(default_factory=time.monotonic)
+
+
+class BotDaemon:
+  r"""
+  Plays all active games of our teams from one process.
+  Games are found with getMyGames and picked up as they appear. One loop polls every game on the
+  delay its own PollScheduler asks for, with all due polls in flight together on one async client,
+  so they share one connection pool. When it is our turn in a game, the position goes on a queue
+  ordered by the end of the move clock. Searches run on a shared process pool, so the game
+  closest to its deadline is searched first. Book and cache lookups happen in this process and
+  one cache is shared by all games.
+  """
+  def __init__(self, client: AsyncHttpGameClient, team_ids: list[int], workers: int = 1,
+               config: DaemonConfig | None = None, book: OpeningBook | None = None, cache: SearchCache | None = None):
+    r"""
+    :param client: Built asynchronous client
+    :param team_ids: Our teams, games between other teams are ignored
+    :param workers: Number of search processes
+    :param config: Search and polling settings
+    :param book: Opening book to play from before searching
+    :param cache: Search cache shared by all games
+    """
+    self.client = client
+    self.team_ids = team_ids
+    self.workers = workers
+    self.config = config if config is not None else DaemonConfig()
+    self.book = book
+    self.cache = cache
+    self.games: dict[int, DaemonGame] = {}
+    self.finished: set[int] = set()
+    self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    self.order = itertools.count()
+    self.running = False
+
+  async def run(self):
+    r"""
+    Plays until stop is called.
+    """
+    self.running = True
+    with ProcessPoolExecutor(self.workers, initializer=init_search_worker,
+                             initargs=(self.config.tt_megabytes,)) as executor:
+      searchers = [asyncio.create_task(self.search_loop(executor)) for _ in range(self.workers)]
+      try:
+        await self.poll_loop()
+      finally:
+        for task in searchers:
+          task.cancel()
+        await asyncio.gather(*searchers, return_exceptions=True)
+
+  def stop(self):
+    self.running = False
+
+  async def discover(self):
+    for game_id in await self.client.getMyGames():
+      if game_id in self.games or game_id in self.finished:
+        continue
+      details = await self.client.getGameDetails(game_id)
+      teams = [team for team in (details.team1Id, details.team2Id) if team in self.team_ids]
+      if not teams or self.is_over(details):
+        self.finished.add(game_id)
+        continue
+      team_id = teams[0]
+      symbol = -1 if team_id == details.team1Id else 1
+      tracker = GameTracker(self.client, game_id, details.boardSize, Board, self.config.radius)
+      scheduler = PollScheduler(details.secondsPerMove, self.config.poll_min, self.config.poll_max)
+      self.games[game_id] = DaemonGame(details, team_id, symbol, tracker, scheduler)
+      print(f"Game {game_id}: playing as team {team_id}")
+    if self.games:
+      # The client is shared, so its timeouts follow the shortest move clock
+      clock = min(game.details.secondsPerMove for game in self.games.values())
+      self.client.setTimeouts(endpoint_timeouts(clock))
+
+  @staticmethod
+  def is_over(details: GameData) -> bool:
+    return details.winnerTeamId is not None or details.turnTeamId == -1
+
+  async def poll_loop(self):
+    next_discovery = 0.0
+    while self.running:
+      now = time.monotonic()
+      if now >= next_discovery:
+        try:
+          await self.discover()
+        except Exception as error:
+          # Games already known keep being polled, discovery is retried at the next interval
+          print(f"Discovery failed: {error}")
+        next_discovery = now + self.config.discovery_interval
+      due = [game for game in self.games.values() if not game.busy and game.next_poll <= now]
+      for game, error in zip(due, await asyncio.gather(*(self.poll(game) for game in due), return_exceptions=True)):
+        if isinstance(error, Exception):
+          print(f"Game {game.details.gameId}: poll failed: {error}")
+      waiting = [game.next_poll for game in self.games.values() if not game.busy]
+      wake = min(waiting + [next_discovery])
+      await asyncio.sleep(min(max(wake - time.monotonic(), 0.0), self.config.poll_max))
+
+  async def poll(self, game: DaemonGame):
+    game_id = game.details.gameId
+    start = time.monotonic()
+    game.next_poll = start + game.scheduler.next_delay()
+    details = await self.client.getGameDetails(game_id)
+    game.scheduler.record_poll(time.monotonic() - start)
+    game.details = details
+    if self.is_over(details):
+      print(f"Game {game_id}: over, winner {details.winnerTeamId}")
+      print(f"Game {game_id}: polling {game.scheduler.stats()}")
+      del self.games[game_id]
+      self.finished.add(game_id)
+      return
+    if details.turnTeamId != game.team_id:
+      return
+
+    if game.awaiting_reply and details.moves > game.tracker.move_count:
+      game.scheduler.opponent_moved()
+    game.awaiting_reply = False
+    game.turn_start = time.monotonic()
+    await self.sync(game)
+    game.busy = True
+    deadline = game.turn_start + details.secondsPerMove
+    await self.queue.put((deadline, next(self.order), game_id))
+
+  async def sync(self, game: DaemonGame):
+    tracker = game.tracker
+    count = tracker.moves_to_fetch(game.details)
+    if count == 0:
+      return
+    if count is not None and tracker.apply_fetched(await self.client.getMoves(tracker.game_id, count), count):
+      return
+    latest = await self.client.getMoves(tracker.game_id, 1)
+    tracker.reset(await self.client.getBoardMoves(tracker.game_id), latest)
+
+  async def search_loop(self, executor: ProcessPoolExecutor):
+    loop = asyncio.get_running_loop()
+    while True:
+      deadline, _, game_id = await self.queue.get()
+      game = self.games.get(game_id)
+      if game is None:
+        continue
+      try:
+        await self.play(game, deadline, loop, executor)
+      except Exception as error:
+        print(f"Game {game_id}: move failed: {error}")
+      game.busy = False
+      game.next_poll = time.monotonic() + game.scheduler.next_delay()
+
+  async def play(self, game: DaemonGame, deadline: float, loop: asyncio.AbstractEventLoop, executor: ProcessPoolExecutor):
+    config = self.config
+    board = game.tracker.board
+    details = game.details
+    symbol = game.symbol
+    cell, source, root = None, None, None
+    if self.book is not None:
+      cell, source = self.book.lookup(board, symbol, details.target), "book"
+    if cell is None and self.cache is not None:
+      entry = self.cache.lookup(details.boardSize, details.target, table_key(board, symbol))
+      wanted_depth = config.max_depth if config.time_budget else config.depth
+      if (entry is not None and entry.bound == EXACT and entry.move is not None and wanted_depth is not None
+          and entry.depth >= wanted_depth and board.is_valid_move(*entry.move)):
+        cell, source = entry.move, "cache"
+    if cell is None:
+      seconds = max(deadline - config.safety_margin - time.monotonic(), 0.0) if config.time_budget else None
+      cell, source, root = await loop.run_in_executor(
+        executor, search_job, pack_board(board), symbol, details.target, seconds, config.depth,
+        config.max_depth, config.tactics
+      )
+    move_id = await self.client.makeMove(details.gameId, game.team_id, cell)
+    game.tracker.apply(cell[0], cell[1], symbol, move_id)
+    game.scheduler.start_wait()
+    game.awaiting_reply = True
+    print(f"Game {details.gameId}: played {cell[0]}, {cell[1]} ({source}), "
+          f"{deadline - time.monotonic():.1f}s of the clock left")
+    if root is not None and self.cache is not None:
+      self.cache.store(details.boardSize, details.target, root)
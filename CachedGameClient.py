@@ -0,0 +1,143 @@
+import copy
+import time
+from collections import OrderedDict
+from Board import Board
+from HttpGameClient import GameData, HttpGameClient
+
+# Seconds a result of a read method stays cached, methods not listed are not cached
+DEFAULT_TTLS: dict[str, float] = {
+  "getGameDetails": 2.0,
+  "getBoardString": 2.0,
+  "getMyGames": 30.0,
+  "getTeamMembers": 60.0,
+  "getMyTeams": 300.0,
+}
+# Cached methods whose first argument is a game ID
+GAME_METHODS: tuple[str, ...] = ("getGameDetails", "getBoardString")
+
+
+class CachedGameClient:
+  r"""
+  Caches the results of the read methods of an HttpGameClient for a time set per method.
+  At most max_entries results are kept, the least recently used one is dropped first.
+  Writes through this client invalidate what they change: a move drops the cached details and board of its game,
+  creating a game drops the game list and team changes drop the team lists.
+  Polls pass fresh=True to always ask the server, their result still refreshes the cache,
+  so a read right after a poll costs no request.
+  Callers get copies of the cached results, so changing a returned GameData, list or dict does not change the cache.
+  Boards are rebuilt from the cached board string on every call.
+  Every other method is passed through to the wrapped client.
+  """
+  def __init__(self, client: HttpGameClient, ttls: dict[str, float] | None = None, max_entries: int = 1024):
+    r"""
+    :param client: Built client making the requests
+    :param ttls: Seconds a result stays cached by method name, DEFAULT_TTLS by default, empty disables caching
+    :param max_entries: Most results kept
+    """
+    self.client = client
+    self.ttls = DEFAULT_TTLS if ttls is None else ttls
+    self.max_entries = max_entries
+    # (method, args) -> (expiry time, result)
+    self.entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.bypasses = 0
+
+  def __getattr__(self, name: str):
+    return getattr(self.client, name)
+
+  def cached(self, method: str, args: tuple, fresh: bool = False):
+    r"""
+    Returns the cached result of a read method, calling it when missing, expired or fresh is set.
+    :param method: Name of the method of the wrapped client
+    :param args: Its arguments
+    :param fresh: Skip the lookup and make the request
+    """
+    key = (method, args)
+    if fresh:
+      self.bypasses += 1
+    else:
+      entry = self.entries.get(key)
+      if entry is not None and entry[0] > time.monotonic():
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+      self.misses += 1
+
+    result = getattr(self.client, method)(*args)
+    ttl = self.ttls.get(method, 0.0)
+    if ttl > 0:
+      self.entries[key] = (time.monotonic() + ttl, copy.deepcopy(result))
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+    return result
+
+  def invalidate(self, method: str | None = None, game_id: int | None = None):
+    r"""
+    Drops cached results.
+    :param method: Only results of this method
+    :param game_id: Only results of methods about this game
+    """
+    for key in list(self.entries):
+      name, args = key
+      if method is not None and name != method:
+        continue
+      if game_id is not None and (name not in GAME_METHODS or args[0] != game_id):
+        continue
+      del self.entries[key]
+
+  def stats(self) -> dict:
+    lookups = self.hits + self.misses
+    return {
+      "entries": len(self.entries),
+      "hits": self.hits,
+      "misses": self.misses,
+      "bypasses": self.bypasses,
+      "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+    }
+
+  def getGameDetails(self, game_id: int, fresh: bool = False) -> GameData:
+    return self.cached("getGameDetails", (game_id,), fresh)
+
+  def getBoardString(self, game_id: int, fresh: bool = False) -> str:
+    return self.cached("getBoardString", (game_id,), fresh)
+
+  def getBoardObject(self, game_id: int, board_class: type = Board, fresh: bool = False):
+    return board_class.from_string(self.getBoardString(game_id, fresh))
+
+  def getMyGames(self, fresh: bool = False) -> dict[int, str]:
+    return self.cached("getMyGames", (), fresh)
+
+  def getMyTeams(self, fresh: bool = False) -> dict[int, str]:
+    return self.cached("getMyTeams", (), fresh)
+
+  def getTeamMembers(self, team_id: int, fresh: bool = False) -> list[int]:
+    return self.cached("getTeamMembers", (team_id,), fresh)
+
+  def makeMove(self, game_id: int, team_id: int, move: tuple[int, int]) -> int:
+    try:
+      return self.client.makeMove(game_id, team_id, move)
+    finally:
+      # Also on failure, the move may have been made before the error
+      self.invalidate(game_id=game_id)
+
+  def createGame(self, team_id_1: int, team_id_2: int, board_size: int = 20, target: int = 10) -> int:
+    game_id = self.client.createGame(team_id_1, team_id_2, board_size, target)
+    self.invalidate("getMyGames")
+    return game_id
+
+  def createTeam(self, team_name: str) -> int:
+    team_id = self.client.createTeam(team_name)
+    self.invalidate("getMyTeams")
+    return team_id
+
+  def addTeamMember(self, team_id: int, user_id: int):
+    self.client.addTeamMember(team_id, user_id)
+    self.invalidate("getTeamMembers")
+    self.invalidate("getMyTeams")
+
+  def removeTeamMember(self, team_id: int, user_id: int):
+    self.client.removeTeamMember(team_id, user_id)
+    self.invalidate("getTeamMembers")
+    self.invalidate("getMyTeams")
@@ -0,0 +1,355 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+import numpy as np
+from Board import CELLS_TO_TEXT, Board
+from HttpGameClient import GameData, MoveData
+from Search import WIN_THRESHOLD, SearchEngine
+from TranspositionTable import TranspositionTable
+
+# Version 1 stored the text lengths in one byte each, which could not hold long team names
+MAGIC: bytes = b"TTTGAME2"
+# gameId, moves, boardSize, target, team1Id, team2Id, secondsPerMove, status, winnerTeamId, turnTeamId,
+# then the byte lengths of gameType, team1Name and team2Name, and the number of moves stored
+HEADER = struct.Struct("<IIHHIIIhiiHHHI")
+# Stored in place of a missing winner or turn team
+NO_TEAM: int = -2 ** 31
+# Stored in place of a status that is not a number the header can hold
+UNKNOWN_STATUS: int = -1
+# research searches this much deeper than --depth by default
+DEFAULT_RESEARCH_EXTRA_DEPTH: int = 2
+# One move: x, y and symbol
+MOVE_DTYPE = np.dtype([("x", "u1"), ("y", "u1"), ("symbol", "i1")])
+
+
+class GameRecord:
+  r"""
+  A stored game: its details and its moves, oldest first, as an array of MOVE_DTYPE.
+  """
+  def __init__(self, details: GameData, moves: np.ndarray, offset: int = 0):
+    self.details = details
+    self.moves = moves
+    # Position of the record in its file
+    self.offset = offset
+
+  def replay(self, board_class: type = Board) -> Iterator[tuple[Board, int, int, int]]:
+    r"""
+    Plays the moves on a new board one at a time.
+    The same board is yielded every time, before each move is made on it.
+    :return: Iterator of the board and the x, y and symbol of the move about to be made
+    """
+    board = board_class(self.details.boardSize)
+    for x, y, symbol in self.moves.tolist():
+      yield board, x, y, symbol
+      board.make_move(x, y, symbol)
+
+  def final_board(self, board_class: type = Board) -> Board:
+    board = board_class(self.details.boardSize)
+    for x, y, symbol in self.moves.tolist():
+      board.make_move(x, y, symbol)
+    return board
+
+
+def status_code(status) -> int:
+  r"""
+  The status of a game as stored in the header. The API sends it as a number in a string,
+  anything else is stored as UNKNOWN_STATUS.
+  """
+  try:
+    code = int(status)
+  except (TypeError, ValueError):
+    return UNKNOWN_STATUS
+  return code if -2 ** 15 <= code < 2 ** 15 else UNKNOWN_STATUS
+
+
+def encode(details: GameData, moves: Iterable[tuple[int, int, int]]) -> bytes:
+  r"""
+  :param moves: x, y and symbol of every move, oldest first
+  :return: The record as bytes
+  """
+  packed = np.array(list(moves), dtype=MOVE_DTYPE)
+  texts = [(text or "").encode() for text in (details.gameType, details.team1Name, details.team2Name)]
+  header = HEADER.pack(
+    details.gameId, details.moves, details.boardSize, details.target, details.team1Id, details.team2Id,
+    details.secondsPerMove, status_code(details.status),
+    NO_TEAM if details.winnerTeamId is None else details.winnerTeamId,
+    NO_TEAM if details.turnTeamId is None else details.turnTeamId,
+    *(len(text) for text in texts), len(packed),
+  )
+  return header + b"".join(texts) + packed.tobytes()
+
+
+def decode(buffer, offset: int) -> tuple[GameRecord, int]:
+  r"""
+  Reads the record at offset. Its moves are copied out of the buffer, three bytes each,
+  so the record stays valid after a mapped file is closed.
+  :return: The record and the offset of the next one
+  """
+  (game_id, moves, size, target, team1, team2, seconds, status, winner, turn,
+   type_length, name1_length, name2_length, count) = HEADER.unpack_from(buffer, offset)
+  position = offset + HEADER.size
+  texts = []
+  for length in (type_length, name1_length, name2_length):
+    texts.append(bytes(buffer[position:position + length]).decode())
+    position += length
+  packed = np.frombuffer(buffer, dtype=MOVE_DTYPE, count=count, offset=position).copy()
+  details = GameData(
+    gameId=game_id, gameType=texts[0], moves=moves, boardSize=size, target=target,
+    team1Id=team1, team1Name=texts[1], team2Id=team2, team2Name=texts[2], secondsPerMove=seconds, status=status,
+    winnerTeamId=None if winner == NO_TEAM else winner, turnTeamId=None if turn == NO_TEAM else turn,
+  )
+  return GameRecord(details, packed, offset), position + count * MOVE_DTYPE.itemsize
+
+
+def moves_from_data(moves: list[MoveData]) -> list[tuple[int, int, int]]:
+  r"""
+  :param moves: Moves as returned by getMoves, newest first
+  :return: x, y and symbol of every move, oldest first
+  """
+  return [(move.moveX, move.moveY, move.symbol) for move in reversed(moves)]
+
+
+class GameRecordWriter:
+  r"""
+  Appends records to a game record file, creating it when missing.
+  """
+  def __init__(self, path: str):
+    r"""
+    :raises ValueError: If the file exists but is not a game record file of this version
+    """
+    if os.path.exists(path) and os.path.getsize(path):
+      with open(path, "rb") as existing:
+        if existing.read(len(MAGIC)) != MAGIC:
+          raise ValueError(f"{path} is not a game record file")
+    self.file = open(path, "ab")
+    if self.file.tell() == 0:
+      self.file.write(MAGIC)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def append(self, details: GameData, moves: Iterable[tuple[int, int, int]]):
+    self.file.write(encode(details, moves))
+
+  def close(self):
+    self.file.close()
+
+
+class GameRecordReader:
+  r"""
+  Memory-maps a game record file and reads its records one at a time,
+  so files larger than memory can be streamed.
+  """
+  def __init__(self, path: str):
+    self.path = path
+    self.file = open(path, "rb")
+    self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else None
+    if self.map is None or self.map[:len(MAGIC)] != MAGIC:
+      self.close()
+      raise ValueError(f"{path} is not a game record file")
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def __iter__(self) -> Iterator[GameRecord]:
+    offset = len(MAGIC)
+    while offset < len(self.map):
+      record, offset = decode(self.map, offset)
+      yield record
+
+  def read(self, offset: int) -> GameRecord:
+    return decode(self.map, offset)[0]
+
+  def offsets(self, game_id: int | None = None) -> list[int]:
+    r"""
+    Offsets of the records, found by walking the headers only.
+    :param game_id: Only the records of this game
+    """
+    offsets = []
+    offset = len(MAGIC)
+    while offset < len(self.map):
+      fields = HEADER.unpack_from(self.map, offset)
+      if game_id is None or fields[0] == game_id:
+        offsets.append(offset)
+      offset += HEADER.size + sum(fields[10:13]) + fields[13] * MOVE_DTYPE.itemsize
+    return offsets
+
+  def game_ids(self) -> set[int]:
+    return {HEADER.unpack_from(self.map, offset)[0] for offset in self.offsets()}
+
+  def close(self):
+    if self.map is not None:
+      self.map.close()
+    self.file.close()
+
+
+def archive_games(client, path: str, game_ids: Iterable[int] | None = None) -> int:
+  r"""
+  Downloads finished games that are not in the file yet and appends them to it.
+  A game whose moves do not add up to its move count is fetched once more, and skipped with a warning
+  when they still do not, so an incomplete game is not stored.
+  :param client: HttpGameClient
+  :param path: Game record file
+  :param game_ids: Games to archive, all games of the user by default
+  :return: Number of games added
+  """
+  known = set()
+  if os.path.exists(path) and os.path.getsize(path):
+    with GameRecordReader(path) as reader:
+      known = reader.game_ids()
+  if game_ids is None:
+    game_ids = client.getMyGames().keys()
+  added = 0
+  with GameRecordWriter(path) as writer:
+    for game_id in game_ids:
+      if game_id in known:
+        continue
+      for attempt in range(2):
+        details = client.getGameDetails(game_id)
+        if details.winnerTeamId is None and details.turnTeamId != -1:
+          break
+        moves = client.getMoves(game_id, max(details.moves, 1)) if details.moves else []
+        if len(moves) == details.moves:
+          writer.append(details, moves_from_data(moves))
+          added += 1
+          break
+      else:
+        print(f"Game {game_id}: skipped, {len(moves)} moves received of {details.moves}", file=sys.stderr)
+  return added
+
+
+def analyse_game(path: str, offset: int, depth: int, mode: str, tt_megabytes: float = 16) -> list[dict]:
+  r"""
+  Analyses one game of a record file, to run in a worker process.
+  The record is read from the file by offset, so only the offset is sent to the worker.
+  blunders: every move is compared with a depth search of its position. A move is a blunder when it misses a win
+  the search found or when the position after it is lost while the search found a move that is not.
+  research: every move is compared with the best move of a depth search, main passes a depth deeper than
+  the one the games were played at.
+  :return: One dictionary per finding, and a summary of the game last
+  """
+  findings = []
+  agreed = 0
+  with GameRecordReader(path) as reader:
+    record = reader.read(offset)
+    details = record.details
+    target = details.target
+    engine = SearchEngine(TranspositionTable(tt_megabytes))
+    for ply, (board, x, y, symbol) in enumerate(record.replay()):
+      engine.new_search()
+      best = engine.search(board, symbol, target, depth)
+      best_score = symbol * best.score
+      if (best.moveX, best.moveY) == (x, y):
+        agreed += 1
+        continue
+      if mode == "research":
+        findings.append({"game": details.gameId, "ply": ply, "played": [x, y],
+                         "best": [int(best.moveX), int(best.moveY)], "score": str(best_score)})
+        continue
+      if best_score <= -WIN_THRESHOLD:
+        # Every move loses, the played one is no worse
+        continue
+      board.make_move(x, y, symbol)
+      if board.winner(target) == symbol:
+        board.unmake_move(x, y)
+        continue
+      engine.new_search()
+      # Move scores are from X's point of view
+      played_score = symbol * (engine.search(board, -symbol, target, depth - 1).score if depth > 1 else board.evaluation())
+      board.unmake_move(x, y)
+      kind = None
+      if best_score >= WIN_THRESHOLD and played_score < WIN_THRESHOLD:
+        kind = "missed_win"
+      elif played_score <= -WIN_THRESHOLD:
+        kind = "allowed_loss"
+      if kind is not None:
+        findings.append({"game": details.gameId, "ply": ply, "kind": kind, "played": [x, y],
+                         "best": [int(best.moveX), int(best.moveY)]})
+  plies = len(record.moves)
+  findings.append({"game": details.gameId, "summary": True, "plies": plies, "agreement": round(agreed / plies, 4) if plies else 1.0})
+  return findings
+
+
+def setupArgs() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description="Replay and analyse game record files")
+  parser.add_argument(
+    "operation",
+    choices=[
+      "list",
+      "replay",
+      "blunders",
+      "research",
+    ],
+    help="Operation to perform"
+  )
+  parser.add_argument(
+    "path",
+    type=str,
+    help="Game record file, written by main.py game --archive"
+  )
+  parser.add_argument(
+    "--game",
+    type=int,
+    help="Only this game"
+  )
+  parser.add_argument(
+    "--depth",
+    type=int,
+    help="Search depth of the analysis",
+    default=3
+  )
+  parser.add_argument(
+    "--research-depth",
+    type=int,
+    help="Search depth of research, by default --depth plus 2 so it looks further than the games did"
+  )
+  parser.add_argument(
+    "--workers",
+    type=int,
+    help="Number of processes analysing games",
+    default=1
+  )
+  return parser
+
+
+def main(argv: list[str]) -> None:
+  args = setupArgs().parse_args(argv[1:])
+  with GameRecordReader(args.path) as reader:
+    if args.operation == "list":
+      for record in reader:
+        details = record.details
+        print(f"{details.gameId}: {details.team1Name} ({details.team1Id}) vs {details.team2Name} ({details.team2Id}), "
+              f"{details.boardSize}x{details.boardSize}/{details.target}, {len(record.moves)} moves, "
+              f"winner {details.winnerTeamId}")
+    elif args.operation == "replay":
+      for offset in reader.offsets(args.game):
+        record = reader.read(offset)
+        print(f"Game {record.details.gameId}")
+        for ply, (board, x, y, symbol) in enumerate(record.replay()):
+          print(f"{ply + 1}: {CELLS_TO_TEXT[symbol]} at {x}, {y}")
+        print(record.final_board())
+    else:
+      offsets = reader.offsets(args.game)
+      depth = args.depth
+      if args.operation == "research":
+        depth = args.research_depth if args.research_depth is not None else args.depth + DEFAULT_RESEARCH_EXTRA_DEPTH
+      with ProcessPoolExecutor(args.workers) as executor:
+        futures = [executor.submit(analyse_game, args.path, offset, depth, args.operation) for offset in offsets]
+        for future in futures:
+          for finding in future.result():
+            print(json.dumps(finding))
+
+
+if __name__ == "__main__":
+  main(sys.argv)
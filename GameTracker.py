@@ -0,0 +1,102 @@
+from Board import DEFAULT_RADIUS, Board
+from HttpGameClient import GameData, HttpGameClient, MoveData
+
+
+class GameTracker:
+  r"""
+  Keeps a local board of a game in sync with the server across turns.
+  Instead of downloading the whole board every turn it fetches only the moves made since the last sync
+  with getMoves, plus the last move it already has as an anchor. When the anchor's move ID does not match
+  the last applied move, or a move does not fit the board, it falls back to a full resync from getBoardMoves.
+  As the board object stays the same, its incremental state and the position hash carry over between turns.
+  """
+  def __init__(self, client: HttpGameClient, game_id: int, size: int, board_class: type = Board,
+               radius: int = DEFAULT_RADIUS):
+    r"""
+    :param client: Client of the game server
+    :param game_id: ID of the game
+    :param size: Board size of the game
+    :param board_class: Board implementation to keep, Board or BitBoard
+    :param radius: Move generation radius of the board
+    """
+    self.client = client
+    self.game_id = game_id
+    self.board_class = board_class
+    self.board = board_class(size, radius)
+    # Number of moves applied to the board and the ID of the last one
+    self.move_count: int = 0
+    self.last_move_id: int | None = None
+    self.resyncs: int = 0
+
+  def apply(self, x: int, y: int, symbol: int, move_id: int) -> bool:
+    r"""
+    Applies a move made in the game, for example our own after makeMove.
+    :param move_id: ID of the move given by the server
+    :return: False if the move does not fit the board
+    """
+    if not self.board.is_valid_move(x, y):
+      return False
+    self.board.make_move(x, y, symbol)
+    self.move_count += 1
+    self.last_move_id = move_id
+    return True
+
+  def moves_to_fetch(self, details: GameData) -> int | None:
+    r"""
+    :param details: Current details of the game, their move count tells how many moves are missing
+    :return: Number of newest moves to fetch including the anchor, 0 when up to date or None when a resync is needed
+    """
+    missing = details.moves - self.move_count
+    if missing <= 0:
+      return None if missing < 0 else 0
+    return missing + (self.last_move_id is not None)
+
+  def apply_fetched(self, moves: list[MoveData], count: int) -> bool:
+    r"""
+    Applies moves fetched for moves_to_fetch.
+    :param moves: Newest move first, as returned by getMoves
+    :param count: What moves_to_fetch returned
+    :return: False if the moves do not continue from the last applied move and a resync is needed
+    """
+    anchored = self.last_move_id is not None
+    # The anchor is the oldest one
+    if len(moves) != count or (anchored and moves[-1].modeId != self.last_move_id):
+      return False
+    for move in reversed(moves[:count - anchored]):
+      if not self.apply(move.moveX, move.moveY, move.symbol, move.modeId):
+        return False
+    return True
+
+  def reset(self, cells: dict[tuple[int, int], int], latest: list[MoveData]):
+    r"""
+    Rebuilds the board from the full board of the game.
+    :param cells: Filled cells, as returned by getBoardMoves
+    :param latest: The newest move fetched before the cells, as returned by getMoves(game_id, 1)
+    """
+    self.resyncs += 1
+    self.board = self.board_class(self.board.size, self.board.radius)
+    self.board.fill_from_moves_dict(cells)
+    self.move_count = len(cells)
+    self.last_move_id = latest[0].modeId if latest else None
+
+  def sync(self, details: GameData) -> Board:
+    r"""
+    Brings the board up to date with the game.
+    :param details: Current details of the game
+    :return: The tracked board
+    """
+    count = self.moves_to_fetch(details)
+    if count == 0:
+      return self.board
+    if count is None or not self.apply_fetched(self.client.getMoves(self.game_id, count), count):
+      return self.resync()
+    return self.board
+
+  def resync(self) -> Board:
+    r"""
+    Rebuilds the board from the full board of the game.
+    The last move ID is read first, so a move made during the resync shows up as a mismatch on the next sync.
+    """
+    latest = self.client.getMoves(self.game_id, 1)
+    self.reset(self.client.getBoardMoves(self.game_id), latest)
+    return self.board
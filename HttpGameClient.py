@@ -1,14 +1,75 @@
 from requests import Session as RSession, Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 import json
 from Board import TEXT_TO_CELLS, Board
 
 
+# Connect and read timeouts of API requests in seconds
+REQUEST_TIMEOUT: tuple[float, float] = (7, 19)
+# Connect timeout of requests with a timeout from the move clock, a bit over the 3s TCP retransmit window
+CLOCK_CONNECT_TIMEOUT: float = 3.05
+# Request types that only read the state of a game and are sent every poll
+POLL_TYPES: tuple[str, ...] = ("gameDetails", "moves", "boardMap", "boardString")
+DEFAULT_POOL_SIZE: int = 10
+DEFAULT_RETRIES: int = 3
+DEFAULT_BACKOFF: float = 0.5
+# Status codes of overloaded or restarting servers worth retrying
+RETRY_STATUSES: tuple[int, ...] = (429, 502, 503, 504)
+# Of those, the ones the server itself sends before handling a request, so a POST answered with them did nothing.
+# A 502 or 504 comes from a proxy that may have passed the request on.
+POST_RETRY_STATUSES: tuple[int, ...] = (429, 503)
+DEFAULT_ENDPOINT: str = "https://www.notexponential.com/aip2pgaming/api/index.php"
+
+
 def str_to_tuple(key: str):
   x, y = key.strip().split(',')
   return int(x), int(y)
 
+def check_response(response: Response) -> Response:
+  r"""
+  Checks that the response status code is 200 and that the response contains a code.
+  If the code is "FAIL", it raises an exception with the message from the response.
+  :raises ValueError: If the response status code is not 200 or if the response contains a code with the value "FAIL"
+  :return: The response
+  """
+  if response.status_code != 200:
+    raise ValueError(f"Request failed with status code {response.status_code}")
+  
+  code = response.json().get("code")
+  if code is None:
+    raise ValueError("Response does not contain a code")
+  if code == "FAIL":
+    message = response.json().get("message")
+    if message is None:
+      raise ValueError("Failed response does not contain a message")
+    raise ValueError(f"API request failed with message: {message}")
+  
+  return response
+
+def endpoint_timeouts(seconds_per_move: float) -> dict[str, tuple[float, float]]:
+  r"""
+  Timeouts of each request type for a game with the given move clock.
+  A poll gives up after a quarter of the clock so a stuck one is retried while there is time,
+  a move may take half of it. Neither waits longer than REQUEST_TIMEOUT.
+  :param seconds_per_move: Move clock of the game
+  :return: Connect and read timeouts by request type, other types use REQUEST_TIMEOUT
+  """
+  poll = min(max(seconds_per_move / 4, 1.0), REQUEST_TIMEOUT[1])
+  move = min(max(seconds_per_move / 2, 2.0), REQUEST_TIMEOUT[1])
+  timeouts = {request_type: (CLOCK_CONNECT_TIMEOUT, poll) for request_type in POLL_TYPES}
+  timeouts["move"] = (CLOCK_CONNECT_TIMEOUT, move)
+  return timeouts
+
+def id_dict(items: list[dict]) -> dict[int, str]:
+  # myTeams and myGames are lists of single entry {id: name} objects
+  result = {}
+  for item in items:
+    result.update({int(key): value for key, value in item.items()})
+  return result
+
 @dataclass
 class MoveData:
   modeId: int
@@ -82,11 +143,60 @@ class IHttpClient(ABC):
   def request(self, method: str, url: str, **kwargs) -> Response:
     pass
 
+class PostSafeRetry(Retry):
+  r"""
+  Retry that also retries POST requests answered with POST_RETRY_STATUSES.
+  Other statuses and read errors of a POST are still not retried, the move may have been made.
+  """
+  def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+    if method.upper() == "POST" and status_code in POST_RETRY_STATUSES:
+      return True
+    return super().is_retry(method, status_code, has_retry_after)
+
+
 class Session(RSession, IHttpClient):
   r"""
   Implementation of the IHttpClient interface using the requests.Session class.
   Works as a wrapper around the requests.Session class.
+  Connections are kept alive in a pool of pool_size sockets per host. When all are busy a request
+  waits for one instead of opening a connection that would be thrown away afterwards.
+  Requests are retried by urllib3 with exponential backoff. Connection errors are retried for every request,
+  since nothing was sent. A GET is also retried on read errors and on RETRY_STATUSES. A POST is retried only on
+  POST_RETRY_STATUSES, which the server sends without handling the request, so a move is never made twice.
   """
+  def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF):
+    r"""
+    :param pool_size: Most connections kept open per host, at least the number of concurrent requests
+    :param retries: Most retries of one request, 0 disables them
+    :param backoff: Delay before the second retry in seconds, doubled for each one after it
+    """
+    super().__init__()
+    retry = PostSafeRetry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES, raise_on_status=False)
+    self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True, max_retries=retry)
+    self.mount("https://", self.adapter)
+    self.mount("http://", self.adapter)
+    self.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+  
+  def connection_stats(self) -> dict:
+    r"""
+    Counts connections opened and requests sent so far.
+    Every HTTPS connection costs a TLS handshake. When keep-alive works, connections stay at most
+    the pool size while requests keep growing.
+    :return: Dictionary of counts
+    """
+    stats = {"requests": 0, "connections": 0, "tls_handshakes": 0}
+    pools = self.adapter.poolmanager.pools
+    for key in pools.keys():
+      pool = pools.get(key)
+      if pool is None:
+        continue
+      stats["requests"] += pool.num_requests
+      stats["connections"] += pool.num_connections
+      if pool.scheme == "https":
+        stats["tls_handshakes"] += pool.num_connections
+    stats["reuse"] = round(1 - stats["connections"] / stats["requests"], 3) if stats["requests"] else 0.0
+    return stats
+  
   def request(self, method: str, url: str, **kwargs) -> Response:
     return super().request(method, url, **kwargs)
   
@@ -104,19 +214,22 @@ class HttpGameClient:
   It also requires an instance of a class that implements the IHttpClient interface to make requests.
   It uses dependency injection to allow for easy testing.
   It uses the builder pattern to create the client.
-  Building the client sets the headers and the endpoint.
+  Building the client sets the headers.
   """
   api_key: str
   user_id: str
   sender: IHttpClient
   headers: dict[str, str]
   endpoint: str
+  timeouts: dict[str, tuple[float, float]]
   
   def __init__(self, sender: IHttpClient):
     r"""
     Initializes the client with the given sender.
     """
     self.sender = sender
+    self.timeouts = {}
+    self.endpoint = DEFAULT_ENDPOINT
     
   def setApiKey(self, api_key: str):
     r"""
@@ -136,9 +249,35 @@ class HttpGameClient:
     self.user_id = user_id
     return self
   
+  def setEndpoint(self, endpoint: str):
+    r"""
+    Sets the URL of the API, for example of a LocalGameServer. The game server is used by default.
+    :param endpoint:
+    :return: Instance of the client
+    """
+    self.endpoint = endpoint
+    return self
+  
+  def setTimeouts(self, timeouts: dict[str, tuple[float, float]]):
+    r"""
+    Sets the timeouts of request types, for example from endpoint_timeouts.
+    :param timeouts: Connect and read timeouts by request type, other types use REQUEST_TIMEOUT
+    :return: Instance of the client
+    """
+    self.timeouts = timeouts
+    return self
+  
+  def timeout_for(self, kwargs: dict) -> tuple[float, float]:
+    r"""
+    :param kwargs: Arguments of a request, the type is read from its params or data
+    :return: Connect and read timeouts of the request
+    """
+    payload = kwargs.get("params") or kwargs.get("data") or {}
+    return self.timeouts.get(payload.get("type"), REQUEST_TIMEOUT)
+  
   def build(self):
     r"""
-    Builds the client by setting the headers and the endpoint.
+    Builds the client by setting the headers.
     :raises ValueError: If the API key or the user ID is not set
     :return: Instance of the client
     """
@@ -152,7 +291,6 @@ class HttpGameClient:
       "x-api-key": self.api_key,
       "userId": self.user_id
     }
-    self.endpoint = "https://www.notexponential.com/aip2pgaming/api/index.php"
     return self
   
   def request(self, method: str, url: str, **kwargs):
@@ -167,20 +305,8 @@ class HttpGameClient:
     if self.headers is None:
       raise ValueError("Headers are not set")
     
-    response = self.sender.request(method, url, headers=self.headers, timeout=(7, 19), **kwargs)
-    if response.status_code != 200:
-      raise ValueError(f"Request failed with status code {response.status_code}")
-    
-    code = response.json().get("code")
-    if code is None:
-      raise ValueError("Response does not contain a code")
-    if code == "FAIL":
-      message = response.json().get("message")
-      if message is None:
-        raise ValueError("Failed response does not contain a message")
-      raise ValueError(f"API request failed with message: {message}")
-    
-    return response
+    response = self.sender.request(method, url, headers=self.headers, timeout=self.timeout_for(kwargs), **kwargs)
+    return check_response(response)
   
   def get(self, url: str, **kwargs) -> Response:
     return self.request("GET", url, **kwargs)
@@ -249,10 +375,7 @@ class HttpGameClient:
     :return: List of teams
     """
     response = self.get(self.endpoint, params={"type": "myTeams"})
-    result = {}
-    for team in response.json().get("myTeams"):
-      result.update({int(key): value for key, value in team.items()})
-    return result
+    return id_dict(response.json().get("myTeams"))
   
   def createGame(self, team_id_1: int, team_id_2: int, board_size: int = 20, target: int = 10) -> int:
     r"""
@@ -281,10 +404,7 @@ class HttpGameClient:
     :return: List of games
     """
     response = self.get(self.endpoint, params={"type": "myGames"})
-    result = {}
-    for game in response.json().get("myGames"):
-      result.update({int(key): value for key, value in game.items()})
-    return result
+    return id_dict(response.json().get("myGames"))
   
   def makeMove(self, game_id: int, team_id: int, move: tuple[int, int]) -> int:
     r"""
@@ -346,12 +466,22 @@ class HttpGameClient:
     
     return response.json().get("output")
   
-  def getBoardObject(self, game_id: int) -> Board:
+  def getBoardObject(self, game_id: int, board_class: type = Board):
     r"""
     Gets the board of a game as a Board object.
     :param game_id: ID of the game
+    :param board_class: Board implementation to create, Board or BitBoard
     :return: Board object
     """
     board_string = self.getBoardString(game_id)
-    return Board.from_string(board_string)
+    return board_class.from_string(board_string)
+  
+  def getGameState(self, game_id: int, board_class: type = Board) -> tuple[GameData, Board]:
+    r"""
+    Gets the details and the board of a game.
+    :param game_id: ID of the game
+    :param board_class: Board implementation to create, Board or BitBoard
+    :return: Game details and board
+    """
+    return self.getGameDetails(game_id), self.getBoardObject(game_id, board_class)
   
\ No newline at end of file
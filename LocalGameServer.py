@@ -0,0 +1,407 @@
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from requests import Response
+from Arena import LocalGame
+from Board import CELLS_TO_TEXT
+from HttpGameClient import IHttpClient
+
+
+class RequestFailed(Exception):
+  pass
+
+
+@dataclass
+class Faults:
+  r"""
+  Faults injected into responses, drawn from a seeded random generator.
+  """
+  # Seconds every request takes, plus up to jitter more
+  latency: float = 0.0
+  jitter: float = 0.0
+  # Fraction of requests answered with error_status before they are handled
+  error_rate: float = 0.0
+  error_status: int = 503
+  # Fraction of requests answered with a FAIL code after they are handled, like a lost response
+  fail_rate: float = 0.0
+  seed: int = 0
+
+
+@dataclass
+class ServerTeam:
+  team_id: int
+  name: str
+  members: set[str] = field(default_factory=set)
+
+
+@dataclass
+class ServerGame:
+  game_id: int
+  team1_id: int
+  team2_id: int
+  game: LocalGame
+  # (move ID, team ID, x, y, symbol), oldest first
+  moves: list[tuple[int, int, int, int, int]] = field(default_factory=list)
+
+
+class LocalGameServer:
+  r"""
+  In-memory stand-in for the game API with the same type= operations and JSON shapes.
+  The user is the userId header, API keys are not checked. Creating a team makes its creator a member.
+  Team 1 of a game plays O and moves first, team 2 plays X, as the bot in main.py expects.
+  Move clocks are reported but not enforced.
+  All state is behind one lock, so the server can be shared by threads.
+  """
+  def __init__(self, faults: Faults | None = None, seconds_per_move: int = 60):
+    self.faults = faults if faults is not None else Faults()
+    self.seconds_per_move = seconds_per_move
+    self.random = random.Random(self.faults.seed)
+    self.lock = threading.Lock()
+    self.ids = itertools.count(1)
+    self.teams: dict[int, ServerTeam] = {}
+    self.games: dict[int, ServerGame] = {}
+    self.requests = 0
+
+  def respond(self, method: str, payload: dict, user_id: str | None) -> tuple[int, dict]:
+    r"""
+    Handles one request with the faults applied.
+    :param method: GET or POST
+    :param payload: Query parameters of a GET or form fields of a POST
+    :param user_id: userId header
+    :return: HTTP status and JSON body
+    """
+    faults = self.faults
+    with self.lock:
+      self.requests += 1
+      delay = faults.latency + self.random.random() * faults.jitter
+      error = self.random.random() < faults.error_rate
+      lost = self.random.random() < faults.fail_rate
+    if delay > 0:
+      time.sleep(delay)
+    if error:
+      return faults.error_status, {"code": "FAIL", "message": "Injected error"}
+    try:
+      with self.lock:
+        body = self.handle(method, payload, user_id)
+    except RequestFailed as failure:
+      return 200, {"code": "FAIL", "message": str(failure)}
+    if lost:
+      return 200, {"code": "FAIL", "message": "Injected failure"}
+    return 200, {"code": "OK", **body}
+
+  def handle(self, method: str, payload: dict, user_id: str | None) -> dict:
+    if user_id is None:
+      raise RequestFailed("Missing userId")
+    request_type = payload.get("type")
+    handlers = {
+      ("POST", "team"): self.create_team,
+      ("POST", "member"): self.add_member,
+      ("POST", "removeMember"): self.remove_member,
+      ("POST", "game"): self.create_game,
+      ("POST", "move"): self.make_move,
+      ("GET", "team"): self.team_members,
+      ("GET", "myTeams"): self.my_teams,
+      ("GET", "myGames"): self.my_games,
+      ("GET", "moves"): self.moves,
+      ("GET", "gameDetails"): self.game_details,
+      ("GET", "boardMap"): self.board_map,
+      ("GET", "boardString"): self.board_string,
+    }
+    handler = handlers.get((method, request_type))
+    if handler is None:
+      raise RequestFailed(f"Unknown request {method} {request_type}")
+    return handler(payload, user_id)
+
+  def team(self, payload: dict, key: str = "teamId") -> ServerTeam:
+    team = self.teams.get(int(payload.get(key, 0)))
+    if team is None:
+      raise RequestFailed("Team not found")
+    return team
+
+  def game(self, payload: dict) -> ServerGame:
+    game = self.games.get(int(payload.get("gameId", 0)))
+    if game is None:
+      raise RequestFailed("Game not found")
+    return game
+
+  def create_team(self, payload: dict, user_id: str) -> dict:
+    team = ServerTeam(next(self.ids), payload.get("name", ""), {user_id})
+    self.teams[team.team_id] = team
+    return {"teamId": team.team_id}
+
+  def add_member(self, payload: dict, user_id: str) -> dict:
+    self.team(payload).members.add(str(payload.get("userId")))
+    return {}
+
+  def remove_member(self, payload: dict, user_id: str) -> dict:
+    self.team(payload).members.discard(str(payload.get("userId")))
+    return {}
+
+  def team_members(self, payload: dict, user_id: str) -> dict:
+    return {"userIds": sorted(self.team(payload).members)}
+
+  def my_teams(self, payload: dict, user_id: str) -> dict:
+    return {"myTeams": [{str(team.team_id): team.name} for team in self.teams.values() if user_id in team.members]}
+
+  def create_game(self, payload: dict, user_id: str) -> dict:
+    team1, team2 = self.team(payload, "teamId1"), self.team(payload, "teamId2")
+    size, target = int(payload.get("boardSize", 20)), int(payload.get("target", 10))
+    if size < 1 or not 1 <= target <= size:
+      raise RequestFailed("Invalid board size or target")
+    game = ServerGame(next(self.ids), team1.team_id, team2.team_id, LocalGame(size, target, self.seconds_per_move, -1))
+    self.games[game.game_id] = game
+    return {"gameId": game.game_id}
+
+  def my_games(self, payload: dict, user_id: str) -> dict:
+    mine = {team.team_id for team in self.teams.values() if user_id in team.members}
+    return {"myGames": [
+      {str(game.game_id): f"{game.team1_id}:{game.team2_id}"}
+      for game in self.games.values() if game.team1_id in mine or game.team2_id in mine
+    ]}
+
+  def make_move(self, payload: dict, user_id: str) -> dict:
+    game = self.game(payload)
+    team = self.team(payload)
+    if user_id not in team.members:
+      raise RequestFailed("User is not in the team")
+    if team.team_id not in (game.team1_id, game.team2_id):
+      raise RequestFailed("Team is not in the game")
+    symbol = -1 if team.team_id == game.team1_id else 1
+    try:
+      x, y = (int(value) for value in str(payload.get("move", "")).split(","))
+      game.game.make_move(x, y, symbol)
+    except ValueError as error:
+      raise RequestFailed(str(error))
+    move_id = next(self.ids)
+    game.moves.append((move_id, team.team_id, x, y, symbol))
+    return {"moveId": move_id}
+
+  def moves(self, payload: dict, user_id: str) -> dict:
+    game = self.game(payload)
+    count = int(payload.get("count", 20))
+    newest = game.moves[::-1][:count]
+    return {"moves": [
+      {
+        "moveId": str(move_id),
+        "gameId": str(game.game_id),
+        "teamId": str(team_id),
+        "move": f"{x},{y}",
+        "symbol": CELLS_TO_TEXT[symbol],
+        "moveX": str(x),
+        "moveY": str(y),
+      }
+      for move_id, team_id, x, y, symbol in newest
+    ]}
+
+  def game_details(self, payload: dict, user_id: str) -> dict:
+    game = self.game(payload)
+    local = game.game
+    if local.winner != 0:
+      winner, turn = game.team1_id if local.winner == -1 else game.team2_id, None
+    elif local.over:
+      winner, turn = None, -1
+    else:
+      winner, turn = None, game.team1_id if local.turn == -1 else game.team2_id
+    teams = self.teams
+    # The API sends the details as a JSON string inside the JSON response
+    return {"game": json.dumps({
+      "gameid": str(game.game_id),
+      "gametype": "TTT",
+      "moves": str(len(game.moves)),
+      "boardsize": str(local.size),
+      "target": str(local.target),
+      "team1id": str(game.team1_id),
+      "team1name": teams[game.team1_id].name,
+      "team2id": str(game.team2_id),
+      "team2name": teams[game.team2_id].name,
+      "secondspermove": str(local.seconds_per_move),
+      "status": "1" if local.over else "0",
+      "winnerteamid": None if winner is None else str(winner),
+      "turnteamid": None if turn is None else str(turn),
+    })}
+
+  def board_map(self, payload: dict, user_id: str) -> dict:
+    game = self.game(payload)
+    return {"output": {f"{x},{y}": CELLS_TO_TEXT[symbol] for _, _, x, y, symbol in game.moves}}
+
+  def board_string(self, payload: dict, user_id: str) -> dict:
+    board = self.game(payload).game.board.board
+    return {"output": "\n".join("".join(CELLS_TO_TEXT[int(cell)] for cell in row) for row in board) + "\n"}
+
+
+def make_response(status: int, body: dict, url: str) -> Response:
+  response = Response()
+  response.status_code = status
+  response._content = json.dumps(body).encode()
+  response.headers["Content-Type"] = "application/json"
+  response.encoding = "utf-8"
+  response.url = url
+  return response
+
+
+class LocalSession(IHttpClient):
+  r"""
+  Implementation of the IHttpClient interface that sends requests straight to a LocalGameServer in this process.
+  The URL is ignored and no sockets are used, so a client can be load-tested without network overhead.
+  """
+  def __init__(self, server: LocalGameServer):
+    self.server = server
+    self.lock = threading.Lock()
+    self.requests = 0
+
+  def connection_stats(self) -> dict:
+    r"""
+    Same counts as Session.connection_stats. No connections are ever opened, so every request counts as reused.
+    :return: Dictionary of counts
+    """
+    with self.lock:
+      requests = self.requests
+    return {"requests": requests, "connections": 0, "tls_handshakes": 0, "reuse": 1.0 if requests else 0.0}
+
+  def request(self, method: str, url: str, params: dict | None = None, data: dict | None = None,
+              headers: dict | None = None, **kwargs) -> Response:
+    with self.lock:
+      self.requests += 1
+    fields = params if method == "GET" else data
+    payload = {key: str(value) for key, value in (fields or {}).items()}
+    status, body = self.server.respond(method, payload, (headers or {}).get("userId"))
+    return make_response(status, body, url)
+
+  def get(self, url: str, **kwargs) -> Response:
+    return self.request("GET", url, **kwargs)
+
+  def post(self, url: str, **kwargs) -> Response:
+    return self.request("POST", url, **kwargs)
+
+
+class LocalHttpServer:
+  r"""
+  Serves a LocalGameServer over HTTP on localhost, from a background thread.
+  Point a client at it with HttpGameClient.setEndpoint(server.url).
+  """
+  def __init__(self, server: LocalGameServer, host: str = "127.0.0.1", port: int = 0):
+    r"""
+    :param port: Port to listen on, 0 picks a free one
+    """
+    self.server = server
+
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = "HTTP/1.1"
+
+      def do_GET(self):
+        self.reply("GET", dict(parse_qsl(urlsplit(self.path).query)))
+
+      def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.reply("POST", dict(parse_qsl(self.rfile.read(length).decode())))
+
+      def reply(self, method: str, payload: dict):
+        status, body = server.respond(method, payload, self.headers.get("userId"))
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+      def log_message(self, format, *args):
+        pass
+
+    self.http = ThreadingHTTPServer((host, port), Handler)
+    self.http.daemon_threads = True
+    self.thread: threading.Thread | None = None
+
+  @property
+  def url(self) -> str:
+    host, port = self.http.server_address[:2]
+    return f"http://{host}:{port}/api/index.php"
+
+  def start(self):
+    self.thread = threading.Thread(target=self.http.serve_forever, daemon=True)
+    self.thread.start()
+    return self
+
+  def stop(self):
+    self.http.shutdown()
+    self.http.server_close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *exc_info):
+    self.stop()
+
+
+def setupArgs() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description="Local stand-in for the game API")
+  parser.add_argument(
+    "--port",
+    type=int,
+    help="Port to listen on",
+    default=8080
+  )
+  parser.add_argument(
+    "--seconds-per-move",
+    type=int,
+    help="Move clock reported in game details",
+    default=60
+  )
+  parser.add_argument(
+    "--latency",
+    type=float,
+    help="Seconds every request takes",
+    default=0.0
+  )
+  parser.add_argument(
+    "--jitter",
+    type=float,
+    help="Most extra seconds added at random to the latency",
+    default=0.0
+  )
+  parser.add_argument(
+    "--error-rate",
+    type=float,
+    help="Fraction of requests answered with --error-status",
+    default=0.0
+  )
+  parser.add_argument(
+    "--error-status",
+    type=int,
+    help="HTTP status of injected errors",
+    default=503
+  )
+  parser.add_argument(
+    "--fail-rate",
+    type=float,
+    help="Fraction of requests that are handled but answered with a FAIL code",
+    default=0.0
+  )
+  parser.add_argument(
+    "--seed",
+    type=int,
+    help="Seed of the injected faults",
+    default=0
+  )
+  return parser
+
+
+def main(argv: list[str]) -> None:
+  args = setupArgs().parse_args(argv[1:])
+  faults = Faults(args.latency, args.jitter, args.error_rate, args.error_status, args.fail_rate, args.seed)
+  with LocalHttpServer(LocalGameServer(faults, args.seconds_per_move), port=args.port) as http:
+    print(f"Serving on {http.url}, use it with main.py --endpoint")
+    try:
+      http.thread.join()
+    except KeyboardInterrupt:
+      print("Server stopped")
+
+
+if __name__ == "__main__":
+  main(sys.argv)
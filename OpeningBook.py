@@ -0,0 +1,237 @@
+import argparse
+import mmap
+import struct
+import sys
+import numpy as np
+from Board import Board, zobrist_keys
+from Search import SIDE_KEY, SearchEngine
+
+MAGIC: bytes = b"TTTBOOK1"
+# size, target, canonical key, move x, move y
+RECORD = struct.Struct("<HHQBB")
+
+# The 8 symmetries of the square as maps of (x, y) on a board of size n
+SYMMETRIES = [
+  lambda x, y, n: (x, y),
+  lambda x, y, n: (y, n - 1 - x),
+  lambda x, y, n: (n - 1 - x, n - 1 - y),
+  lambda x, y, n: (n - 1 - y, x),
+  lambda x, y, n: (x, n - 1 - y),
+  lambda x, y, n: (n - 1 - x, y),
+  lambda x, y, n: (y, x),
+  lambda x, y, n: (n - 1 - y, n - 1 - x),
+]
+# Index of the symmetry that undoes each one, the two quarter turns undo each other
+INVERSE = [0, 3, 2, 1, 4, 5, 6, 7]
+
+
+def canonical_key(board, symbol: int) -> tuple[int, int]:
+  r"""
+  Position key that is the same for all 8 rotations and reflections of a position.
+  :param board: Board or BitBoard
+  :param symbol: Symbol to move
+  :return: The smallest Zobrist hash over the symmetries and the index of the symmetry giving it
+  """
+  n = board.size
+  keys = zobrist_keys(n)
+  cells = board.board
+  hashes = [0] * len(SYMMETRIES)
+  for x, y in zip(*np.nonzero(cells)):
+    stone = keys[int(cells[x, y])]
+    for index, transform in enumerate(SYMMETRIES):
+      tx, ty = transform(int(x), int(y), n)
+      hashes[index] ^= stone[tx][ty]
+  if symbol == -1:
+    hashes = [value ^ SIDE_KEY for value in hashes]
+  index = min(range(len(hashes)), key=hashes.__getitem__)
+  return hashes[index], index
+
+
+class OpeningBook:
+  r"""
+  Best moves of early positions, read from a file through mmap.
+  The file is MAGIC followed by fixed size records sorted by (size, target, key), where key is the
+  canonical_key of the position and the move is stored in the orientation that gives that key.
+  Lookups are a binary search over the mapped file, so opening a book costs nothing up front.
+  """
+  def __init__(self, path: str):
+    r"""
+    :param path: Book file written by write_book
+    """
+    self.path = path
+    self.file = open(path, "rb")
+    self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    if self.data[:len(MAGIC)] != MAGIC:
+      self.close()
+      raise ValueError(f"{path} is not an opening book")
+    self.count = (len(self.data) - len(MAGIC)) // RECORD.size
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def __len__(self) -> int:
+    return self.count
+
+  def close(self):
+    self.data.close()
+    self.file.close()
+
+  def record(self, index: int) -> tuple[int, int, int, int, int]:
+    return RECORD.unpack_from(self.data, len(MAGIC) + index * RECORD.size)
+
+  def find(self, size: int, target: int, key: int) -> tuple[int, int] | None:
+    r"""
+    :return: Stored move for the canonical key or None
+    """
+    wanted = (size, target, key)
+    low, high = 0, self.count
+    while low < high:
+      middle = (low + high) // 2
+      if self.record(middle)[:3] < wanted:
+        low = middle + 1
+      else:
+        high = middle
+    if low < self.count:
+      record = self.record(low)
+      if record[:3] == wanted:
+        return record[3], record[4]
+    return None
+
+  def lookup(self, board, symbol: int, target: int) -> tuple[int, int] | None:
+    r"""
+    Book move for the position, in the position's own orientation.
+    :param board: Board or BitBoard
+    :param symbol: Symbol to move
+    :param target: Number of consecutive marks to win
+    :return: Move or None when the position is not in the book
+    """
+    key, index = canonical_key(board, symbol)
+    move = self.find(board.size, target, key)
+    if move is None:
+      return None
+    move = SYMMETRIES[INVERSE[index]](move[0], move[1], board.size)
+    return move if board.is_valid_move(*move) else None
+
+  def entries(self) -> dict[tuple[int, int, int], tuple[int, int]]:
+    return {record[:3]: record[3:] for record in map(self.record, range(self.count))}
+
+
+def write_book(path: str, entries: dict[tuple[int, int, int], tuple[int, int]]):
+  r"""
+  Writes a book file.
+  :param entries: Move in the canonical orientation by (size, target, canonical key)
+  """
+  with open(path, "wb") as file:
+    file.write(MAGIC)
+    for (size, target, key), (x, y) in sorted(entries.items()):
+      file.write(RECORD.pack(size, target, key, x, y))
+
+
+def build_book(size: int, target: int, plies: int, width: int, depth: int, radius: int = 2,
+               entries: dict[tuple[int, int, int], tuple[int, int]] | None = None) -> dict[tuple[int, int, int], tuple[int, int]]:
+  r"""
+  Searches the opening tree of a board size and target and collects the best moves.
+  From the empty board with either side to move, every position gets a search to `depth` and
+  its best move plus the next `width - 1` moves of the engine's ordering are expanded,
+  up to `plies` stones. Positions that are symmetric to one already searched are skipped.
+  :param entries: Existing book entries to add to
+  :return: Move in the canonical orientation by (size, target, canonical key)
+  """
+  entries = {} if entries is None else entries
+  engine = SearchEngine()
+  searched = set()
+  frontier = []
+  for symbol in (1, -1):
+    board = Board(size, radius)
+    frontier.append((board, symbol))
+  for _ in range(plies + 1):
+    children = []
+    for board, symbol in frontier:
+      key, index = canonical_key(board, symbol)
+      if key in searched or board.winner(target) != 0:
+        continue
+      searched.add(key)
+      engine.new_search()
+      best = engine.search(board, symbol, target, depth)
+      if best.moveX < 0:
+        continue
+      entries[(size, target, key)] = SYMMETRIES[index](best.moveX, best.moveY, size)
+      cells = [(best.moveX, best.moveY)]
+      for cell in engine.ordered_moves(board, symbol, target, 0, []):
+        if len(cells) >= width:
+          break
+        if cell not in cells:
+          cells.append(cell)
+      for x, y in cells:
+        child = board.copy()
+        child.make_move(x, y, symbol)
+        children.append((child, -symbol))
+    frontier = children
+    print(f"Book: {len(searched)} positions searched", file=sys.stderr)
+  return entries
+
+
+def setupArgs() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description="Build a Tic TaK Toe opening book")
+  parser.add_argument(
+    "path",
+    type=str,
+    help="Book file, entries of an existing book are kept"
+  )
+  parser.add_argument(
+    "--size",
+    type=int,
+    help="Size of the board",
+    default=20
+  )
+  parser.add_argument(
+    "--target",
+    type=int,
+    help="Target number of consecutive marks to win",
+    default=10
+  )
+  parser.add_argument(
+    "--plies",
+    type=int,
+    help="Number of stones on the deepest positions in the book",
+    default=4
+  )
+  parser.add_argument(
+    "--width",
+    type=int,
+    help="Moves expanded in every position",
+    default=3
+  )
+  parser.add_argument(
+    "--depth",
+    type=int,
+    help="Search depth of every position",
+    default=5
+  )
+  parser.add_argument(
+    "--radius",
+    type=int,
+    help="Only consider moves within this distance of placed stones",
+    default=2
+  )
+  return parser
+
+
+def main(argv: list[str]) -> None:
+  args = setupArgs().parse_args(argv[1:])
+  entries = {}
+  try:
+    with OpeningBook(args.path) as book:
+      entries = book.entries()
+  except FileNotFoundError:
+    pass
+  entries = build_book(args.size, args.target, args.plies, args.width, args.depth, args.radius, entries)
+  write_book(args.path, entries)
+  print(f"Book written to {args.path} with {len(entries)} positions")
+
+
+if __name__ == "__main__":
+  main(sys.argv)
@@ -0,0 +1,203 @@
+import math
+import multiprocessing
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+import numpy as np
+from Board import Board, Move
+from Search import INFINITY, SearchEngine, SearchStats, SearchTimeout, table_key
+from TranspositionTable import EXACT, LOWER, TranspositionTable
+
+# Seconds between checks of the stop flag while waiting for the workers
+STOP_POLL_INTERVAL: float = 0.01
+
+# State of a pool worker process, set up once by init_worker
+worker_engine: SearchEngine | None = None
+worker_alpha = None
+worker_stop = None
+
+
+def pack_board(board) -> tuple[bytes, int, int]:
+  r"""
+  Compact form of a board for sending to a worker: the raw bytes of an int8 cell array.
+  :param board: Board or BitBoard
+  :return: Cell bytes, size and radius
+  """
+  return board.board.astype(np.int8).tobytes(), board.size, board.radius
+
+
+def unpack_board(packed: tuple[bytes, int, int]) -> Board:
+  cells, size, radius = packed
+  board = Board(size, radius)
+  board.board[:] = np.frombuffer(cells, dtype=np.int8).reshape(size, size)
+  board.refresh()
+  return board
+
+
+def read_alpha() -> int:
+  # The shared bound is a double, round it down by more than its precision so pruning stays safe
+  value = worker_alpha.value
+  if value <= -INFINITY:
+    return -INFINITY
+  alpha = math.floor(value)
+  return alpha - abs(alpha) // 2 ** 40 - 1
+
+
+def raise_alpha(score: int):
+  with worker_alpha.get_lock():
+    if score > worker_alpha.value:
+      worker_alpha.value = float(score)
+
+
+class WorkerEngine(SearchEngine):
+  r"""
+  Engine of a pool worker. Its stop_requested is the stop flag shared with the ParallelSearch,
+  so stopping that search also stops the root moves the workers are searching.
+  """
+  @property
+  def stop_requested(self) -> bool:
+    return worker_stop.value != 0
+
+  @stop_requested.setter
+  def stop_requested(self, value: bool):
+    # Only the ParallelSearch sets and clears the shared flag
+    pass
+
+
+def init_worker(alpha, stop, tt_megabytes: float):
+  global worker_engine, worker_alpha, worker_stop
+  worker_alpha = alpha
+  worker_stop = stop
+  worker_engine = WorkerEngine(TranspositionTable(tt_megabytes))
+
+
+def search_root_move(packed: tuple[bytes, int, int], symbol: int, target: int, cell: tuple[int, int], depth: int,
+                     deadline: float | None) -> tuple[tuple[int, int], int, bool, SearchStats]:
+  r"""
+  Searches one root move in a worker with the best root score found so far as lower bound.
+  :param deadline: time.monotonic() time of the whole search, which is the same clock in every process,
+    so a move that waited in the queue does not get a fresh budget
+  :return: The move, its score for the root side, whether the score is exact and the counters of the search
+  """
+  board = unpack_board(packed)
+  board.make_move(cell[0], cell[1], symbol)
+  engine = worker_engine
+  engine.stats = SearchStats()
+  engine.deadline = deadline
+  alpha = read_alpha()
+  score = -engine.negamax(board, depth - 1, -INFINITY, -alpha, -symbol, target, 1, [])
+  engine.stats.winner_calls = board.winner_calls
+  exact = score > alpha
+  if exact:
+    raise_alpha(score)
+  return cell, score, exact, engine.stats
+
+
+class ParallelSearch(SearchEngine):
+  r"""
+  Root-parallel search over a process pool, in Young Brothers Wait style.
+  The first root move is searched in this process to get a bound, then the remaining root moves
+  are searched by the workers. Workers share the best root score through a shared double, so every
+  move starts with the best bound known at the time. Each worker keeps its own engine and
+  transposition table between tasks. Boards are sent to the workers as raw bytes.
+  stop_requested is a shared flag that the workers check at every node too, so a stop from another
+  thread, such as the Ponderer's, ends the search in every process.
+  """
+  def __init__(self, workers: int, table: TranspositionTable | None = None, tt_megabytes: float = 64):
+    r"""
+    :param workers: Number of worker processes
+    :param table: Transposition table of this process
+    :param tt_megabytes: Memory budget of each worker's transposition table
+    """
+    # Before the engine is set up, which clears stop_requested
+    self.stop_flag = multiprocessing.RawValue("b", 0)
+    super().__init__(table)
+    self.alpha = multiprocessing.Value("d", float(-INFINITY))
+    self.executor = ProcessPoolExecutor(workers, initializer=init_worker,
+                                        initargs=(self.alpha, self.stop_flag, tt_megabytes))
+
+  @property
+  def stop_requested(self) -> bool:
+    return self.stop_flag.value != 0
+
+  @stop_requested.setter
+  def stop_requested(self, value: bool):
+    self.stop_flag.value = int(value)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def close(self):
+    self.executor.shutdown(cancel_futures=True)
+
+  def abort(self, futures: list):
+    # Queued moves are dropped, running ones end at their next node on the deadline or the stop flag.
+    # Waiting for them keeps a stopped move from running on after the flag is cleared.
+    for future in futures:
+      future.cancel()
+    wait(futures)
+
+  def search(self, board: Board, symbol: int, target: int, depth: int, deadline: float | None = None,
+             pv: list[tuple[int, int]] | None = None, root_moves: list[tuple[int, int]] | None = None) -> Move:
+    pv = pv or []
+    root = board.copy()
+    if depth <= 1 or root.winner(target) != 0:
+      return super().search(board, symbol, target, depth, deadline, pv, root_moves)
+    self.deadline = deadline
+    self.stats.nodes += 1
+
+    key = table_key(root, symbol)
+    first = pv[:1]
+    entry = self.table.probe(key)
+    if entry is not None and entry.move is not None:
+      first.append(entry.move)
+    self.root_moves = root_moves
+    try:
+      cells = list(self.ordered_moves(root, symbol, target, 0, first))
+    finally:
+      self.root_moves = None
+    if len(cells) <= 1:
+      return super().search(board, symbol, target, depth, deadline, pv, root_moves)
+
+    # Eldest brother first, its score is the bound the other moves have to beat
+    best_cell = cells[0]
+    root.make_move(best_cell[0], best_cell[1], symbol)
+    child_pv = pv[1:] if pv and pv[0] == best_cell else []
+    try:
+      best_score = -self.negamax(root, depth - 1, -INFINITY, INFINITY, -symbol, target, 1, child_pv)
+    finally:
+      self.stats.winner_calls += root.winner_calls
+    root.unmake_move(best_cell[0], best_cell[1])
+    self.alpha.value = float(best_score)
+
+    packed = pack_board(root)
+    futures = [
+      self.executor.submit(search_root_move, packed, symbol, target, cell, depth, deadline)
+      for cell in cells[1:]
+    ]
+    pending = futures
+    while pending:
+      timeout = STOP_POLL_INTERVAL
+      if deadline is not None:
+        timeout = min(timeout, max(deadline - time.monotonic(), 0.0))
+      done, pending = wait(pending, timeout, return_when=FIRST_EXCEPTION)
+      error = next((future.exception() for future in done if future.exception() is not None), None)
+      if error is None and pending and (self.stop_requested or (deadline is not None and time.monotonic() >= deadline)):
+        # Stopped or out of time with moves still queued or running
+        error = SearchTimeout()
+      if error is not None:
+        self.abort(futures)
+        raise error
+    for future in futures:
+      cell, score, exact, stats = future.result()
+      self.stats.merge(stats)
+      if exact and score > best_score:
+        best_score = score
+        best_cell = cell
+
+    # With only some root moves searched the position is worth at least the best of them
+    self.table.store(key, depth, EXACT if root_moves is None else LOWER, best_score, best_cell)
+    self.root_move = best_cell
+    return Move(symbol, best_cell[0], best_cell[1], symbol * best_score)
@@ -0,0 +1,147 @@
+import bisect
+import random
+import statistics
+import time
+from collections import deque
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket takes everything above
+DEFAULT_BOUNDS: tuple[float, ...] = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+  r"""
+  Counts of values in fixed buckets, with the exact total for the mean.
+  """
+  def __init__(self, bounds: tuple[float, ...] = DEFAULT_BOUNDS, unit: str = "s"):
+    self.bounds = bounds
+    self.unit = unit
+    self.counts: list[int] = [0] * (len(bounds) + 1)
+    self.count: int = 0
+    self.total: float = 0.0
+
+  def record(self, value: float):
+    self.counts[bisect.bisect_left(self.bounds, value)] += 1
+    self.count += 1
+    self.total += value
+
+  @property
+  def mean(self) -> float:
+    return self.total / self.count if self.count else 0.0
+
+  def percentile(self, fraction: float) -> float:
+    r"""
+    Upper bound of the bucket holding the given fraction of the values.
+    :param fraction: Between 0 and 1, 0.5 for the median
+    :return: Bucket bound, infinity for the last bucket
+    """
+    wanted = fraction * self.count
+    seen = 0
+    for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+      seen += count
+      if count and seen >= wanted:
+        return bound
+    return 0.0
+
+  def as_dict(self) -> dict:
+    labels = [f"<={bound}{self.unit}" for bound in self.bounds] + [f">{self.bounds[-1]}{self.unit}"]
+    return {
+      "count": self.count,
+      "mean": round(self.mean, 4),
+      "p50": self.percentile(0.5),
+      "p90": self.percentile(0.9),
+      "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+    }
+
+
+class PollScheduler:
+  r"""
+  Decides how long to wait between polls for the opponent's move.
+  Right after our move it polls fast, so a quick bot's reply is seen almost at once.
+  Then the interval grows exponentially up to a cap derived from the move clock.
+  Once the opponent's response times have been seen, it sleeps until shortly before the
+  expected reply and polls fast again around it. Every delay gets random jitter, so several
+  bots do not poll in step. Poll latencies, opponent response times and polls per turn are
+  recorded in histograms for tuning.
+  """
+  def __init__(self, seconds_per_move: float, min_interval: float = 0.1, max_interval: float = 2.0,
+               fast_window: float = 1.0, backoff: float = 1.5, jitter: float = 0.2, observed: int = 10,
+               rng: random.Random | None = None):
+    r"""
+    :param seconds_per_move: Move clock of the game, the opponent replies within it
+    :param min_interval: Shortest delay between polls
+    :param max_interval: Longest delay between polls, also at most a twentieth of the move clock
+    :param fast_window: Seconds after our move polled at min_interval
+    :param backoff: Factor the interval grows by after each empty poll
+    :param jitter: Delays are scaled by a random factor within 1 +- jitter
+    :param observed: Number of recent opponent response times the prediction uses
+    """
+    self.min_interval = min_interval
+    self.max_interval = max(min_interval, min(max_interval, seconds_per_move / 20))
+    self.fast_window = fast_window
+    self.backoff = backoff
+    self.jitter = jitter
+    self.rng = rng if rng is not None else random.Random()
+    self.responses: deque[float] = deque(maxlen=observed)
+    self.poll_latency = LatencyHistogram()
+    self.response_time = LatencyHistogram()
+    self.polls_per_turn = LatencyHistogram((1, 2, 3, 5, 10, 20, 50, 100), unit="")
+    self.wait_start: float = time.monotonic()
+    self.interval: float = min_interval
+    self.polls: int = 0
+
+  def start_wait(self, now: float | None = None):
+    r"""
+    Starts waiting for the opponent, called right after our move was made.
+    """
+    self.wait_start = time.monotonic() if now is None else now
+    self.interval = self.min_interval
+    self.polls = 0
+
+  def predicted_response(self) -> float | None:
+    r"""
+    :return: Median of the opponent's recent response times or None before any were seen
+    """
+    return statistics.median(self.responses) if self.responses else None
+
+  def next_delay(self, now: float | None = None) -> float:
+    r"""
+    :return: Seconds to sleep before the next poll
+    """
+    elapsed = (time.monotonic() if now is None else now) - self.wait_start
+    predicted = self.predicted_response()
+    if elapsed < self.fast_window:
+      delay = self.min_interval
+    elif predicted is not None and elapsed < 0.8 * predicted:
+      # Nothing is expected until shortly before the usual reply time
+      delay = min(0.8 * predicted - elapsed, self.max_interval)
+      self.interval = self.min_interval
+    elif predicted is not None and elapsed < 1.5 * predicted:
+      delay = self.min_interval
+    else:
+      self.interval = min(self.interval * self.backoff, self.max_interval)
+      delay = self.interval
+    return max(delay * self.rng.uniform(1 - self.jitter, 1 + self.jitter), 0.0)
+
+  def record_poll(self, latency: float):
+    r"""
+    Records a poll of the game state.
+    :param latency: Round trip of the poll in seconds
+    """
+    self.polls += 1
+    self.poll_latency.record(latency)
+
+  def opponent_moved(self, now: float | None = None):
+    r"""
+    Records that the opponent's move was seen.
+    """
+    response = (time.monotonic() if now is None else now) - self.wait_start
+    self.responses.append(response)
+    self.response_time.record(response)
+    self.polls_per_turn.record(self.polls)
+
+  def stats(self) -> dict:
+    return {
+      "poll_latency": self.poll_latency.as_dict(),
+      "response_time": self.response_time.as_dict(),
+      "polls_per_turn": self.polls_per_turn.as_dict(),
+    }
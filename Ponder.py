@@ -0,0 +1,99 @@
+import threading
+import time
+from Board import Board
+from Search import SearchEngine, SearchResult, SearchTimeout
+
+
+class Ponderer:
+  r"""
+  Searches on the opponent's time.
+  After our move it predicts the opponent's most likely replies and, in a background thread,
+  deepens a search of our answer to each of them in turn, one depth at a time across all replies.
+  When the opponent's move arrives the search is stopped; the result for the position that was
+  actually reached can be used directly and the engine's transposition table keeps everything
+  that was searched, so the search that follows starts from warm entries.
+  The engine must not be used by anything else between start and stop.
+  """
+  def __init__(self, engine: SearchEngine, replies: int = 3):
+    r"""
+    :param engine: Engine used for the real search, so pondering fills its transposition table
+    :param replies: Number of opponent replies to ponder
+    """
+    self.engine = engine
+    self.replies = replies
+    self.results: dict[int, SearchResult] = {}
+    self.thread: threading.Thread | None = None
+
+  def predict_replies(self, board: Board, symbol: int, target: int) -> list[tuple[int, int]]:
+    r"""
+    The opponent's best moves by the engine's own move ordering.
+    :param symbol: Our symbol, the opponent plays -symbol
+    """
+    replies = []
+    for cell in self.engine.ordered_moves(board, -symbol, target, 0, []):
+      replies.append(cell)
+      if len(replies) == self.replies:
+        break
+    return replies
+
+  def start(self, board: Board, symbol: int, target: int, seconds: float):
+    r"""
+    Starts pondering in the background.
+    :param board: Position after our move, it is not modified
+    :param symbol: Our symbol
+    :param target: Number of consecutive marks to win
+    :param seconds: Longest time to ponder, normally the opponent's move clock
+    """
+    self.stop()
+    self.results = {}
+    positions = []
+    for cell in self.predict_replies(board, symbol, target):
+      position = board.copy()
+      position.make_move(cell[0], cell[1], -symbol)
+      positions.append(position)
+    if not positions:
+      return
+    self.engine.stop_requested = False
+    self.thread = threading.Thread(
+      target=self.run,
+      args=(positions, symbol, target, time.monotonic() + seconds),
+      daemon=True
+    )
+    self.thread.start()
+
+  def run(self, positions: list[Board], symbol: int, target: int, deadline: float):
+    engine = self.engine
+    engine.new_search()
+    pvs: dict[int, list[tuple[int, int]]] = {position.hash: [] for position in positions}
+    depth = 1
+    max_depth = max(int((position.board == 0).sum()) for position in positions)
+    try:
+      while depth <= max_depth and time.monotonic() < deadline:
+        for position in positions:
+          start = time.monotonic()
+          move = engine.search(position, symbol, target, depth, deadline, pvs[position.hash])
+          pvs[position.hash] = engine.principal_variation(position, symbol, depth)
+          self.results[position.hash] = SearchResult(move, depth, time.monotonic() - start, pvs[position.hash])
+        depth += 1
+    except SearchTimeout:
+      pass
+
+  def stop(self):
+    r"""
+    Stops pondering and waits for the background search to finish.
+    The search ends at its next node; a ParallelSearch passes the stop on to its workers.
+    """
+    if self.thread is None:
+      return
+    self.engine.stop_requested = True
+    self.thread.join()
+    self.engine.stop_requested = False
+    self.thread = None
+
+  def result_for(self, board: Board) -> SearchResult | None:
+    r"""
+    The pondered result for the position the opponent actually left, if it was predicted.
+    :param board: Position after the opponent's move
+    :return: Deepest completed result for that position or None
+    """
+    return self.results.get(board.hash)
@@ -0,0 +1,139 @@
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# Ways to profile a move
+CPROFILE: str = "cprofile"
+SAMPLE: str = "sample"
+# Seconds between stack samples of the sampling profiler
+DEFAULT_SAMPLE_INTERVAL: float = 0.005
+
+
+class MoveProfiler:
+  r"""
+  Profiles the thread that enters it, for one move at a time.
+  With cprofile every call is traced by cProfile, which is exact but slows the search down a few times.
+  With sample a background thread looks at the stack of the profiled thread every interval seconds and counts
+  the functions on it, which costs almost nothing and is what to use on a live clock.
+  Use it as a context manager, summary() then gives the top functions of the last profiled block.
+  """
+  def __init__(self, mode: str = SAMPLE, top: int = 15, interval: float = DEFAULT_SAMPLE_INTERVAL):
+    r"""
+    :param mode: CPROFILE or SAMPLE
+    :param top: Number of functions in the summary
+    :param interval: Seconds between samples in SAMPLE mode
+    """
+    if mode not in (CPROFILE, SAMPLE):
+      raise ValueError(f"Unknown profiler mode: {mode}")
+    self.mode = mode
+    self.top = top
+    self.interval = interval
+    self.profile: cProfile.Profile | None = None
+    self.sampler: threading.Thread | None = None
+    self.stop_event = threading.Event()
+    self.samples = 0
+    # Samples with the function anywhere on the stack, and at the top of it
+    self.cumulative: Counter = Counter()
+    self.own: Counter = Counter()
+
+  def __enter__(self):
+    self.cumulative.clear()
+    self.own.clear()
+    self.samples = 0
+    if self.mode == CPROFILE:
+      self.profile = cProfile.Profile()
+      self.profile.enable()
+    else:
+      self.stop_event.clear()
+      self.sampler = threading.Thread(target=self.sample_loop, args=(threading.get_ident(),), daemon=True)
+      self.sampler.start()
+    return self
+
+  def __exit__(self, *exc_info):
+    if self.mode == CPROFILE:
+      self.profile.disable()
+    else:
+      self.stop_event.set()
+      self.sampler.join()
+
+  def sample_loop(self, thread_id: int):
+    while not self.stop_event.wait(self.interval):
+      frame = sys._current_frames().get(thread_id)
+      if frame is None:
+        continue
+      self.samples += 1
+      self.own[function_name(frame)] += 1
+      seen = set()
+      while frame is not None:
+        name = function_name(frame)
+        # Recursive functions such as negamax count once per sample
+        if name not in seen:
+          seen.add(name)
+          self.cumulative[name] += 1
+        frame = frame.f_back
+
+  def summary(self) -> dict:
+    r"""
+    :return: The top functions by cumulative time. For cprofile the seconds and calls,
+      for sample the fraction of samples with the function on the stack and at its top.
+    """
+    if self.mode == CPROFILE:
+      stats = pstats.Stats(self.profile)
+      rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+      return {
+        "mode": CPROFILE,
+        "total_seconds": round(stats.total_tt, 4),
+        "functions": [
+          {
+            "function": f"{file}:{line}({name})",
+            "calls": calls,
+            "own_seconds": round(own, 4),
+            "cumulative_seconds": round(cumulative, 4),
+          }
+          for (file, line, name), (_, calls, own, cumulative, _) in rows
+        ],
+      }
+    samples = max(self.samples, 1)
+    return {
+      "mode": SAMPLE,
+      "samples": self.samples,
+      "functions": [
+        {
+          "function": name,
+          "cumulative": round(count / samples, 4),
+          "own": round(self.own[name] / samples, 4),
+        }
+        for name, count in self.cumulative.most_common(self.top)
+      ],
+    }
+
+
+def function_name(frame) -> str:
+  code = frame.f_code
+  return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno}({code.co_name})"
+
+
+class MoveLog:
+  r"""
+  Writes one JSON object per line, flushed after every record so a crashed run keeps its moves.
+  """
+  def __init__(self, path: str):
+    self.file = open(path, "a")
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def write(self, record: dict):
+    record = {"time": round(time.time(), 3), **record}
+    self.file.write(json.dumps(record, default=str) + "\n")
+    self.file.flush()
+
+  def close(self):
+    self.file.close()
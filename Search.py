@@ -0,0 +1,376 @@
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Iterator
+from Board import Board, Move
+from TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+from VectorEval import generate_moves_vectorized
+
+# Seconds kept back from the move clock for the network round trip of making the move
+DEFAULT_SAFETY_MARGIN: float = 2.0
+
+# Score of a won position, above any chain_evaluation. Wins found closer to the root score higher.
+WIN_SCORE: int = 10 ** 40
+INFINITY: int = 10 ** 50
+# Scores closer to WIN_SCORE than this are wins and depend on the ply they were found at
+WIN_THRESHOLD: int = WIN_SCORE - 10 ** 6
+
+# Mixed into the position hash when O is to move, so both sides of a position get separate entries
+SIDE_KEY: int = random.Random("side").getrandbits(64)
+
+
+class SearchTimeout(Exception):
+  pass
+
+
+@dataclass
+class SearchResult:
+  move: Move
+  depth: int
+  elapsed: float
+  pv: list[tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class SearchStats:
+  nodes: int = 0
+  # Nodes scored with evaluation() or as won
+  leaves: int = 0
+  # Board.winner calls on the searched boards, from the nodes and from move generation
+  winner_calls: int = 0
+  # Nodes where a move failed high, and how many of those it did on the first move tried
+  cutoffs: int = 0
+  first_move_cutoffs: int = 0
+  # Null window searches that had to be repeated with the full window
+  researches: int = 0
+  # Nodes that found their position in the table, and those that returned its score without searching
+  tt_hits: int = 0
+  tt_cutoffs: int = 0
+  # One entry per iteration of iterative deepening: depth, cumulative seconds and nodes, whether it completed
+  iterations: list[dict] = field(default_factory=list)
+
+  @property
+  def interior_nodes(self) -> int:
+    return self.nodes - self.leaves
+
+  @property
+  def cutoff_rate(self) -> float:
+    return self.cutoffs / self.interior_nodes if self.interior_nodes else 0.0
+
+  @property
+  def first_move_cutoff_rate(self) -> float:
+    return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+  def merge(self, other: "SearchStats"):
+    # Adds the counters of a search made elsewhere, for example in a worker process
+    self.nodes += other.nodes
+    self.leaves += other.leaves
+    self.winner_calls += other.winner_calls
+    self.cutoffs += other.cutoffs
+    self.first_move_cutoffs += other.first_move_cutoffs
+    self.researches += other.researches
+    self.tt_hits += other.tt_hits
+    self.tt_cutoffs += other.tt_cutoffs
+
+  def as_dict(self) -> dict:
+    return {
+      "nodes": self.nodes,
+      "leaves": self.leaves,
+      "winner_calls": self.winner_calls,
+      "cutoffs": self.cutoffs,
+      "first_move_cutoffs": self.first_move_cutoffs,
+      "researches": self.researches,
+      "tt_hits": self.tt_hits,
+      "tt_cutoffs": self.tt_cutoffs,
+      "cutoff_rate": round(self.cutoff_rate, 4),
+      "first_move_cutoff_rate": round(self.first_move_cutoff_rate, 4),
+      "iterations": self.iterations,
+    }
+
+
+def move_deadline(seconds_per_move: float, safety_margin: float = DEFAULT_SAFETY_MARGIN, start: float | None = None) -> float:
+  r"""
+  Deadline for a search on the move clock of a game.
+  :param seconds_per_move: Move clock of the game, GameData.secondsPerMove
+  :param safety_margin: Seconds left for the network
+  :param start: time.monotonic() when the turn started, now by default
+  :return: time.monotonic() value to stop searching at
+  """
+  if start is None:
+    start = time.monotonic()
+  return start + max(seconds_per_move - safety_margin, 0.0)
+
+
+def table_key(board: Board, symbol: int) -> int:
+  return board.hash ^ SIDE_KEY if symbol == -1 else board.hash
+
+
+def score_to_table(score: int, ply: int) -> int:
+  # Wins are stored relative to the node, not the root
+  if score > WIN_THRESHOLD:
+    return score + ply
+  if score < -WIN_THRESHOLD:
+    return score - ply
+  return score
+
+
+def score_from_table(score: int, ply: int) -> int:
+  if score > WIN_THRESHOLD:
+    return score - ply
+  if score < -WIN_THRESHOLD:
+    return score + ply
+  return score
+
+
+class SearchEngine:
+  r"""
+  Negamax alpha-beta search with principal variation search.
+  Moves are ordered by principal variation, transposition table move, killer moves and then
+  by static score with the history heuristic breaking ties. Only the moves that are not tried
+  before a cutoff get statically scored. Scores inside the search are from the point of view
+  of the side to move; returned Move scores are from X's point of view like chain_evaluation.
+  The table, killers and history persist between searches, so one engine should be kept per game.
+  """
+  def __init__(self, table: TranspositionTable | None = None, vectorized: bool = True):
+    r"""
+    :param table: Transposition table, a new one by default
+    :param vectorized: Score the candidates of array boards in one batched NumPy call
+    """
+    self.table = table if table is not None else TranspositionTable()
+    self.vectorized = vectorized
+    self.killers: list[list[tuple[int, int]]] = []
+    self.history: dict[tuple[int, int, int], int] = {}
+    self.stats = SearchStats()
+    self.deadline: float | None = None
+    # Set from another thread to abort the running search with SearchTimeout
+    self.stop_requested: bool = False
+    # Moves the running search may choose from at the root, None for all of them
+    self.root_moves: list[tuple[int, int]] | None = None
+
+  def new_search(self):
+    self.stats = SearchStats()
+    self.table.reset_stats()
+    # Older history counts matter less in the new position
+    self.history = {key: value // 2 for key, value in self.history.items() if value > 1}
+
+  def search(self, board: Board, symbol: int, target: int, depth: int, deadline: float | None = None,
+             pv: list[tuple[int, int]] | None = None, root_moves: list[tuple[int, int]] | None = None) -> Move:
+    r"""
+    Searches the position to a fixed depth.
+    :param board: Position to search, it is not modified
+    :param symbol: Symbol to move
+    :param target: Number of consecutive marks to win
+    :param depth: Depth in plies
+    :param deadline: time.monotonic() value after which SearchTimeout is raised
+    :param pv: Principal variation of a previous search to try first
+    :param root_moves: Moves to choose from, such as the defences found by the tactical solver, all by default
+    :return: Best move, with moveX and moveY -1 when there is no move to make
+    """
+    self.deadline = deadline
+    self.root_move: tuple[int, int] | None = None
+    self.root_moves = root_moves
+    line = board.copy()
+    try:
+      score = self.negamax(line, depth, -INFINITY, INFINITY, symbol, target, 0, pv or [])
+    finally:
+      self.root_moves = None
+      self.stats.winner_calls += line.winner_calls
+    if self.root_move is None:
+      return Move(symbol, -1, -1, symbol * score)
+    return Move(symbol, self.root_move[0], self.root_move[1], symbol * score)
+
+  def iterative_deepening(self, board: Board, symbol: int, target: int, deadline: float,
+                          max_depth: int | None = None, root_moves: list[tuple[int, int]] | None = None,
+                          previous: SearchResult | None = None) -> SearchResult | None:
+    r"""
+    Searches depth 1, 2, 3... until the deadline and returns the deepest completed search.
+    Each iteration tries the principal variation of the previous one first.
+    Depth 1 always completes so there is a move to play even with no time left, unless stop_requested is set.
+    :param board: Position to search, it is not modified
+    :param symbol: Symbol to move
+    :param target: Number of consecutive marks to win
+    :param deadline: time.monotonic() value to stop at
+    :param max_depth: Deepest iteration, by default the number of empty cells
+    :param root_moves: Moves to choose from, all by default
+    :param previous: Completed result for the position, such as a pondered one. Deepening goes on from the
+      depth after it, starting with its principal variation, and it is returned when no deeper iteration completes.
+    :return: Result of the deepest completed iteration, None when stopped before depth 1 completed
+    """
+    start = time.monotonic()
+    self.new_search()
+    if max_depth is None:
+      max_depth = int((board.board == 0).sum())
+
+    result = previous
+    pv: list[tuple[int, int]] = previous.pv if previous is not None else []
+    first_depth = previous.depth + 1 if previous is not None else 1
+    if previous is not None and abs(previous.move.score) > WIN_THRESHOLD:
+      return previous
+    for depth in range(first_depth, max(max_depth, 1) + 1):
+      try:
+        move = self.search(board, symbol, target, depth, deadline if depth > 1 else None, pv, root_moves)
+      except SearchTimeout:
+        self.record_iteration(depth, start, False)
+        break
+      self.record_iteration(depth, start, True)
+      pv = self.principal_variation(board, symbol, depth)
+      result = SearchResult(move, depth, time.monotonic() - start, pv)
+      if time.monotonic() >= deadline or abs(move.score) > WIN_THRESHOLD:
+        break
+    return result
+
+  def record_iteration(self, depth: int, start: float, completed: bool):
+    self.stats.iterations.append({
+      "depth": depth,
+      "seconds": round(time.monotonic() - start, 4),
+      "nodes": self.stats.nodes,
+      "completed": completed,
+    })
+
+  def principal_variation(self, board: Board, symbol: int, depth: int) -> list[tuple[int, int]]:
+    r"""
+    Follows the best moves stored in the table from the current position.
+    :param symbol: Symbol to move in the current position
+    :return: Moves of the principal variation, at most depth long
+    """
+    pv: list[tuple[int, int]] = []
+    line = board.copy()
+    while len(pv) < depth:
+      entry = self.table.probe(table_key(line, symbol))
+      if entry is None or entry.move is None or not line.is_valid_move(*entry.move):
+        break
+      pv.append(entry.move)
+      line.make_move(*entry.move, symbol)
+      symbol = -symbol
+    return pv
+
+  def scored_moves(self, board: Board, symbol: int, target: int) -> list[Move]:
+    if self.vectorized and isinstance(board, Board):
+      return generate_moves_vectorized(board, symbol, target)
+    return board.generate_moves(symbol, target)
+
+  def ordered_moves(self, board: Board, symbol: int, target: int, ply: int,
+                    first: list[tuple[int, int]]) -> Iterator[tuple[int, int]]:
+    # Cheap moves first: they often cut off before the rest has to be generated and scored
+    tried = set()
+    allowed = set(self.root_moves) if ply == 0 and self.root_moves is not None else None
+    if ply < len(self.killers):
+      first = first + self.killers[ply]
+    for cell in first:
+      if cell not in tried and board.is_valid_move(*cell) and (allowed is None or cell in allowed):
+        tried.add(cell)
+        yield cell
+
+    history = self.history
+    moves = self.scored_moves(board, symbol, target)
+    if allowed is not None:
+      moves = [move for move in moves if (move.moveX, move.moveY) in allowed]
+    moves.sort(key=lambda move: (symbol * move.score, history.get((symbol, move.moveX, move.moveY), 0)), reverse=True)
+    for move in moves:
+      cell = (move.moveX, move.moveY)
+      if cell not in tried:
+        yield cell
+
+  def store_cutoff(self, cell: tuple[int, int], symbol: int, depth: int, ply: int):
+    while len(self.killers) <= ply:
+      self.killers.append([])
+    killers = self.killers[ply]
+    if cell not in killers:
+      killers.insert(0, cell)
+      del killers[2:]
+    key = (symbol, *cell)
+    self.history[key] = self.history.get(key, 0) + depth * depth
+
+  def negamax(self, board: Board, depth: int, alpha: int, beta: int, symbol: int, target: int, ply: int,
+              pv: list[tuple[int, int]]) -> int:
+    stats = self.stats
+    stats.nodes += 1
+    if self.stop_requested or (self.deadline is not None and time.monotonic() > self.deadline):
+      raise SearchTimeout()
+
+    winner = board.winner(target)
+    if winner != 0:
+      stats.leaves += 1
+      return (WIN_SCORE - ply) * winner * symbol
+    if depth == 0:
+      stats.leaves += 1
+      return symbol * board.evaluation()
+
+    key = table_key(board, symbol)
+    first: list[tuple[int, int]] = pv[:1]
+    entry = self.table.probe(key)
+    if entry is not None:
+      stats.tt_hits += 1
+      if ply > 0 and entry.depth >= depth:
+        score = score_from_table(entry.score, ply)
+        if entry.bound == EXACT or (entry.bound == LOWER and score >= beta) or (entry.bound == UPPER and score <= alpha):
+          stats.tt_cutoffs += 1
+          return score
+      if entry.move is not None:
+        first.append(entry.move)
+
+    original_alpha = alpha
+    best_score = -INFINITY
+    best_cell = None
+    searched = 0
+    for cell in self.ordered_moves(board, symbol, target, ply, first):
+      child_pv = pv[1:] if pv and cell == pv[0] else []
+      board.make_move(cell[0], cell[1], symbol)
+      if searched == 0:
+        score = -self.negamax(board, depth - 1, -beta, -alpha, -symbol, target, ply + 1, child_pv)
+      else:
+        # Later moves only have to be proven worse than the best so far
+        score = -self.negamax(board, depth - 1, -alpha - 1, -alpha, -symbol, target, ply + 1, child_pv)
+        if alpha < score < beta:
+          stats.researches += 1
+          score = -self.negamax(board, depth - 1, -beta, -alpha, -symbol, target, ply + 1, child_pv)
+      board.unmake_move(cell[0], cell[1])
+      searched += 1
+
+      if score > best_score:
+        best_score = score
+        best_cell = cell
+      if score > alpha:
+        alpha = score
+      if alpha >= beta:
+        stats.cutoffs += 1
+        if searched == 1:
+          stats.first_move_cutoffs += 1
+        self.store_cutoff(cell, symbol, depth, ply)
+        break
+
+    if searched == 0:
+      # Full board: nothing left to play
+      stats.leaves += 1
+      return symbol * board.evaluation()
+
+    if best_score <= original_alpha:
+      bound = UPPER
+    elif best_score >= beta:
+      bound = LOWER
+    else:
+      bound = EXACT
+    if ply == 0 and self.root_moves is not None:
+      # Only some moves were searched, the position is worth at least that much
+      bound = LOWER
+    self.table.store(key, depth, bound, score_to_table(best_score, ply), best_cell)
+    if ply == 0:
+      self.root_move = best_cell
+    return best_score
+
+
+def minmax(board: Board, depth: int, symbol: int, target: int, table: TranspositionTable | None = None,
+           deadline: float | None = None) -> Move:
+  r"""
+  Searches the position to a fixed depth with a new SearchEngine.
+  :return: Best move, its score is from X's point of view
+  """
+  return SearchEngine(table).search(board, symbol, target, depth, deadline)
+
+
+def iterative_deepening(board: Board, symbol: int, target: int, deadline: float, max_depth: int | None = None,
+                        table: TranspositionTable | None = None) -> SearchResult:
+  r"""
+  Iterative deepening with a new SearchEngine, see SearchEngine.iterative_deepening.
+  """
+  return SearchEngine(table).iterative_deepening(board, symbol, target, deadline, max_depth)
@@ -0,0 +1,146 @@
+import sqlite3
+import time
+from typing import Iterable
+from TranspositionTable import EXACT, TableEntry, TranspositionTable
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS results (
+  size INTEGER NOT NULL,
+  target INTEGER NOT NULL,
+  key INTEGER NOT NULL,
+  depth INTEGER NOT NULL,
+  bound INTEGER NOT NULL,
+  score TEXT NOT NULL,
+  x INTEGER,
+  y INTEGER,
+  last_used REAL NOT NULL,
+  PRIMARY KEY (size, target, key)
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def to_signed(key: int) -> int:
+  # SQLite integers are signed 64-bit, Zobrist hashes are unsigned
+  return key - 2 ** 64 if key >= 2 ** 63 else key
+
+
+def to_unsigned(key: int) -> int:
+  return key + 2 ** 64 if key < 0 else key
+
+
+class SearchCache:
+  r"""
+  Search results kept on disk in SQLite between games, keyed by (size, target, position hash).
+  Entries have the same fields as TranspositionTable entries, the hash includes the side to move.
+  Scores are stored as text because win scores do not fit in a 64-bit integer.
+  When there are more than max_entries rows the least recently used ones are deleted.
+  The database is only opened on first use.
+  """
+  def __init__(self, path: str, max_entries: int = 1_000_000):
+    r"""
+    :param path: SQLite database file, created if missing
+    :param max_entries: Most entries kept in the file
+    """
+    self.path = path
+    self.max_entries = max_entries
+    self.connection: sqlite3.Connection | None = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def __len__(self) -> int:
+    return self.connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+  def connect(self) -> sqlite3.Connection:
+    if self.connection is None:
+      self.connection = sqlite3.connect(self.path)
+      self.connection.executescript(SCHEMA)
+    return self.connection
+
+  def close(self):
+    if self.connection is not None:
+      self.connection.close()
+      self.connection = None
+
+  def lookup(self, size: int, target: int, key: int) -> TableEntry | None:
+    r"""
+    :param key: Position hash with the side to move, see Search.table_key
+    :return: Stored entry or None
+    """
+    connection = self.connect()
+    row = connection.execute(
+      "SELECT depth, bound, score, x, y FROM results WHERE size = ? AND target = ? AND key = ?",
+      (size, target, to_signed(key))
+    ).fetchone()
+    if row is None:
+      return None
+    with connection:
+      connection.execute(
+        "UPDATE results SET last_used = ? WHERE size = ? AND target = ? AND key = ?",
+        (time.time(), size, target, to_signed(key))
+      )
+    depth, bound, score, x, y = row
+    return TableEntry(key, depth, bound, int(score), None if x is None else (x, y))
+
+  def store(self, size: int, target: int, entry: TableEntry):
+    self.store_many(size, target, [entry])
+
+  def store_many(self, size: int, target: int, entries: Iterable[TableEntry]):
+    r"""
+    Stores entries, keeping a stored entry instead when it was searched deeper.
+    """
+    now = time.time()
+    rows = [
+      (size, target, to_signed(entry.key), entry.depth, entry.bound, str(entry.score),
+       *(entry.move if entry.move is not None else (None, None)), now)
+      for entry in entries
+    ]
+    connection = self.connect()
+    with connection:
+      connection.executemany(
+        "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (size, target, key) DO UPDATE SET "
+        "depth = excluded.depth, bound = excluded.bound, score = excluded.score, "
+        "x = excluded.x, y = excluded.y, last_used = excluded.last_used "
+        "WHERE excluded.depth >= results.depth",
+        rows
+      )
+    self.evict()
+
+  def evict(self):
+    connection = self.connect()
+    excess = len(self) - self.max_entries
+    if excess > 0:
+      with connection:
+        connection.execute(
+          "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+          (excess,)
+        )
+
+  def save_table(self, table: TranspositionTable, size: int, target: int, min_depth: int = 2) -> int:
+    r"""
+    Stores the exact results of a transposition table that were searched deep enough to be worth keeping.
+    :return: Number of entries stored
+    """
+    entries = [entry for entry in table.entries() if entry.bound == EXACT and entry.depth >= min_depth]
+    self.store_many(size, target, entries)
+    return len(entries)
+
+  def warm(self, table: TranspositionTable, size: int, target: int, limit: int = 100_000) -> int:
+    r"""
+    Loads the most recently used entries of a size and target into a transposition table.
+    :return: Number of entries loaded
+    """
+    rows = self.connect().execute(
+      "SELECT key, depth, bound, score, x, y FROM results WHERE size = ? AND target = ? "
+      "ORDER BY last_used DESC LIMIT ?",
+      (size, target, limit)
+    ).fetchall()
+    # Oldest first, so the most recent entries win the table slots
+    for key, depth, bound, score, x, y in reversed(rows):
+      table.store(to_unsigned(key), depth, bound, int(score), None if x is None else (x, y))
+    return len(rows)
@@ -0,0 +1,234 @@
+from dataclasses import dataclass, field
+from Board import DIRECTIONS, spiral_ranks
+
+# Kinds of tactical answers
+WIN: str = "win"
+BLOCK: str = "block"
+FORCED_WIN: str = "forced_win"
+DEFEND: str = "defend"
+
+
+@dataclass
+class TacticalResult:
+  kind: str
+  move: tuple[int, int]
+  # Forcing line starting with move, alternating attacker and defender moves
+  sequence: list[tuple[int, int]] = field(default_factory=list)
+  # DEFEND: every cell found to stop the opponent's forced win, move is one of them
+  candidates: list[tuple[int, int]] = field(default_factory=list)
+
+  @property
+  def decisive(self) -> bool:
+    r"""
+    Whether move can be played without a search. A DEFEND with several candidates is not:
+    the search has to choose among them.
+    """
+    return self.kind != DEFEND or len(self.candidates) == 1
+
+
+class NodeBudgetExceeded(Exception):
+  pass
+
+
+class ThreatSolver:
+  r"""
+  Tactical search over forcing moves only, to run before the main search.
+  A threat is a move after which one more stone completes `target` in a row.
+  The solver answers, in order: a move that wins now, a block of the opponent's win,
+  the first move of a forced win by continuous threats (VCF), and the moves that stop the
+  opponent's forced win. VCF lines only continue while each defence is the single
+  cell that stops the threat and does not make a threat of its own, so a line it finds is
+  a real forced win. The search is bounded by depth and node count to stay within milliseconds.
+  It works on a plain list copy of the cells, so it accepts Board and BitBoard.
+  """
+  def __init__(self, max_depth: int = 8, max_nodes: int = 20_000, radius: int = 2, defence_nodes: int = 1_000):
+    r"""
+    :param max_depth: Most attacker moves in a forcing line
+    :param max_nodes: Most forcing positions looked at per solve
+    :param radius: Attacker moves are looked for within this distance of placed stones
+    :param defence_nodes: Most forcing positions looked at to test one defence
+    """
+    self.max_depth = max_depth
+    self.max_nodes = max_nodes
+    self.defence_nodes = defence_nodes
+    self.radius = radius
+    self.nodes = 0
+
+  def solve(self, board, symbol: int, target: int) -> TacticalResult | None:
+    r"""
+    Looks for a tactical answer in the position.
+    :param board: Board or BitBoard, it is not modified
+    :param symbol: Symbol to move
+    :param target: Number of consecutive marks to win
+    :return: Tactical answer or None when the position needs the main search
+    """
+    self.size = board.size
+    self.target = target
+    self.grid: list[list[int]] = board.board.tolist()
+    self.ranks = spiral_ranks(board.size)
+    self.nodes = 0
+
+    wins = self.winning_cells(symbol)
+    if wins:
+      return TacticalResult(WIN, wins[0], [wins[0]])
+    losses = self.winning_cells(-symbol)
+    if losses:
+      return TacticalResult(BLOCK, losses[0], [losses[0]])
+
+    sequence = self.vcf_from_root(symbol)
+    if sequence:
+      return TacticalResult(FORCED_WIN, sequence[0], sequence)
+    sequence = self.vcf_from_root(-symbol)
+    if sequence:
+      defences = self.defences(-symbol)
+      if defences:
+        return TacticalResult(DEFEND, defences[0], sequence, defences)
+    return None
+
+  def defences(self, attacker: int) -> list[tuple[int, int]]:
+    r"""
+    Cells near the stones where a defender stone stops the attacker's forced win: the stone makes a threat
+    the attacker has to answer first, or the attacker has no VCF after it. A test that runs out of its node
+    budget keeps the cell, so the main search decides about it.
+    :return: The cells, empty when every move loses
+    """
+    grid = self.grid
+    max_nodes = self.max_nodes
+    self.max_nodes = self.defence_nodes
+    found = []
+    try:
+      for x, y in self.sorted_cells(self.near_stones(attacker) | self.near_stones(-attacker)):
+        if grid[x][y] != 0:
+          continue
+        grid[x][y] = -attacker
+        self.nodes = 0
+        if self.threats_through(x, y, -attacker) or not self.vcf_from_root(attacker):
+          found.append((x, y))
+        grid[x][y] = 0
+    finally:
+      self.max_nodes = max_nodes
+    return found
+
+  def vcf_from_root(self, attacker: int) -> list[tuple[int, int]] | None:
+    self.failed: set[tuple[frozenset, int]] = set()
+    try:
+      return self.vcf(attacker, self.max_depth, self.near_stones(attacker), [])
+    except NodeBudgetExceeded:
+      return None
+
+  def sorted_cells(self, cells) -> list[tuple[int, int]]:
+    return sorted(cells, key=lambda cell: self.ranks[cell[0]][cell[1]])
+
+  def winning_cells(self, symbol: int) -> list[tuple[int, int]]:
+    # Empty cells that complete target in a row for symbol, found by sliding a window over every line
+    n = self.size
+    target = self.target
+    grid = self.grid
+    lines = [[(i, j) for j in range(n)] for i in range(n)]
+    lines += [[(i, j) for i in range(n)] for j in range(n)]
+    lines += [[(i, i + k) for i in range(n) if 0 <= i + k < n] for k in range(1 - n, n)]
+    lines += [[(i, k - i) for i in range(n) if 0 <= k - i < n] for k in range(2 * n - 1)]
+    found = set()
+    for line in lines:
+      if len(line) < target:
+        continue
+      values = [grid[x][y] for x, y in line]
+      own = values[:target].count(symbol)
+      empty = values[:target].count(0)
+      for start in range(len(line) - target + 1):
+        if start > 0:
+          leaving, entering = values[start - 1], values[start + target - 1]
+          own += (entering == symbol) - (leaving == symbol)
+          empty += (entering == 0) - (leaving == 0)
+        if own == target - 1 and empty == 1:
+          found.add(line[start + values[start:start + target].index(0)])
+    return self.sorted_cells(found)
+
+  def threats_through(self, x: int, y: int, symbol: int) -> set[tuple[int, int]]:
+    # Winning cells for symbol in the windows of `target` cells that contain (x, y)
+    n = self.size
+    target = self.target
+    grid = self.grid
+    found = set()
+    for dx, dy in DIRECTIONS:
+      cells = []
+      for step in range(1 - target, target):
+        i, j = x + step * dx, y + step * dy
+        if 0 <= i < n and 0 <= j < n:
+          cells.append((i, j))
+      if len(cells) < target:
+        continue
+      values = [grid[i][j] for i, j in cells]
+      own = values[:target].count(symbol)
+      empty = values[:target].count(0)
+      for start in range(len(cells) - target + 1):
+        if start > 0:
+          leaving, entering = values[start - 1], values[start + target - 1]
+          own += (entering == symbol) - (leaving == symbol)
+          empty += (entering == 0) - (leaving == 0)
+        if own == target - 1 and empty == 1:
+          found.add(cells[start + values[start:start + target].index(0)])
+    return found
+
+  def near(self, x: int, y: int) -> set[tuple[int, int]]:
+    n = self.size
+    radius = self.radius
+    return {
+      (i, j)
+      for i in range(max(0, x - radius), min(n, x + radius + 1))
+      for j in range(max(0, y - radius), min(n, y + radius + 1))
+    }
+
+  def near_stones(self, symbol: int) -> set[tuple[int, int]]:
+    cells = set()
+    for x, row in enumerate(self.grid):
+      for y, value in enumerate(row):
+        if value == symbol:
+          cells |= self.near(x, y)
+    return cells
+
+  def vcf(self, attacker: int, depth: int, candidates: set[tuple[int, int]],
+          played: list[tuple[int, int]]) -> list[tuple[int, int]] | None:
+    self.nodes += 1
+    if self.nodes > self.max_nodes:
+      raise NodeBudgetExceeded()
+    state = (frozenset(played), depth)
+    if state in self.failed:
+      return None
+
+    grid = self.grid
+    for x, y in self.sorted_cells(candidates):
+      if grid[x][y] != 0:
+        continue
+      grid[x][y] = attacker
+      threats = self.threats_through(x, y, attacker)
+      if len(threats) >= 2:
+        # The defender can only block one of them
+        grid[x][y] = 0
+        return [(x, y)]
+      if len(threats) == 1 and depth > 1:
+        block_x, block_y = next(iter(threats))
+        grid[block_x][block_y] = -attacker
+        if not self.threats_through(block_x, block_y, -attacker):
+          line = self.vcf(
+            attacker,
+            depth - 1,
+            candidates | self.near(x, y),
+            played + [(x, y), (block_x, block_y)]
+          )
+          if line is not None:
+            grid[block_x][block_y] = 0
+            grid[x][y] = 0
+            return [(x, y), (block_x, block_y)] + line
+        grid[block_x][block_y] = 0
+      grid[x][y] = 0
+
+    self.failed.add(state)
+    return None
+
+
+def find_forcing_move(board, symbol: int, target: int, max_depth: int = 8, max_nodes: int = 20_000) -> TacticalResult | None:
+  r"""
+  Runs a ThreatSolver on the position, see ThreatSolver.solve.
+  """
+  return ThreatSolver(max_depth, max_nodes, board.radius or 2).solve(board, symbol, target)
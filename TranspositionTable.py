@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import Iterator
+
+# Bound types of a stored score
+EXACT: int = 0
+LOWER: int = 1
+UPPER: int = 2
+
+# Rough size of one stored entry with its slot in the table, used to turn a memory budget into a slot count
+ENTRY_BYTES: int = 200
+
+
+@dataclass
+class TableEntry:
+  key: int
+  depth: int
+  bound: int
+  score: int
+  move: tuple[int, int] | None
+
+
+class TranspositionTable:
+  r"""
+  Fixed size table of search results keyed by the Zobrist hash of a position.
+  Each bucket has two slots: a depth-preferred slot that keeps the deepest result seen
+  and an always-replace slot that takes everything the depth-preferred slot rejects.
+  The number of buckets is a power of two derived from the memory budget and never grows.
+  """
+  def __init__(self, megabytes: float = 64):
+    r"""
+    :param megabytes: Approximate memory budget of the table
+    """
+    buckets = 1
+    while buckets * 4 * ENTRY_BYTES <= megabytes * 1024 * 1024:
+      buckets *= 2
+    self.mask: int = buckets - 1
+    self.depth_slots: list[TableEntry | None] = [None] * buckets
+    self.always_slots: list[TableEntry | None] = [None] * buckets
+    self.hits: int = 0
+    self.misses: int = 0
+    self.collisions: int = 0
+    self.stores: int = 0
+
+  def __len__(self) -> int:
+    return len(self.depth_slots) * 2
+
+  def probe(self, key: int) -> TableEntry | None:
+    r"""
+    Looks up a position.
+    A probe that finds its bucket filled by other positions counts as a collision.
+    :param key: Zobrist hash of the position
+    :return: Stored entry or None
+    """
+    index = key & self.mask
+    depth_entry = self.depth_slots[index]
+    if depth_entry is not None and depth_entry.key == key:
+      self.hits += 1
+      return depth_entry
+    always_entry = self.always_slots[index]
+    if always_entry is not None and always_entry.key == key:
+      self.hits += 1
+      return always_entry
+    self.misses += 1
+    if depth_entry is not None or always_entry is not None:
+      self.collisions += 1
+    return None
+
+  def store(self, key: int, depth: int, bound: int, score: int, move: tuple[int, int] | None):
+    r"""
+    Stores a search result.
+    :param key: Zobrist hash of the position
+    :param depth: Remaining depth the position was searched to
+    :param bound: EXACT, LOWER or UPPER
+    :param score: Score of the position
+    :param move: Best move found, if any
+    """
+    self.stores += 1
+    index = key & self.mask
+    entry = TableEntry(key, depth, bound, score, move)
+    current = self.depth_slots[index]
+    if current is None or current.key == key or depth >= current.depth:
+      if current is not None and current.key != key:
+        # The displaced entry is still the newest result for its position
+        self.always_slots[index] = current
+      elif self.always_slots[index] is not None and self.always_slots[index].key == key:
+        self.always_slots[index] = None
+      self.depth_slots[index] = entry
+    else:
+      self.always_slots[index] = entry
+
+  def entries(self) -> Iterator[TableEntry]:
+    for entry in self.depth_slots + self.always_slots:
+      if entry is not None:
+        yield entry
+
+  def clear(self):
+    self.depth_slots = [None] * len(self.depth_slots)
+    self.always_slots = [None] * len(self.always_slots)
+    self.reset_stats()
+
+  def reset_stats(self):
+    self.hits = 0
+    self.misses = 0
+    self.collisions = 0
+    self.stores = 0
+
+  def stats(self) -> dict[str, int]:
+    return {
+      "slots": len(self),
+      "stores": self.stores,
+      "hits": self.hits,
+      "misses": self.misses,
+      "collisions": self.collisions,
+    }
@@ -0,0 +1,190 @@
+import numpy as np
+from functools import lru_cache
+from Board import Move
+
+
+@lru_cache(maxsize=None)
+def line_indices(size: int) -> np.ndarray:
+  r"""
+  Flat cell indices of every line chain_evaluation scans, one line per row.
+  Lines shorter than the board are padded with index size * size, which points at an empty cell
+  appended to the flattened board. The two main diagonals appear twice, as in chain_evaluation.
+  :param size: Size of the board
+  :return: Array of shape (6 * size, size)
+  """
+  padding = size * size
+  lines = np.full((6 * size, size), padding, dtype=np.intp)
+  starts = []
+  for i in range(size):
+    starts += [(i, 0, 0, 1), (0, i, 1, 0), (0, i, 1, 1), (i, 0, 1, 1), (0, i, 1, -1), (i, size - 1, 1, -1)]
+  for line, (x, y, dx, dy) in enumerate(starts):
+    position = 0
+    while 0 <= x < size and 0 <= y < size:
+      lines[line, position] = x * size + y
+      position += 1
+      x += dx
+      y += dy
+  return lines
+
+
+def as_stack(boards: np.ndarray) -> np.ndarray:
+  boards = np.asarray(boards)
+  return boards[None] if boards.ndim == 2 else boards
+
+
+def gather_lines(boards: np.ndarray) -> np.ndarray:
+  # (k, n, n) boards -> (k, 6n, n) line values
+  count, size, _ = boards.shape
+  flat = np.zeros((count, size * size + 1), dtype=np.int8)
+  flat[:, :-1] = boards.reshape(count, -1)
+  return flat[:, line_indices(size)]
+
+
+def run_lengths(lines: np.ndarray, symbol: int) -> np.ndarray:
+  r"""
+  Length of the run of `symbol` ending at every position of every line, 0 on other cells.
+  The run length is the distance to the last cell that is not `symbol`, found with a running maximum.
+  """
+  positions = np.arange(lines.shape[-1], dtype=np.int16)
+  last_break = np.where(lines != symbol, positions, np.int16(-1))
+  np.maximum.accumulate(last_break, axis=-1, out=last_break)
+  return positions - last_break
+
+
+@lru_cache(maxsize=None)
+def cell_lines(size: int) -> tuple[np.ndarray, np.ndarray]:
+  r"""
+  The lines of line_indices crossing each cell, padded to 6 per cell with the extra line 6 * size.
+  :return: Line numbers and position of the cell within each line, both of shape (size * size, 6)
+  """
+  lines = np.full((size * size, 6), 6 * size, dtype=np.intp)
+  positions = np.zeros((size * size, 6), dtype=np.intp)
+  filled = [0] * (size * size)
+  for line, cells in enumerate(line_indices(size).tolist()):
+    for position, cell in enumerate(cells):
+      if cell < size * size:
+        lines[cell, filled[cell]] = line
+        positions[cell, filled[cell]] = position
+        filled[cell] += 1
+  return lines, positions
+
+
+def safe_run(size: int, terms: int) -> int:
+  # Longest run for which an int64 sum of `terms` values up to 10 ** (run - 1) cannot overflow
+  run = 1
+  while run < size and terms * 10 ** run < 2 ** 63:
+    run += 1
+  return run
+
+
+def line_scores(lines: np.ndarray, limit: int) -> tuple[np.ndarray, np.ndarray]:
+  r"""
+  Scores of lines as in chain_evaluation: a stone that ends a run of length r scores 10 ** (r - 1),
+  positive for X and negative for O.
+  :param lines: Line values with the cells on the last axis
+  :param limit: Longest run that is scored, longer runs score 0 and must be rescored exactly
+  :return: Scores per line and the longest run per line
+  """
+  x_runs = run_lengths(lines, 1)
+  o_runs = run_lengths(lines, -1)
+  powers = np.zeros(lines.shape[-1] + 1, dtype=np.int64)
+  powers[1:limit + 1] = 10 ** np.arange(limit, dtype=np.int64)
+  scores = powers[x_runs].sum(axis=-1) - powers[o_runs].sum(axis=-1)
+  return scores, np.maximum(x_runs.max(axis=-1), o_runs.max(axis=-1))
+
+
+def exact_line_scores(lines: np.ndarray) -> list[int]:
+  # Python integer scores of the lines of one board, for runs too long for int64
+  powers = np.array([0] + [10 ** power for power in range(lines.shape[-1])], dtype=object)
+  return [int(powers[run_lengths(line, 1)].sum() - powers[run_lengths(line, -1)].sum()) for line in lines]
+
+
+def vector_chain_evaluation(boards: np.ndarray):
+  r"""
+  chain_evaluation of a board or of a stack of boards, computed for all lines at once.
+  Boards with runs too long for int64 are scored with Python integers.
+  :param boards: Array of shape (n, n) or (k, n, n)
+  :return: Score as int for a single board, array of k scores for a stack
+  """
+  single = np.asarray(boards).ndim == 2
+  stack = as_stack(boards)
+  size = stack.shape[-1]
+  lines = gather_lines(stack)
+  limit = safe_run(size, 6 * size * size)
+  scores, longest = line_scores(lines, limit)
+  scores = scores.sum(axis=1)
+
+  overflowing = np.nonzero(longest.max(axis=1) > limit)[0]
+  if overflowing.size:
+    scores = scores.astype(object)
+    for index in overflowing:
+      scores[index] = sum(exact_line_scores(lines[index]))
+  return int(scores[0]) if single else scores
+
+
+def vector_winner(boards: np.ndarray, target: int):
+  r"""
+  Winner of a board or of a stack of boards, from the run lengths of all lines at once.
+  :param boards: Array of shape (n, n) or (k, n, n)
+  :param target: Number of consecutive marks to win
+  :return: 1, -1 or 0 as int for a single board, array of k winners for a stack
+  """
+  single = np.asarray(boards).ndim == 2
+  lines = gather_lines(as_stack(boards))
+  x_wins = run_lengths(lines, 1).max(axis=(1, 2)) >= target
+  o_wins = run_lengths(lines, -1).max(axis=(1, 2)) >= target
+  winners = np.where(x_wins, 1, np.where(o_wins, -1, 0))
+  return int(winners[0]) if single else winners
+
+
+def score_moves(board, symbol: int, cells: list[tuple[int, int]]) -> list[int]:
+  r"""
+  Scores placing `symbol` on each of the cells with one batched evaluation.
+  The board is scored once, then only the lines crossing each candidate are rescored as a
+  (k, 6, n) stack and their difference is added to the board score.
+  :param board: Board or BitBoard
+  :param symbol: Symbol to place
+  :param cells: Empty cells to try
+  :return: Scores in the order of cells
+  """
+  if not cells:
+    return []
+  cells_array = board.board
+  size = board.size
+  lines = gather_lines(cells_array[None])[0]
+  limit = safe_run(size, 6 * size)
+  base_scores, longest = line_scores(lines, limit)
+  if 2 * longest.max() + 1 > limit:
+    # A placed stone could join runs into one too long for int64, score whole boards instead
+    rows, columns = np.array(cells).T
+    stack = np.repeat(cells_array[None], len(cells), axis=0)
+    stack[np.arange(len(cells)), rows, columns] = symbol
+    return [int(score) for score in vector_chain_evaluation(stack)]
+
+  crossing, positions = cell_lines(size)
+  flat_cells = np.array([x * size + y for x, y in cells])
+  line_ids = crossing[flat_cells]
+  padded_lines = np.vstack([lines, np.zeros((1, size), dtype=lines.dtype)])
+  padded_scores = np.append(base_scores, 0)
+  changed = padded_lines[line_ids]
+  changed[np.arange(len(cells))[:, None], np.arange(6)[None, :], positions[flat_cells]] = symbol
+  changed[line_ids == 6 * size] = 0
+  new_scores, _ = line_scores(changed, limit)
+  deltas = (new_scores - padded_scores[line_ids]).sum(axis=1)
+  base = sum(base_scores.tolist())
+  return [base + int(delta) for delta in deltas]
+
+
+def generate_moves_vectorized(board, symbol: int, target: int) -> list[Move]:
+  r"""
+  Same moves, order and scores as board.generate_moves, with all candidates scored in one batch.
+  :param board: Board or BitBoard
+  :param symbol: Symbol to place
+  :param target: Number of consecutive marks to win
+  :return: List of moves
+  """
+  if board.winner(target) != 0:
+    return []
+  cells = list(board.candidate_cells())
+  scores = score_moves(board, symbol, cells)
+  return [Move(symbol, x, y, score) for (x, y), score in zip(cells, scores)]
@@ -2,9 +2,26 @@ import sys
 import dotenv
 import os
 import argparse
-from HttpGameClient import HttpGameClient, Session
-from Board import CELLS_TO_TEXT, Board, minmax, Move
+from HttpGameClient import DEFAULT_BACKOFF, DEFAULT_ENDPOINT, DEFAULT_POOL_SIZE, DEFAULT_RETRIES, HttpGameClient, Session, endpoint_timeouts
+from Board import CELLS_TO_TEXT, DEFAULT_RADIUS, Board, Move
+from BitBoard import BitBoard
+from TranspositionTable import EXACT, TranspositionTable
+from Search import DEFAULT_SAFETY_MARGIN, WIN_SCORE, SearchEngine, move_deadline, table_key
+from ParallelSearch import ParallelSearch
+from Ponder import Ponderer
+from Tactics import FORCED_WIN, WIN, find_forcing_move
+from OpeningBook import OpeningBook
+from SearchCache import SearchCache
+from GameTracker import GameTracker
+from PollScheduler import PollScheduler
+from GameRecord import archive_games
+from Profiling import CPROFILE, SAMPLE, MoveLog, MoveProfiler
+from CachedGameClient import CachedGameClient
+from AsyncHttpGameClient import AsyncHttpGameClient, AsyncSession
+from BotDaemon import BotDaemon, DaemonConfig
+import asyncio
 import time
+from contextlib import nullcontext
 from retry import retry
 from requests.exceptions import RetryError
 
@@ -16,33 +33,254 @@ You can set them in the .env file in the root directory of the project or in the
 """
 
 
-def get_new_move(client, game_id: int, team_id: int) -> Board:
+BOARD_BACKENDS: dict[str, type] = {
+  "array": Board,
+  "bitboard": BitBoard,
+}
+
+
+def get_new_move(client, game_id: int, team_id: int, board_class: type = Board,
+                 tracker: GameTracker | None = None, scheduler: PollScheduler | None = None) -> Board:
   """
   Plays the game with given game_id and team_id.
-  :param client: Client object for interacting with the game server
+  :param client: CachedGameClient for interacting with the game server, polls bypass its cache
   :param game_id: ID of the game
   :param team_id: ID of the team
+  :param board_class: Board implementation to return
+  :param tracker: Tracker of the game, when given its board is synced and returned instead of downloading the board
+  :param scheduler: Decides the delay between polls, every second by default
   """
   
   while True:
-    time.sleep(1)
+    time.sleep(scheduler.next_delay() if scheduler is not None else 1)
     details = None
     
     @retry((ConnectionError, TimeoutError), delay=1, backoff=1, max_delay=10, tries=100)
     def get_game_details_with_retry(game_id):
-      return client.getGameDetails(game_id)
+      return client.getGameDetails(game_id, fresh=True)
     
     try:
+      poll_start = time.monotonic()
       details = get_game_details_with_retry(game_id)
     except RetryError:
       print("Max retries exceeded. Exiting...")
       raise
+    if scheduler is not None:
+      scheduler.record_poll(time.monotonic() - poll_start)
     
-    if details.winnerTeamId is not None:
-      return client.getBoardObject(game_id)
-    
-    if details.turnTeamId == team_id:
-      return client.getBoardObject(game_id)
+    if details.winnerTeamId is not None or details.turnTeamId == team_id:
+      if scheduler is not None:
+        scheduler.opponent_moved()
+      if tracker is not None:
+        return tracker.sync(details)
+      return client.getBoardObject(game_id, board_class, fresh=True)
+
+
+def create_engine(args: argparse.Namespace) -> SearchEngine:
+  table = TranspositionTable(args.tt_size)
+  if args.workers > 1:
+    return ParallelSearch(args.workers, table, args.tt_size)
+  return SearchEngine(table)
+
+
+def choose_move(board: Board, symbol: int, details, args: argparse.Namespace, engine: SearchEngine,
+                book: OpeningBook | None, cache: SearchCache | None, pondered, turn_start: float) -> tuple[Move, str]:
+  """
+  Picks the bot's move: from the opening book, the tactical solver, the search cache,
+  the pondered result or a new search, in that order. When the tactical solver finds several
+  defences against a forced win of the opponent, the search chooses among them.
+  :param board: Position to move in
+  :param symbol: Symbol of the bot
+  :param details: Game details of the current turn
+  :param pondered: Pondered result for the position or None
+  :param turn_start: time.monotonic() when the opponent's move was seen
+  :return: The move and where it came from
+  """
+  target = details.target
+  if book is not None:
+    cell = book.lookup(board, symbol, target)
+    if cell is not None:
+      return Move(symbol, cell[0], cell[1], 0), "book"
+  
+  root_moves = None
+  if args.tactics:
+    tactic = find_forcing_move(board, symbol, target)
+    if tactic is not None and tactic.decisive:
+      print(f"Tactics: {tactic.kind}, line {tactic.sequence}")
+      score = symbol * WIN_SCORE if tactic.kind in (WIN, FORCED_WIN) else 0
+      return Move(symbol, tactic.move[0], tactic.move[1], score), "tactics"
+    if tactic is not None:
+      print(f"Tactics: {tactic.kind}, searching the defences {tactic.candidates} against line {tactic.sequence}")
+      root_moves = tactic.candidates
+  
+  if cache is not None:
+    entry = cache.lookup(details.boardSize, target, table_key(board, symbol))
+    wanted_depth = args.max_depth if args.time_budget else args.depth
+    if (entry is not None and entry.bound == EXACT and entry.move is not None and wanted_depth is not None
+        and entry.depth >= wanted_depth and board.is_valid_move(*entry.move)
+        and (root_moves is None or entry.move in root_moves)):
+      return Move(symbol, entry.move[0], entry.move[1], symbol * entry.score), "cache"
+  
+  if pondered is not None and root_moves is not None and (pondered.move.moveX, pondered.move.moveY) not in root_moves:
+    # The pondering search missed the opponent's forced win
+    pondered = None
+  if pondered is not None:
+    print(f"Predicted reply, pondered to depth {pondered.depth}")
+  if args.time_budget:
+    deadline = move_deadline(details.secondsPerMove, args.safety_margin, turn_start)
+    # Deepening goes on from the pondered depth, so the pondering time is not spent again
+    result = engine.iterative_deepening(board, symbol, target, deadline, args.max_depth, root_moves, pondered)
+    if result is None:
+      # Stopped before the first iteration completed
+      cell = root_moves[0] if root_moves else next(engine.ordered_moves(board, symbol, target, 0, []))
+      return Move(symbol, cell[0], cell[1], 0), "fallback"
+    if result is pondered:
+      return pondered.move, "ponder"
+    print(f"Searched to depth {result.depth} in {result.elapsed:.2f}s")
+    return result.move, "search"
+  if pondered is not None and pondered.depth >= args.depth:
+    return pondered.move, "ponder"
+  engine.new_search()
+  return engine.search(board, symbol, target, args.depth, root_moves=root_moves), "search"
+
+
+def run_bot(client, args: argparse.Namespace) -> None:
+  """
+  Plays a game as a bot until it is over.
+  :param client: Client object for interacting with the game server
+  :param args: Parsed command line arguments
+  """
+  if args.game is None:
+    raise ValueError("Game ID is required")
+  if args.team is None:
+    raise ValueError("Team ID is required")
+  if args.depth is None:
+    raise ValueError("Depth is required")
+  game_id = args.game
+  team_id = args.team[0]
+  
+  details = client.getGameDetails(game_id)
+  client.setTimeouts(endpoint_timeouts(details.secondsPerMove))
+  symbol = -1 if team_id == details.team1Id else 1
+  engine = create_engine(args)
+  ponderer = Ponderer(engine, args.ponder_replies) if args.ponder else None
+  book = OpeningBook(args.book) if args.book is not None else None
+  cache = SearchCache(args.cache, args.cache_size) if args.cache is not None else None
+  if cache is not None:
+    print(f"Loaded {cache.warm(engine.table, details.boardSize, details.target)} cached results")
+  tracker = GameTracker(client, game_id, details.boardSize, BOARD_BACKENDS[args.backend], args.radius)
+  scheduler = PollScheduler(details.secondsPerMove, args.poll_min, args.poll_max)
+  profiler = MoveProfiler(args.profile, args.profile_top) if args.profile is not None else None
+  move_log = MoveLog(args.move_log) if args.move_log is not None else None
+  moves_made = 0
+  print(f"Game ID: {game_id}. Playing as team {team_id}")
+  try:
+    while True:
+      print("Waiting for the opponent to make a move...")
+      board = get_new_move(client, game_id, team_id, tracker=tracker, scheduler=scheduler)
+      turn_start = time.monotonic()
+      pondered = None
+      if ponderer is not None:
+        ponderer.stop()
+        pondered = ponderer.result_for(board)
+      print(board)
+      details = client.getGameDetails(game_id)
+      if details.winnerTeamId is not None:
+        print(f"Game over. Winner: {details.winnerTeamId}")
+        break
+      elif details.turnTeamId == -1:
+        print("Game over. Draw")
+        break
+      
+      profiling = profiler is not None and moves_made % args.profile_every == 0
+      think_start = time.monotonic()
+      with profiler if profiling else nullcontext():
+        move, source = choose_move(board, symbol, details, args, engine, book, cache, pondered, turn_start)
+      think_seconds = time.monotonic() - think_start
+      print(f"Move made: {move} ({source})")
+      if source == "search":
+        print(f"Search: {engine.stats.as_dict()}")
+        print(f"Transposition table: {engine.table.stats()}")
+        root = engine.table.probe(table_key(board, symbol))
+        if cache is not None and root is not None:
+          cache.store(details.boardSize, details.target, root)
+      move_id = client.makeMove(game_id, team_id, (move.moveX, move.moveY))
+      tracker.apply(move.moveX, move.moveY, symbol, move_id)
+      scheduler.start_wait()
+      moves_made += 1
+      if move_log is not None:
+        record = {
+          "game": game_id,
+          "ply": tracker.move_count,
+          "move": [int(move.moveX), int(move.moveY)],
+          "source": source,
+          "think_seconds": round(think_seconds, 4),
+          "turn_seconds": round(time.monotonic() - turn_start, 4),
+          "seconds_per_move": details.secondsPerMove,
+        }
+        if source == "search":
+          record["search"] = engine.stats.as_dict()
+          record["table"] = engine.table.stats()
+        if profiling:
+          record["profile"] = profiler.summary()
+        move_log.write(record)
+      
+      if ponderer is not None:
+        ponderer.start(tracker.board, symbol, details.target, details.secondsPerMove)
+  finally:
+    print(f"Polling: {scheduler.stats()}")
+    print(f"Response cache: {client.stats()}")
+    print(f"Connections: {client.sender.connection_stats()}")
+    if ponderer is not None:
+      ponderer.stop()
+    if isinstance(engine, ParallelSearch):
+      engine.close()
+    if move_log is not None:
+      move_log.close()
+    if book is not None:
+      book.close()
+    if cache is not None:
+      print(f"Cached {cache.save_table(engine.table, details.boardSize, details.target)} search results")
+      cache.close()
+
+
+def run_daemon(session: Session, api_key: str, user_id: str, args: argparse.Namespace) -> None:
+  """
+  Plays every active game of the given teams until interrupted.
+  :param session: Session shared by all requests
+  :param args: Parsed command line arguments
+  """
+  if args.team is None:
+    raise ValueError("Team ID is required")
+  client = (AsyncHttpGameClient(AsyncSession(session, args.concurrency))
+            .setApiKey(api_key)
+            .setUserId(user_id)
+            .setEndpoint(args.endpoint)
+            .build())
+  config = DaemonConfig(
+    depth=args.depth,
+    radius=args.radius,
+    time_budget=args.time_budget,
+    safety_margin=args.safety_margin,
+    max_depth=args.max_depth,
+    tactics=args.tactics,
+    tt_megabytes=args.tt_size,
+    poll_min=args.poll_min,
+    poll_max=args.poll_max,
+  )
+  book = OpeningBook(args.book) if args.book is not None else None
+  cache = SearchCache(args.cache, args.cache_size) if args.cache is not None else None
+  daemon = BotDaemon(client, args.team, args.workers, config, book, cache)
+  try:
+    asyncio.run(daemon.run())
+  except KeyboardInterrupt:
+    print("Daemon stopped")
+  finally:
+    print(f"Connections: {session.connection_stats()}")
+    if book is not None:
+      book.close()
+    if cache is not None:
+      cache.close()
 
 
 def getApiCredentials() -> tuple[str, str]:
@@ -62,6 +300,7 @@ def setupArgs() -> argparse.ArgumentParser:
     choices=[
       "team",
       "game",
+      "daemon",
     ],
     help="Operation to perform"
   )
@@ -156,12 +395,160 @@ def setupArgs() -> argparse.ArgumentParser:
     action="store_true",
     help="Play as a bot"
   )
+  parser.add_argument(
+    "--archive",
+    type=str,
+    help="Append finished games, all of them or --game, to this game record file, see GameRecord.py"
+  )
   parser.add_argument(
     "--depth",
     type=int,
     help="Depth of the minmax algorithm",
     default=5,
   )
+  parser.add_argument(
+    "--radius",
+    type=int,
+    help="Only consider moves within this distance of placed stones, 0 considers the whole board",
+    default=DEFAULT_RADIUS,
+  )
+  parser.add_argument(
+    "--backend",
+    choices=list(BOARD_BACKENDS),
+    help="Board implementation used by the bot",
+    default="array",
+  )
+  parser.add_argument(
+    "--tt-size",
+    type=float,
+    help="Memory budget of the transposition table in megabytes",
+    default=64,
+  )
+  parser.add_argument(
+    "--time-budget",
+    action="store_true",
+    help="Search with iterative deepening until the move clock runs out instead of to a fixed --depth"
+  )
+  parser.add_argument(
+    "--safety-margin",
+    type=float,
+    help="Seconds of the move clock kept for the network when using --time-budget",
+    default=DEFAULT_SAFETY_MARGIN,
+  )
+  parser.add_argument(
+    "--max-depth",
+    type=int,
+    help="Deepest iteration when using --time-budget",
+  )
+  parser.add_argument(
+    "--workers",
+    type=int,
+    help="Number of processes searching the root moves in parallel",
+    default=1,
+  )
+  parser.add_argument(
+    "--ponder",
+    action="store_true",
+    help="Search the opponent's likely replies while waiting for their move"
+  )
+  parser.add_argument(
+    "--tactics",
+    action=argparse.BooleanOptionalAction,
+    help="Look for wins, must-block moves and forced win sequences before searching",
+    default=True,
+  )
+  parser.add_argument(
+    "--book",
+    type=str,
+    help="Opening book file to take moves from before searching, built with OpeningBook.py"
+  )
+  parser.add_argument(
+    "--cache",
+    type=str,
+    help="SQLite file that keeps search results between games"
+  )
+  parser.add_argument(
+    "--cache-size",
+    type=int,
+    help="Most search results kept in the --cache file",
+    default=1_000_000,
+  )
+  parser.add_argument(
+    "--poll-min",
+    type=float,
+    help="Shortest delay in seconds between polls for the opponent's move",
+    default=0.1,
+  )
+  parser.add_argument(
+    "--poll-max",
+    type=float,
+    help="Longest delay in seconds between polls for the opponent's move",
+    default=2.0,
+  )
+  parser.add_argument(
+    "--concurrency",
+    type=int,
+    help="Most API requests in flight at once in daemon mode",
+    default=8,
+  )
+  parser.add_argument(
+    "--endpoint",
+    type=str,
+    help="URL of the game API, for example of a LocalGameServer.py",
+    default=DEFAULT_ENDPOINT,
+  )
+  parser.add_argument(
+    "--pool-size",
+    type=int,
+    help="Most connections to the API kept open, at least --concurrency",
+    default=DEFAULT_POOL_SIZE,
+  )
+  parser.add_argument(
+    "--http-retries",
+    type=int,
+    help="Retries of a failed API request, with exponential backoff",
+    default=DEFAULT_RETRIES,
+  )
+  parser.add_argument(
+    "--http-backoff",
+    type=float,
+    help="Backoff factor in seconds between retries of API requests",
+    default=DEFAULT_BACKOFF,
+  )
+  parser.add_argument(
+    "--response-cache",
+    action=argparse.BooleanOptionalAction,
+    help="Cache game details, board and team reads for a few seconds",
+    default=True,
+  )
+  parser.add_argument(
+    "--move-log",
+    type=str,
+    help="JSON lines file the bot appends a record of every move to, with search counters and timings"
+  )
+  parser.add_argument(
+    "--profile",
+    choices=[CPROFILE, SAMPLE],
+    help="Profile the bot's moves and add the top functions to --move-log, sample is cheap enough for live games"
+  )
+  parser.add_argument(
+    "--profile-every",
+    type=int,
+    help="Profile every n-th move with --profile",
+    default=1,
+  )
+  parser.add_argument(
+    "--profile-top",
+    type=int,
+    help="Number of functions in a move's profile",
+    default=15,
+  )
+  parser.add_argument(
+    "--ponder-replies",
+    type=int,
+    help="Number of opponent replies to ponder",
+    default=3,
+  )
   
   return parser
 
@@ -172,11 +559,13 @@ def main(argv: list[str]) -> None:
   
   args = parser.parse_args(argv[1:])
   
-  with Session() as session:
+  with Session(max(args.pool_size, args.concurrency), args.http_retries, args.http_backoff) as session:
     client = (HttpGameClient(session)
               .setApiKey(api_key)
               .setUserId(user_id)
+              .setEndpoint(args.endpoint)
               .build())
+    client = CachedGameClient(client, None if args.response_cache else {})
     
     if args.operation == "team":
       if args.create:
@@ -280,36 +669,14 @@ def main(argv: list[str]) -> None:
           move = client.makeMove(game_id, team_id, (x, y))
           print(f"Move made: {move}")
       elif args.bot:
-        if args.game is None:
-          raise ValueError("Game ID is required")
-        if args.team is None:
-          raise ValueError("Team ID is required")
-        if args.depth is None:
-          raise ValueError("Depth is required")
-        game_id = args.game
-        team_id = args.team[0]
-        depth = args.depth
-        
-        details = client.getGameDetails(game_id)
-        symbol = -1 if team_id == details.team1Id else 1
-        print(f"Game ID: {game_id}. Playing as team {team_id}")
-        while True:
-          print("Waiting for the opponent to make a move...")
-          board = get_new_move(client, game_id, team_id)
-          print(board)
-          details = client.getGameDetails(game_id)
-          if details.winnerTeamId is not None:
-            print(f"Game over. Winner: {details.winnerTeamId}")
-            break
-          elif details.turnTeamId == -1:
-            print("Game over. Draw")
-            break
-          
-          move = minmax(board, depth, symbol, details.target)
-          print(f"Move made: {move}")
-          client.makeMove(game_id, team_id, (move.moveX, move.moveY))
+        run_bot(client, args)
+      elif args.archive is not None:
+        added = archive_games(client, args.archive, [args.game] if args.game is not None else None)
+        print(f"Archived {added} games to {args.archive}")
       else:
         raise ValueError("Invalid operation")
+    elif args.operation == "daemon":
+      run_daemon(session, api_key, user_id, args)
     else:
       raise ValueError("Invalid operation")
 
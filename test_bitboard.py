@@ -0,0 +1,41 @@
+import pytest
+from BitBoard import BitBoard
+from Board import Board, chain_evaluation
+from test_evaluation import SEEDS, SETTINGS, random_game
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("size, target", SETTINGS)
+def test_bitboard_matches_board(size: int, target: int, seed: int):
+  moves = random_game(size, target, seed)
+  board = Board(size)
+  bitboard = BitBoard(size)
+  for x, y, symbol in moves:
+    board.make_move(x, y, symbol)
+    bitboard.make_move(x, y, symbol)
+    expected = chain_evaluation(board)
+    assert bitboard.evaluation() == expected
+    assert BitBoard.from_board(board).evaluation() == expected
+    assert bitboard.winner(target) == board.scan_winner(target)
+    assert bitboard.hash == board.hash
+  assert bitboard.board.tolist() == board.board.tolist()
+  assert list(bitboard.candidate_cells()) == list(board.candidate_cells())
+  assert bitboard.generate_moves(1, target) == board.generate_moves(1, target)
+
+  for x, y, _ in reversed(moves):
+    board.unmake_move(x, y)
+    bitboard.unmake_move(x, y)
+    assert bitboard.evaluation() == chain_evaluation(board)
+    assert bitboard.winner(target) == board.scan_winner(target)
+  assert bitboard.hash == 0
+
+
+def test_string_round_trip():
+  string = "X--O-\n-XO--\n--X--\n-O-X-\n-----"
+  bitboard = BitBoard.from_string(string)
+  assert bitboard.board.tolist() == Board.from_string(string).board.tolist()
+  assert bitboard.winner(4) == 1
+  assert bitboard.winner(5) == 0
+  copy = bitboard.copy()
+  copy.unmake_move(3, 3)
+  assert (copy.winner(4), bitboard.winner(4)) == (0, 1)
@@ -0,0 +1,32 @@
+from CachedGameClient import CachedGameClient
+from HttpGameClient import HttpGameClient
+from LocalGameServer import LocalGameServer, LocalSession
+
+
+def cached_client() -> tuple[CachedGameClient, int, int, int]:
+  session = LocalSession(LocalGameServer())
+  client = CachedGameClient(HttpGameClient(session).setApiKey("key").setUserId("1").build())
+  team1, team2 = client.createTeam("first"), client.createTeam("second")
+  return client, team1, team2, client.createGame(team1, team2, 5, 4)
+
+
+def test_hits_return_copies():
+  client, team1, _, game_id = cached_client()
+  details = client.getGameDetails(game_id)
+  details.moves = 99
+  assert client.getGameDetails(game_id).moves == 0
+  teams = client.getMyTeams()
+  teams.clear()
+  assert set(client.getMyTeams()) == {team1, team1 + 1}
+  board = client.getBoardObject(game_id)
+  board.make_move(0, 0, 1)
+  assert client.getBoardObject(game_id).board[0, 0] == 0
+  assert client.stats()["hits"] == 3
+
+
+def test_move_invalidates_game():
+  client, team1, _, game_id = cached_client()
+  assert client.getGameDetails(game_id).moves == 0
+  client.makeMove(game_id, team1, (2, 2))
+  assert client.getGameDetails(game_id).moves == 1
+  assert client.getBoardObject(game_id).board[2, 2] != 0
@@ -0,0 +1,67 @@
+import random
+import numpy as np
+import pytest
+from Board import Board, chain_evaluation
+
+# (size, target) of the random games, small boards fill up and large ones grow long runs
+SETTINGS: list[tuple[int, int]] = [(3, 3), (5, 4), (7, 4), (10, 5), (15, 5), (20, 10)]
+SEEDS: range = range(8)
+# Longest random game, large boards take hundreds of moves to fill
+MAX_PLIES: int = 120
+
+
+def random_game(size: int, target: int, seed: int) -> list[tuple[int, int, int]]:
+  r"""
+  Random moves from X until a player wins, the board is full or MAX_PLIES, with some stones clustered
+  near the last one so runs form.
+  :return: x, y and symbol of every move
+  """
+  rng = random.Random(f"{size}/{target}/{seed}")
+  board = Board(size)
+  moves = []
+  symbol = 1
+  while board.winner(target) == 0 and not board.is_full() and len(moves) < MAX_PLIES:
+    empty = list(zip(*np.nonzero(board.board == 0)))
+    near = [(x, y) for x, y in empty if moves and abs(x - moves[-1][0]) <= 1 and abs(y - moves[-1][1]) <= 1]
+    x, y = rng.choice(near if near and rng.random() < 0.6 else empty)
+    board.make_move(int(x), int(y), symbol)
+    moves.append((int(x), int(y), symbol))
+    symbol = -symbol
+  return moves
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("size, target", SETTINGS)
+def test_evaluations_match_rescan(size: int, target: int, seed: int):
+  board = Board(size)
+  for x, y, symbol in random_game(size, target, seed):
+    board.make_move(x, y, symbol)
+    assert board.evaluation() == chain_evaluation(board)
+    assert board.winner(target) == board.scan_winner(target)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("size, target", SETTINGS)
+def test_unmake_restores_evaluations(size: int, target: int, seed: int):
+  moves = random_game(size, target, seed)
+  board = Board(size)
+  for x, y, symbol in moves:
+    board.make_move(x, y, symbol)
+  for x, y, _ in reversed(moves):
+    board.unmake_move(x, y)
+    assert board.evaluation() == chain_evaluation(board)
+    assert board.winner(target) == board.scan_winner(target)
+  assert not board.history
+
+
+def test_copy_is_independent():
+  board = Board(5)
+  for x, y, symbol in random_game(5, 4, 0)[:6]:
+    board.make_move(x, y, symbol)
+  copy = board.copy()
+  assert copy.evaluation() == board.evaluation()
+  x, y = np.argwhere(copy.board == 0)[0]
+  copy.make_move(int(x), int(y), 1)
+  assert board.board[x, y] == 0
+  assert board.evaluation() == chain_evaluation(board)
+  assert copy.evaluation() == chain_evaluation(copy)
@@ -0,0 +1,90 @@
+import random
+import pytest
+from GameRecord import UNKNOWN_STATUS, GameRecordReader, GameRecordWriter, archive_games, decode, encode
+from HttpGameClient import GameData, HttpGameClient
+from LocalGameServer import LocalGameServer, LocalSession
+
+
+def game_data(game_id: int = 7, moves: int = 3, **fields) -> GameData:
+  values = dict(
+    gameId=game_id, gameType="TTT", moves=moves, boardSize=5, target=4, team1Id=1, team1Name="one",
+    team2Id=2, team2Name="two", secondsPerMove=60, status="1", winnerTeamId=2, turnTeamId=None,
+  )
+  values.update(fields)
+  return GameData(**values)
+
+
+def test_encode_decode_round_trip():
+  moves = [(2, 2, 1), (1, 3, -1), (0, 4, 1)]
+  buffer = b"xx" + encode(game_data(), moves)
+  record, end = decode(buffer, 2)
+  assert end == len(buffer)
+  assert record.moves.tolist() == moves
+  details = record.details
+  assert (details.gameId, details.moves, details.boardSize, details.target) == (7, 3, 5, 4)
+  assert (details.team1Name, details.team2Name, details.status) == ("one", "two", 1)
+  assert (details.winnerTeamId, details.turnTeamId) == (2, None)
+  assert record.final_board().board.tolist()[1][3] == -1
+
+
+def test_long_names_are_stored():
+  name = "é" * 300
+  record, _ = decode(encode(game_data(team1Name=name), []), 0)
+  assert record.details.team1Name == name
+
+
+@pytest.mark.parametrize("status, code", [("1", 1), ("0", 0), (None, UNKNOWN_STATUS), ("FINISHED", UNKNOWN_STATUS),
+                                          ("70000", UNKNOWN_STATUS)])
+def test_status_codes(status, code: int):
+  record, _ = decode(encode(game_data(status=status), []), 0)
+  assert record.details.status == code
+
+
+def test_reader_offsets_and_read(tmp_path):
+  path = str(tmp_path / "games.tttg")
+  with GameRecordWriter(path) as writer:
+    for game_id in (1, 2, 3):
+      writer.append(game_data(game_id, game_id), [(game_id, 0, 1)] * game_id)
+  with GameRecordReader(path) as reader:
+    assert [record.offset for record in reader] == reader.offsets()
+    assert reader.game_ids() == {1, 2, 3}
+    [offset] = reader.offsets(2)
+    record = reader.read(offset)
+  assert record.details.gameId == 2
+  assert len(record.moves) == 2
+
+
+def test_writer_refuses_other_files(tmp_path):
+  path = tmp_path / "other.tttg"
+  path.write_bytes(b"TTTGAME1 old format")
+  with pytest.raises(ValueError):
+    GameRecordWriter(str(path))
+
+
+def test_archive_from_local_server(tmp_path):
+  server = LocalGameServer()
+  client = HttpGameClient(LocalSession(server)).setApiKey("key").setUserId("1").build()
+  team1, team2 = client.createTeam("first"), client.createTeam("second")
+  rng = random.Random(0)
+  played = {}
+  for _ in range(2):
+    game_id = client.createGame(team1, team2, 5, 4)
+    played[game_id] = []
+    while True:
+      details = client.getGameDetails(game_id)
+      if details.winnerTeamId is not None or details.turnTeamId == -1:
+        break
+      board = client.getBoardObject(game_id)
+      cell = rng.choice([(x, y) for x in range(5) for y in range(5) if board.board[x, y] == 0])
+      client.makeMove(game_id, details.turnTeamId, cell)
+      played[game_id].append(cell)
+  # Not finished, so not archived
+  client.createGame(team1, team2, 5, 4)
+
+  path = str(tmp_path / "games.tttg")
+  assert archive_games(client, path) == 2
+  assert archive_games(client, path) == 0
+  with GameRecordReader(path) as reader:
+    for record in reader:
+      assert [(x, y) for x, y, _ in record.moves.tolist()] == played[record.details.gameId]
+      assert record.final_board().board.tolist() == client.getBoardObject(record.details.gameId).board.tolist()
@@ -0,0 +1,75 @@
+import random
+import pytest
+from BitBoard import BitBoard
+from Board import Board
+from GameTracker import GameTracker
+from HttpGameClient import HttpGameClient
+from LocalGameServer import LocalGameServer, LocalSession
+
+
+def new_game(size: int = 6, target: int = 5) -> tuple[HttpGameClient, int, int, int]:
+  client = HttpGameClient(LocalSession(LocalGameServer())).setApiKey("key").setUserId("1").build()
+  team1, team2 = client.createTeam("first"), client.createTeam("second")
+  return client, client.createGame(team1, team2, size, target), team1, team2
+
+
+def play_random(client: HttpGameClient, game_id: int, rng: random.Random, count: int) -> list[tuple[int, int, int]]:
+  r"""
+  Makes up to count random moves for whichever team is to move.
+  :return: x, y and move ID of every move made
+  """
+  made = []
+  for _ in range(count):
+    details = client.getGameDetails(game_id)
+    if details.winnerTeamId is not None or details.turnTeamId == -1:
+      break
+    board = client.getBoardObject(game_id)
+    cell = rng.choice([(x, y) for x in range(board.size) for y in range(board.size) if board.board[x, y] == 0])
+    made.append((*cell, client.makeMove(game_id, details.turnTeamId, cell)))
+  return made
+
+
+@pytest.mark.parametrize("board_class", [Board, BitBoard])
+def test_sync_follows_the_server(board_class: type):
+  client, game_id, _, _ = new_game()
+  tracker = GameTracker(client, game_id, 6, board_class)
+  rng = random.Random(1)
+  for step in range(12):
+    play_random(client, game_id, rng, step % 3)
+    details = client.getGameDetails(game_id)
+    board = tracker.sync(details)
+    assert board.board.tolist() == client.getBoardObject(game_id).board.tolist()
+    assert tracker.move_count == details.moves
+  assert tracker.resyncs == 0
+  assert tracker.board is board
+
+
+def test_own_moves_are_not_fetched_again():
+  client, game_id, team1, _ = new_game()
+  tracker = GameTracker(client, game_id, 6)
+  move_id = client.makeMove(game_id, team1, (2, 2))
+  assert tracker.apply(2, 2, -1, move_id)
+  assert tracker.moves_to_fetch(client.getGameDetails(game_id)) == 0
+  play_random(client, game_id, random.Random(2), 1)
+  assert tracker.moves_to_fetch(client.getGameDetails(game_id)) == 2
+  tracker.sync(client.getGameDetails(game_id))
+  assert tracker.board.board.tolist() == client.getBoardObject(game_id).board.tolist()
+  assert tracker.resyncs == 0
+
+
+def test_mismatch_falls_back_to_resync():
+  client, game_id, _, _ = new_game()
+  play_random(client, game_id, random.Random(3), 4)
+  tracker = GameTracker(client, game_id, 6)
+  tracker.sync(client.getGameDetails(game_id))
+  # A wrong anchor, as if a move had been missed
+  tracker.last_move_id = -5
+  play_random(client, game_id, random.Random(4), 2)
+  tracker.sync(client.getGameDetails(game_id))
+  assert tracker.resyncs == 1
+  assert tracker.board.board.tolist() == client.getBoardObject(game_id).board.tolist()
+  # Ahead of the server, for example after a lost response
+  tracker.move_count += 1
+  tracker.sync(client.getGameDetails(game_id))
+  assert tracker.resyncs == 2
+  assert tracker.move_count == client.getGameDetails(game_id).moves
@@ -0,0 +1,73 @@
+import pytest
+from BitBoard import BitBoard
+from Board import Board
+from OpeningBook import INVERSE, SYMMETRIES, OpeningBook, build_book, canonical_key, write_book
+
+STONES: list[tuple[int, int, int]] = [(1, 2, 1), (3, 3, -1), (0, 4, 1), (2, 2, -1)]
+
+
+def transformed(board: Board, index: int) -> Board:
+  other = Board(board.size)
+  for x in range(board.size):
+    for y in range(board.size):
+      if board.board[x, y] != 0:
+        other.make_move(*SYMMETRIES[index](x, y, board.size), int(board.board[x, y]))
+  return other
+
+
+def test_inverse_undoes_each_symmetry():
+  for index, transform in enumerate(SYMMETRIES):
+    undo = SYMMETRIES[INVERSE[index]]
+    for x in range(5):
+      for y in range(5):
+        assert undo(*transform(x, y, 5), 5) == (x, y)
+
+
+@pytest.mark.parametrize("index", range(len(SYMMETRIES)))
+def test_canonical_key_is_symmetric(index: int):
+  board = Board(6)
+  for x, y, symbol in STONES:
+    board.make_move(x, y, symbol)
+  other = transformed(board, index)
+  for symbol in (1, -1):
+    key, _ = canonical_key(board, symbol)
+    assert canonical_key(other, symbol)[0] == key
+    assert canonical_key(BitBoard.from_board(other), symbol)[0] == key
+  assert canonical_key(board, 1)[0] != canonical_key(board, -1)[0]
+
+
+@pytest.mark.parametrize("index", range(len(SYMMETRIES)))
+def test_lookup_maps_move_back(tmp_path, index: int):
+  board = Board(6)
+  for x, y, symbol in STONES:
+    board.make_move(x, y, symbol)
+  # Store (4, 1) for the position as it is, then look it up in every orientation
+  key, canonical = canonical_key(board, 1)
+  path = str(tmp_path / "book.bin")
+  write_book(path, {(6, 4, key): SYMMETRIES[canonical](4, 1, 6)})
+  with OpeningBook(path) as book:
+    assert book.lookup(transformed(board, index), 1, 4) == SYMMETRIES[index](4, 1, 6)
+    assert book.lookup(board, -1, 4) is None
+    assert book.lookup(board, 1, 5) is None
+
+
+def test_built_book_round_trip(tmp_path):
+  entries = build_book(4, 3, 1, 2, 2)
+  path = str(tmp_path / "book.bin")
+  write_book(path, entries)
+  with OpeningBook(path) as book:
+    assert book.entries() == entries
+    # The position after the book's first move is in the book, in every orientation
+    child = Board(4)
+    child.make_move(*book.lookup(child, 1, 3), 1)
+    for index in range(len(SYMMETRIES)):
+      other = transformed(child, index)
+      move = book.lookup(other, -1, 3)
+      assert move is not None and other.is_valid_move(*move)
+
+
+def test_other_files_are_refused(tmp_path):
+  path = tmp_path / "other.bin"
+  path.write_bytes(b"not a book")
+  with pytest.raises(ValueError):
+    OpeningBook(str(path))
@@ -0,0 +1,80 @@
+import pytest
+from BitBoard import BitBoard
+from Board import Board
+from Search import INFINITY, WIN_SCORE, SearchEngine, minmax
+
+# Small positions where a brute-force search is cheap: (board, target, depth)
+POSITIONS: list[tuple[str, int, int]] = [
+  ("---\n-X-\n---", 3, 4),
+  ("X--\n-O-\n---", 3, 5),
+  ("XO-\n-X-\n--O", 3, 3),
+  ("----\n-X--\n--O-\n----", 3, 3),
+  ("X---\n-O--\n--X-\n---O", 3, 4),
+  ("-----\n-XO--\n--X--\n-----\n-----", 4, 3),
+]
+
+
+def brute_force(board: Board, depth: int, symbol: int, target: int, ply: int = 0) -> int:
+  r"""
+  Plain negamax over every candidate cell without pruning, scored like SearchEngine.negamax.
+  """
+  winner = board.winner(target)
+  if winner != 0:
+    return (WIN_SCORE - ply) * winner * symbol
+  cells = list(board.candidate_cells())
+  if depth == 0 or not cells:
+    return symbol * board.evaluation()
+  best = -INFINITY
+  for x, y in cells:
+    board.make_move(x, y, symbol)
+    best = max(best, -brute_force(board, depth - 1, -symbol, target, ply + 1))
+    board.unmake_move(x, y)
+  return best
+
+
+@pytest.mark.parametrize("symbol", [1, -1])
+@pytest.mark.parametrize("string, target, depth", POSITIONS)
+def test_search_matches_brute_force(string: str, target: int, depth: int, symbol: int):
+  board = Board.from_string(string)
+  for search_depth in range(1, depth + 1):
+    expected = brute_force(board, search_depth, symbol, target)
+    move = minmax(board, search_depth, symbol, target)
+    assert symbol * move.score == expected
+    # The chosen move is worth the score
+    board.make_move(move.moveX, move.moveY, symbol)
+    assert -brute_force(board, search_depth - 1, -symbol, target, 1) == expected
+    board.unmake_move(move.moveX, move.moveY)
+
+
+@pytest.mark.parametrize("string, target, depth", POSITIONS)
+def test_backends_agree(string: str, target: int, depth: int):
+  board = Board.from_string(string)
+  expected = minmax(board, depth, 1, target).score
+  assert minmax(BitBoard.from_string(string), depth, 1, target).score == expected
+  assert SearchEngine(vectorized=True).search(board, 1, target, depth).score == expected
+
+
+def test_search_does_not_modify_board():
+  board = Board.from_string("X---\n-O--\n--X-\n---O")
+  before = (board.board.tolist(), board.hash, board.evaluation())
+  minmax(board, 4, 1, 3)
+  assert (board.board.tolist(), board.hash, board.evaluation()) == before
+
+
+def test_finished_and_full_boards():
+  won = Board.from_string("XXX\nOO-\n---")
+  assert minmax(won, 3, -1, 3).moveX == -1
+  full = Board.from_string("XOX\nXOO\nOXX")
+  move = minmax(full, 3, 1, 3)
+  assert (move.moveX, move.moveY) == (-1, -1)
+  assert move.score == full.evaluation()
+
+
+def test_iterative_deepening_stops_at_max_depth():
+  board = Board.from_string("----\n-X--\n--O-\n----")
+  engine = SearchEngine()
+  result = engine.iterative_deepening(board, 1, 3, float("inf"), 3)
+  assert result.depth == 3
+  assert [iteration["depth"] for iteration in engine.stats.iterations] == [1, 2, 3]
+  assert result.pv[0] == (result.move.moveX, result.move.moveY)
+  assert board.is_valid_move(*result.pv[0])
@@ -0,0 +1,51 @@
+import pytest
+from Board import Board
+from Search import WIN_THRESHOLD, SearchEngine
+from Tactics import BLOCK, DEFEND, FORCED_WIN, WIN, find_forcing_move
+
+
+def test_win_before_block():
+  board = Board.from_string("XX---\n-----\nOO---\n-----\n-----")
+  result = find_forcing_move(board, 1, 3)
+  assert (result.kind, result.move) == (WIN, (0, 2))
+  assert result.decisive
+
+
+def test_block():
+  board = Board.from_string("XX---\n-----\n--O--\n-----\n-----")
+  result = find_forcing_move(board, -1, 3)
+  assert (result.kind, result.move) == (BLOCK, (0, 2))
+
+
+def test_forced_win_line_wins():
+  # Two crossing pairs give X a double threat
+  board = Board.from_string("-------\n-------\n--XX---\n---X---\n-------\n-------\n-------")
+  result = find_forcing_move(board, 1, 4)
+  assert result.kind == FORCED_WIN
+  assert SearchEngine().search(board, 1, 4, 3).score >= WIN_THRESHOLD
+
+
+def test_defences_of_the_centre_opening():
+  # After X takes the centre only a corner holds, the edge cells lose
+  board = Board.from_string("---\n-X-\n---")
+  result = find_forcing_move(board, -1, 3)
+  assert result.kind == DEFEND
+  assert sorted(result.candidates) == [(0, 0), (0, 2), (2, 0), (2, 2)]
+  assert not result.decisive
+
+
+@pytest.mark.parametrize("cell", [(x, y) for x in range(3) for y in range(3) if (x, y) != (1, 1)])
+def test_defences_agree_with_full_search(cell: tuple[int, int]):
+  board = Board.from_string("---\n-X-\n---")
+  candidates = find_forcing_move(board, -1, 3).candidates
+  board.make_move(cell[0], cell[1], -1)
+  x_wins = SearchEngine().search(board, 1, 3, 8).score >= WIN_THRESHOLD
+  assert x_wins == (cell not in candidates)
+
+
+def test_search_chooses_among_defences():
+  board = Board.from_string("---\n-X-\n---")
+  candidates = find_forcing_move(board, -1, 3).candidates
+  for depth in range(1, 9):
+    move = SearchEngine().search(board, -1, 3, depth, root_moves=candidates)
+    assert (move.moveX, move.moveY) in candidates
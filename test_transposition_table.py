@@ -0,0 +1,61 @@
+import pytest
+from Board import Board
+from Search import SearchEngine, table_key
+from TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+from test_search import POSITIONS, brute_force
+
+
+def test_hash_depends_on_position_only():
+  board = Board(5)
+  for x, y, symbol in [(2, 2, 1), (1, 3, -1), (0, 0, 1)]:
+    board.make_move(x, y, symbol)
+  other = Board(5)
+  for x, y, symbol in [(0, 0, 1), (1, 3, -1), (2, 2, 1)]:
+    other.make_move(x, y, symbol)
+  assert board.hash == other.hash == Board.from_string(
+    "X----\n---O-\n--X--\n-----\n-----"
+  ).hash
+  assert table_key(board, 1) != table_key(board, -1)
+  board.unmake_move(0, 0)
+  board.unmake_move(1, 3)
+  board.make_move(1, 3, 1)
+  assert board.hash != other.hash
+  board.unmake_move(1, 3)
+  board.unmake_move(2, 2)
+  assert board.hash == 0
+
+
+def test_store_and_probe():
+  table = TranspositionTable(0.01)
+  assert table.probe(5) is None
+  table.store(5, 3, LOWER, 40, (1, 2))
+  entry = table.probe(5)
+  assert (entry.depth, entry.bound, entry.score, entry.move) == (3, LOWER, 40, (1, 2))
+  # A new result for the same position replaces the old one whatever its depth
+  table.store(5, 1, UPPER, -7, None)
+  assert table.probe(5).score == -7
+  assert table.stats()["hits"] == 2
+
+
+def test_bucket_keeps_deepest_and_newest():
+  table = TranspositionTable(0)
+  assert len(table) == 2
+  table.store(1, 5, EXACT, 1, None)
+  table.store(2, 2, EXACT, 2, None)
+  table.store(3, 1, EXACT, 3, None)
+  # 1 is deepest, 3 is newest, 2 was pushed out
+  assert table.probe(1).score == 1
+  assert table.probe(2) is None
+  assert table.probe(3).score == 3
+  table.store(4, 6, EXACT, 4, None)
+  assert table.probe(4).score == 4
+  assert table.probe(1).score == 1
+  assert table.probe(3) is None
+  assert table.stats()["collisions"] == 2
+
+
+@pytest.mark.parametrize("string, target, depth", POSITIONS)
+def test_search_with_tiny_table_is_exact(string: str, target: int, depth: int):
+  board = Board.from_string(string)
+  move = SearchEngine(TranspositionTable(0)).search(board, 1, target, depth)
+  assert move.score == brute_force(board, depth, 1, target)
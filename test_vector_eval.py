@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from BitBoard import BitBoard
+from Board import Board, chain_evaluation
+from VectorEval import generate_moves_vectorized, vector_chain_evaluation, vector_winner
+from test_evaluation import SEEDS, SETTINGS, random_game
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("size, target", SETTINGS)
+def test_vector_evaluation_matches_board(size: int, target: int, seed: int):
+  board = Board(size)
+  positions = []
+  for x, y, symbol in random_game(size, target, seed):
+    board.make_move(x, y, symbol)
+    expected = chain_evaluation(board)
+    winner = board.scan_winner(target)
+    assert vector_chain_evaluation(board.board) == expected
+    assert vector_winner(board.board, target) == winner
+    positions.append((board.board.copy(), expected, winner))
+
+  boards = np.stack([cells for cells, _, _ in positions])
+  assert list(vector_chain_evaluation(boards)) == [expected for _, expected, _ in positions]
+  assert list(vector_winner(boards, target)) == [winner for _, _, winner in positions]
+
+
+@pytest.mark.parametrize("size, target", SETTINGS)
+def test_vectorized_moves_match_generate_moves(size: int, target: int):
+  board = Board(size)
+  for x, y, symbol in random_game(size, target, 1)[:10]:
+    board.make_move(x, y, symbol)
+  bitboard = BitBoard.from_board(board)
+  for symbol in (1, -1):
+    expected = board.generate_moves(symbol, target)
+    assert generate_moves_vectorized(board, symbol, target) == expected
+    assert generate_moves_vectorized(bitboard, symbol, target) == expected